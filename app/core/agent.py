@@ -1,7 +1,11 @@
+import importlib.util
 import os
+import time
 import httpx
+from functools import cached_property
 from typing import Dict, List, Any, Optional
 from abc import ABC, abstractmethod
+from app.core import telemetry
 from app.core.config import settings
 
 # Hugging Face API Configuration (Primary)
@@ -11,17 +15,25 @@ HF_ROUTER_CHAT_URL = os.getenv("HF_ROUTER_CHAT_URL", "https://router.huggingface
 HF_HEADERS = {"Authorization": f"Bearer {HF_API_KEY}"} if HF_API_KEY else {}
 HF_AVAILABLE = bool(HF_API_KEY)
 
-# Try to import Google GenAI (fallback)
+# Google GenAI (fallback) is only imported when an agent actually needs it.
 try:
-    from google import genai
-    from google.genai import types
-    GENAI_AVAILABLE = True
-    if settings.GOOGLE_API_KEY:
-        client = genai.Client(api_key=settings.GOOGLE_API_KEY)
-except ImportError:
+    GENAI_AVAILABLE = importlib.util.find_spec("google.genai") is not None
+except ModuleNotFoundError:
     GENAI_AVAILABLE = False
+if not GENAI_AVAILABLE:
     print("Warning: google.genai not available.")
-    client = None
+
+_GENAI_CLIENT = None
+
+
+def get_genai_client():
+    """Shared Gemini client, created on first use (None without GOOGLE_API_KEY)."""
+    global _GENAI_CLIENT
+    if _GENAI_CLIENT is None and GENAI_AVAILABLE and settings.GOOGLE_API_KEY:
+        from google import genai
+        _GENAI_CLIENT = genai.Client(api_key=settings.GOOGLE_API_KEY)
+    return _GENAI_CLIENT
+
 
 if HF_AVAILABLE:
     print(f"✓ Agent HF API Ready (Model: {HF_LLM_MODEL_ID})")
@@ -30,16 +42,14 @@ elif GENAI_AVAILABLE:
 else:
     print("⚠ No AI API available for agents - using fallback responses")
 
-from app.tools.parser import ReportParserTool
-from app.tools.explainer import ExplanationTool
-from app.tools.rag import MedicalRAGTool
-from app.tools.safety import SafetyCheckerTool
+from app.db.analyte_store import PatientAnalytes
 
 
 def call_huggingface_chat_sync(messages: list, max_tokens: int = 500) -> Optional[str]:
     """Synchronous call to Hugging Face Inference API for chat completions."""
     if not HF_API_KEY:
         return None
+    started = time.perf_counter()
     try:
         with httpx.Client(timeout=60.0) as client:
             resp = client.post(
@@ -52,15 +62,18 @@ def call_huggingface_chat_sync(messages: list, max_tokens: int = 500) -> Optiona
                 },
             )
             if resp.status_code != 200:
+                telemetry.record_llm(HF_LLM_MODEL_ID, time.perf_counter() - started, ok=False)
                 print(f"HF Chat Error: {resp.status_code}")
                 return None
             data = resp.json()
+            telemetry.record_llm_usage(HF_LLM_MODEL_ID, time.perf_counter() - started, data)
             choices = (data or {}).get("choices") or []
             if not choices:
                 return None
             content = ((choices[0] or {}).get("message") or {}).get("content")
             return content.strip() if isinstance(content, str) and content.strip() else None
     except Exception as e:
+        telemetry.record_llm(HF_LLM_MODEL_ID, time.perf_counter() - started, ok=False)
         print(f"HF Chat Exception: {e}")
         return None
 
@@ -74,17 +87,16 @@ class BaseCareBridgeAgent(ABC):
     def __init__(self, role: str):
         self.role = role
         self.agent_name = f"{role.upper()}_AGENT"
-        self.conversation_history: List[Dict[str, str]] = []
         
         # Prioritize Hugging Face API (more reliable, working quota)
         if HF_AVAILABLE:
             self.use_hf = True
             self.ai_enabled = True
             self.client = None  # Not needed for HF
-        elif GENAI_AVAILABLE and settings.GOOGLE_API_KEY and client:
+        elif GENAI_AVAILABLE and settings.GOOGLE_API_KEY:
             try:
                 self.use_hf = False
-                self.client = client
+                self.client = get_genai_client()
                 self.model_id = "gemini-2.0-flash-exp"
                 self.ai_enabled = True
             except Exception as e:
@@ -96,6 +108,29 @@ class BaseCareBridgeAgent(ABC):
             self.use_hf = False
             self.client = None
     
+    # Tools are built on first access: importing them pulls in google.adk and,
+    # for the RAG tool, the embedding model.
+
+    @cached_property
+    def parser_tool(self):
+        from app.tools.parser import ReportParserTool
+        return ReportParserTool()
+
+    @cached_property
+    def explainer_tool(self):
+        from app.tools.explainer import ExplanationTool
+        return ExplanationTool()
+
+    @cached_property
+    def rag_tool(self):
+        from app.tools.rag import MedicalRAGTool
+        return MedicalRAGTool()
+
+    @cached_property
+    def safety_tool(self):
+        from app.tools.safety import SafetyCheckerTool
+        return SafetyCheckerTool()
+
     @abstractmethod
     def get_system_prompt(self) -> str:
         """Returns role-specific system prompt"""
@@ -111,14 +146,44 @@ class BaseCareBridgeAgent(ABC):
         """Process a request with role-specific logic"""
         pass
     
-    def add_to_history(self, role: str, content: str):
-        """Add message to conversation history"""
-        self.conversation_history.append({"role": role, "content": content})
-    
-    def get_history_context(self, max_messages: int = 5) -> str:
-        """Get recent conversation history as context"""
-        recent = self.conversation_history[-max_messages:]
-        return "\n".join([f"{msg['role']}: {msg['content']}" for msg in recent])
+    def _generate_gemini(self, contents: str) -> str:
+        """Gemini fallback call, timed and token-counted like the HF calls."""
+        started = time.perf_counter()
+        try:
+            response = self.client.models.generate_content(model=self.model_id, contents=contents)
+        except Exception:
+            telemetry.record_llm(self.model_id, time.perf_counter() - started, ok=False)
+            raise
+        usage = getattr(response, "usage_metadata", None)
+        telemetry.record_llm(
+            self.model_id,
+            time.perf_counter() - started,
+            getattr(usage, "prompt_token_count", None),
+            getattr(usage, "candidates_token_count", None),
+        )
+        return response.text
+
+    # Agents are shared by every request, so they hold no conversation state:
+    # earlier turns arrive per request in context["history"] and
+    # context["conversation_summary"] (see app.core.sessions).
+
+    def build_messages(self, system_prompt: str, prompt: str, context: Optional[Dict] = None) -> List[Dict[str, str]]:
+        """Chat messages: system prompt, the session's earlier turns, then the new prompt."""
+        context = context or {}
+        if context.get("conversation_summary"):
+            system_prompt += f"\n\nEARLIER IN THIS CONVERSATION:\n{context['conversation_summary']}"
+        return [
+            {"role": "system", "content": system_prompt},
+            *(context.get("history") or []),
+            {"role": "user", "content": prompt},
+        ]
+
+    def get_history_context(self, context: Optional[Dict] = None) -> str:
+        """The session's earlier turns as a prompt section, for single-prompt backends (Gemini)."""
+        context = context or {}
+        lines = [context["conversation_summary"]] if context.get("conversation_summary") else []
+        lines += [f"{msg['role']}: {msg['content']}" for msg in context.get("history") or []]
+        return "\n\nCONVERSATION SO FAR:\n" + "\n".join(lines) if lines else ""
 
 
 # ==================== PATIENT AGENT ====================
@@ -133,11 +198,6 @@ class PatientAgent(BaseCareBridgeAgent):
     
     def __init__(self):
         super().__init__(role="patient")
-        self.parser_tool = ReportParserTool()
-        self.explainer_tool = ExplanationTool()
-        self.rag_tool = MedicalRAGTool()
-        self.safety_tool = SafetyCheckerTool()
-        
         # Patient-specific configuration
         self.max_complexity = "simple"
         self.enable_guardrails = True
@@ -196,9 +256,6 @@ class PatientAgent(BaseCareBridgeAgent):
         if not self.ai_enabled:
             return self._get_patient_fallback_response(prompt, context)
         
-        # Clear history for fresh context per request
-        self.conversation_history = []
-        
         try:
             # Build messages for HuggingFace API
             system_prompt = self.get_system_prompt()
@@ -206,30 +263,26 @@ class PatientAgent(BaseCareBridgeAgent):
             # Add report context to system prompt
             if context and context.get('report_data'):
                 system_prompt += f"\n\nREPORT DATA TO ANALYZE:\n{context.get('report_data', '')}"
+            if context and context.get('medical_knowledge'):
+                system_prompt += f"\n\nTRUSTED MEDICAL REFERENCE (for background only):\n{context.get('medical_knowledge')}"
             
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ]
+            messages = self.build_messages(system_prompt, prompt, context)
             
             # Use HuggingFace API (primary) or Gemini (fallback)
             if self.use_hf:
                 result = call_huggingface_chat_sync(messages, max_tokens=600)
             else:
                 # Gemini fallback
-                full_prompt = system_prompt + f"\n\nPATIENT QUESTION:\n{prompt}"
-                response = self.client.models.generate_content(
-                    model=self.model_id,
-                    contents=full_prompt
-                )
-                result = response.text
+                full_prompt = system_prompt + self.get_history_context(context) + f"\n\nPATIENT QUESTION:\n{prompt}"
+                result = self._generate_gemini(full_prompt)
             
             if not result:
                 return self._get_patient_fallback_response(prompt, context)
             
             # Apply safety check
             if self.enable_guardrails:
-                result = self._apply_safety_guardrails(result)
+                with telemetry.span("guardrails"):
+                    result = self._apply_safety_guardrails(result)
             
             return result
             
@@ -298,11 +351,6 @@ class ClinicianAgent(BaseCareBridgeAgent):
     
     def __init__(self):
         super().__init__(role="clinician")
-        self.parser_tool = ReportParserTool()
-        self.explainer_tool = ExplanationTool()
-        self.rag_tool = MedicalRAGTool()
-        self.safety_tool = SafetyCheckerTool()
-        
         # Clinician-specific configuration
         self.max_complexity = "advanced"
         self.enable_guardrails = False  # Less restrictive for professionals
@@ -369,9 +417,6 @@ class ClinicianAgent(BaseCareBridgeAgent):
         if not self.ai_enabled:
             return self._get_clinician_fallback_response(prompt, context)
         
-        # Clear history for fresh context per request
-        self.conversation_history = []
-        
         try:
             # Build messages for HuggingFace API
             system_prompt = self.get_system_prompt()
@@ -382,29 +427,25 @@ class ClinicianAgent(BaseCareBridgeAgent):
                     system_prompt += f"\n\nCLINICAL DATA:\n{context.get('report_data', '')}"
                 if context.get('patient_history'):
                     system_prompt += f"\n\nPATIENT HISTORY:\n{context.get('patient_history')}"
+                if context.get('medical_knowledge'):
+                    system_prompt += f"\n\nGUIDELINE EXCERPTS:\n{context.get('medical_knowledge')}"
             
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ]
+            messages = self.build_messages(system_prompt, prompt, context)
             
             # Use HuggingFace API (primary) or Gemini (fallback)
             if self.use_hf:
                 result = call_huggingface_chat_sync(messages, max_tokens=700)
             else:
                 # Gemini fallback
-                full_prompt = system_prompt + f"\n\nCLINICAL QUERY:\n{prompt}"
-                response = self.client.models.generate_content(
-                    model=self.model_id,
-                    contents=full_prompt
-                )
-                result = response.text
+                full_prompt = system_prompt + self.get_history_context(context) + f"\n\nCLINICAL QUERY:\n{prompt}"
+                result = self._generate_gemini(full_prompt)
             
             if not result:
                 return self._get_clinician_fallback_response(prompt, context)
             
             # Add professional disclaimer
-            result = self._add_clinical_disclaimer(result)
+            with telemetry.span("guardrails"):
+                result = self._add_clinical_disclaimer(result)
             
             return result
             
@@ -441,12 +482,26 @@ class ClinicianAgent(BaseCareBridgeAgent):
         return response
     
     def analyze_trends(self, historical_data: List[Dict]) -> str:
-        """Analyze trends in lab results over time (clinician-specific feature)"""
+        """Analyze trends in lab results over time (clinician-specific feature)
+        
+        historical_data: readings as dicts with analyte, value, date and optional
+        unit/low/high/report_id (the rows kept by app.db.analyte_store).
+        """
         if not historical_data:
             return "No historical data available for trend analysis."
         
-        # This would implement trend analysis logic
-        return "Trend analysis feature - to be implemented with historical data"
+        trends = PatientAnalytes.from_records(historical_data).trends()
+        lines = []
+        for t in trends.values():
+            line = f"{t['analyte']}: {t['latest_value']:g} {t['unit']} on {t['last_date']} (n={t['count']})".replace("  ", " ")
+            if t["percent_change"] is not None:
+                line += f", {t['percent_change']:+.1f}% since {t['first_date']}"
+            if t["slope_per_year"] is not None:
+                line += f", slope {t['slope_per_year']:+.3g}/yr"
+            if t["current_out_of_range_streak"]:
+                line += f", out of range for the last {t['current_out_of_range_streak']} result(s)"
+            lines.append(line)
+        return "\n".join(lines) if lines else "No recognizable lab values found for trend analysis."
 
 
 # ==================== SUPERVISORY AGENT ====================
@@ -525,9 +580,13 @@ def create_supervisory_agent() -> SupervisoryAgent:
     return SupervisoryAgent()
 
 
-# ==================== SINGLETON INSTANCES ====================
-# Default patient agent for backward compatibility
-root_agent = PatientAgent()
+# ==================== SHARED INSTANCES ====================
+# The supervisory agent is built on first use by app.core.registry
+# (registry.get_supervisory_agent()), never at import time.
 
-# Supervisory agent for orchestration
-supervisory_agent = SupervisoryAgent()
\ No newline at end of file
+def __getattr__(name: str):
+    # Default patient agent for backward compatibility, created on first access.
+    if name == "root_agent":
+        globals()["root_agent"] = PatientAgent()
+        return globals()["root_agent"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
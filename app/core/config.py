@@ -2,6 +2,8 @@ from pydantic_settings import BaseSettings
 import os
 from dotenv import load_dotenv
 
+# Every entry point (the API, app.db.index_writer, the app.jobs CLIs) imports
+# this module first, so their os.getenv knobs all see .env.
 load_dotenv()
 
 class Settings(BaseSettings):
@@ -10,8 +12,8 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     
     # AI Model Settings
-    GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY", "")
-    HF_API_KEY: str = os.getenv("HF_API_KEY", "")
+    GOOGLE_API_KEY: str = ""
+    HF_API_KEY: str = ""
     AGENT_MODEL: str = "gemini-2.5-flash"
     PARSER_MODEL_ID: str = "Qwen/Qwen3-VL-30B-A3B-Instruct"
     THINKER_MODEL_ID: str = "miromind-ai/MiroThinker-v1.5-235B"
@@ -21,12 +23,19 @@ class Settings(BaseSettings):
     VECTOR_DB_DIR: str = "data/vector_db"
     MEDICAL_KNOWLEDGE_DIR: str = "data/raw_knowledge" # Where the PDF guidelines live
 
+    # RAG chunking: shared by uploads, knowledge ingestion and reindex_reports,
+    # so content-hash reuse keeps matching across them
+    CHUNK_CHARS: int = 900
+    CHUNK_OVERLAP: int = 150
+
     class Config:
         case_sensitive = True
+        extra = "ignore"
 
-settings = Settings()
+    def ensure_dirs(self) -> None:
+        """Create the storage directories (called from the app lifespan and jobs)."""
+        os.makedirs(self.UPLOAD_DIR, exist_ok=True)
+        os.makedirs(self.VECTOR_DB_DIR, exist_ok=True)
+        os.makedirs(self.MEDICAL_KNOWLEDGE_DIR, exist_ok=True)
 
-# Ensure directories exist
-os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-os.makedirs(settings.VECTOR_DB_DIR, exist_ok=True)
-os.makedirs(settings.MEDICAL_KNOWLEDGE_DIR, exist_ok=True)
+settings = Settings()
@@ -0,0 +1,190 @@
+"""
+Lazy service registry
+=====================
+Heavy objects (agents and their tools, the Gemini / Hugging Face clients, the
+SentenceTransformer embedder and optional reranker, FAISS collections, the PDF
+extraction process pool) are built on first use, not at import time, so
+`import main` stays cheap and replicas come up fast. The FastAPI lifespan (or
+the first request) calls `get()`; each factory runs once and its load time is
+kept for diagnostics.
+
+`start_warm_up()` loads the embedder, both FAISS collections, the PDF pool and
+the agents on a background thread at startup; `readiness()` backs the /readyz
+probe.
+
+    from app.core import registry
+    registry.get("supervisory_agent").route_request(...)
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict
+
+_FACTORIES: Dict[str, Callable[[], Any]] = {}
+_INSTANCES: Dict[str, Any] = {}
+_LOAD_SECONDS: Dict[str, float] = {}
+_LOCK = threading.RLock()
+
+
+def register(name: str, factory: Callable[[], Any]) -> None:
+    """Register (or replace) the factory for a named service."""
+    with _LOCK:
+        _FACTORIES[name] = factory
+        _INSTANCES.pop(name, None)
+        _LOAD_SECONDS.pop(name, None)
+
+
+def get(name: str) -> Any:
+    """Return the service, building it on first use."""
+    instance = _INSTANCES.get(name)
+    if instance is not None:
+        return instance
+    with _LOCK:
+        if name not in _INSTANCES:
+            if name not in _FACTORIES:
+                raise KeyError(f"No service registered under '{name}'")
+            started = time.perf_counter()
+            _INSTANCES[name] = _FACTORIES[name]()
+            _LOAD_SECONDS[name] = round(time.perf_counter() - started, 3)
+        return _INSTANCES[name]
+
+
+def is_loaded(name: str) -> bool:
+    return name in _INSTANCES
+
+
+def load_times() -> Dict[str, float]:
+    """Seconds each loaded service took to build."""
+    return dict(_LOAD_SECONDS)
+
+
+# ---------- built-in services ----------
+# Imports live inside the factories so that registering costs nothing.
+
+def _supervisory_agent():
+    from app.core.agent import create_supervisory_agent
+    agent = create_supervisory_agent()
+    print("✓ Multi-Agent System Initialized (Patient Agent + Clinician Agent + Supervisory Agent)")
+    return agent
+
+
+def _hf_client():
+    from app.core.config import settings
+    api_key = settings.HF_API_KEY or os.getenv("HF_API_KEY", "")
+    if not api_key:
+        return False  # cached "not configured" marker; see get_hf_client()
+    from huggingface_hub import AsyncInferenceClient
+    return AsyncInferenceClient(api_key=api_key, timeout=60)
+
+
+def _embedder():
+    from app.db.vector_store import embed_texts, get_embedder
+    embedder = get_embedder()
+    embed_texts(["warm-up"])  # first encode initializes tokenizer/kernels
+    return embedder
+
+
+def _reranker():
+    from app.db import reranker
+    if not reranker.RERANK_ENABLED:
+        return False  # cached "disabled" marker
+    model = reranker.get_reranker()
+    reranker.score_pairs("warm-up", ["warm-up"], budget_ms=60_000)
+    return model
+
+
+def _report_index():
+    from app.db.vector_store import RAG_RETRIEVAL_MODE, report_collection
+    collection = report_collection()
+    collection.load()
+    if RAG_RETRIEVAL_MODE != "vector":
+        collection.keyword_index()
+    return collection
+
+
+def _knowledge_index():
+    from app.db.vector_store import RAG_RETRIEVAL_MODE, knowledge_collection
+    collection = knowledge_collection()
+    collection.load()
+    if RAG_RETRIEVAL_MODE != "vector":
+        collection.keyword_index()
+    return collection
+
+
+def _pdf_pool():
+    from app.utils import pdf_text
+    if pdf_text.PDF_EXTRACT_WORKERS <= 0:
+        return False  # cached "extract on a thread" marker
+    return pdf_text.warm_pool()
+
+
+def _local_ocr():
+    from app.utils import local_ocr
+    if os.getenv("HF_OCR_MODE", "vlm").strip().lower() not in local_ocr.LOCAL_OCR_MODES or not local_ocr.available():
+        return False  # cached "remote OCR only" marker
+    return local_ocr.warm_pool()
+
+
+register("supervisory_agent", _supervisory_agent)
+register("hf_client", _hf_client)
+register("embedder", _embedder)
+register("reranker", _reranker)
+register("report_index", _report_index)
+register("knowledge_index", _knowledge_index)
+register("pdf_pool", _pdf_pool)
+register("local_ocr", _local_ocr)
+
+
+# ---------- warm-up / readiness ----------
+
+WARMUP_SERVICES = (
+    "embedder", "reranker", "report_index", "knowledge_index", "pdf_pool", "local_ocr", "supervisory_agent"
+)
+_WARMUP: Dict[str, Any] = {"state": "idle", "seconds": None, "error": None}
+
+
+def warm_up(names=WARMUP_SERVICES) -> None:
+    """Load the given services now, recording progress for readiness()."""
+    _WARMUP.update(state="running", seconds=None, error=None)
+    started = time.perf_counter()
+    try:
+        for name in names:
+            get(name)
+        _WARMUP["state"] = "ready"
+        print(f"✓ Warm-up finished in {time.perf_counter() - started:.2f}s {load_times()}")
+    except Exception as e:
+        _WARMUP.update(state="failed", error=str(e))
+        print(f"⚠ Warm-up failed: {e}")
+    finally:
+        _WARMUP["seconds"] = round(time.perf_counter() - started, 3)
+
+
+def start_warm_up() -> threading.Thread:
+    thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def skip_warm_up() -> None:
+    """Lazy mode: everything loads on first use and readiness does not wait."""
+    _WARMUP["state"] = "disabled"
+
+
+def readiness() -> Dict[str, Any]:
+    return {
+        "ready": _WARMUP["state"] in ("ready", "disabled"),
+        "state": _WARMUP["state"],
+        "warmup_seconds": _WARMUP["seconds"],
+        "error": _WARMUP["error"],
+        "load_seconds": load_times(),
+    }
+
+
+def get_supervisory_agent():
+    return get("supervisory_agent")
+
+
+def get_hf_client():
+    """AsyncInferenceClient, or None when no HF_API_KEY is configured."""
+    return get("hf_client") or None
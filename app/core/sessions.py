@@ -0,0 +1,165 @@
+"""
+Per-session conversation memory
+===============================
+Chat history keyed by (user, report, role), so a follow-up question carries
+the previous turns without the client resending them, and concurrent users
+never see each other's conversation (the agents themselves are shared,
+stateless singletons).
+
+Each session keeps the last SESSION_MAX_TURNS question/answer pairs verbatim
+(answers stripped of HTML and clipped to SESSION_TURN_CHARS) in a ring
+buffer; turns that fall out of it are folded into a rolling extractive
+summary capped at SESSION_SUMMARY_CHARS. A session therefore costs a bounded
+few KB no matter how long the conversation runs. Sessions idle for longer
+than SESSION_TTL_SECONDS are evicted, and at most SESSION_MAX_SESSIONS are
+kept (least recently used go first).
+
+    context.update(sessions.session_store.context(user_id, report_id, role))
+    ...
+    sessions.session_store.record(user_id, report_id, role, question, answer)
+
+Sessions live in process memory: with several workers, route a user to the
+same worker (sticky sessions) or they start a fresh conversation elsewhere.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "1800"))
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "4"))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+SESSION_TURN_CHARS = int(os.getenv("SESSION_TURN_CHARS", "600"))
+SESSION_SUMMARY_CHARS = int(os.getenv("SESSION_SUMMARY_CHARS", "800"))
+
+_TAG = re.compile(r"<[^>]+>")
+_SPACE = re.compile(r"\s+")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+SessionKey = Tuple[str, str, str]
+
+
+def _compact(text: str, limit: int) -> str:
+    """Plain text of an (HTML) answer, whitespace-collapsed and clipped to `limit` chars."""
+    text = _SPACE.sub(" ", _TAG.sub(" ", text or "")).strip()
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + " …"
+
+
+def _first_sentence(text: str, limit: int = 160) -> str:
+    return _compact(_SENTENCE.split(text, 1)[0], limit)
+
+
+class Session:
+    """Bounded history of one conversation: recent turns plus a summary of older ones."""
+
+    __slots__ = ("turns", "summary", "last_used", "total_turns")
+
+    def __init__(self, max_turns: int = SESSION_MAX_TURNS):
+        self.turns: Deque[Tuple[str, str]] = deque(maxlen=max(1, max_turns))
+        self.summary = ""
+        self.last_used = time.monotonic()
+        self.total_turns = 0
+
+    def add_turn(self, question: str, answer: str) -> None:
+        if len(self.turns) == self.turns.maxlen:
+            self._fold(*self.turns[0])
+        self.turns.append((_compact(question, SESSION_TURN_CHARS), _compact(answer, SESSION_TURN_CHARS)))
+        self.total_turns += 1
+
+    def _fold(self, question: str, answer: str) -> None:
+        """Append an evicted turn to the rolling summary, dropping the oldest entries past the cap."""
+        entry = f"Asked: {_first_sentence(question)} Answered: {_first_sentence(answer)}"
+        summary = f"{self.summary}\n{entry}" if self.summary else entry
+        while len(summary) > SESSION_SUMMARY_CHARS and "\n" in summary:
+            summary = summary.split("\n", 1)[1]
+        self.summary = summary[-SESSION_SUMMARY_CHARS:]
+
+    def messages(self) -> List[Dict[str, str]]:
+        """Recent turns as chat messages, oldest first."""
+        out: List[Dict[str, str]] = []
+        for question, answer in self.turns:
+            out.append({"role": "user", "content": question})
+            out.append({"role": "assistant", "content": answer})
+        return out
+
+    def context(self) -> Dict:
+        """Keys merged into an agent context: "history" and "conversation_summary"."""
+        return {"history": self.messages(), "conversation_summary": self.summary}
+
+
+class SessionStore:
+    """Thread-safe LRU of Sessions with idle-TTL eviction."""
+
+    def __init__(
+        self,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        max_sessions: int = SESSION_MAX_SESSIONS,
+        max_turns: int = SESSION_MAX_TURNS,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self._sessions: "OrderedDict[SessionKey, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        # Least recently used first, so expired sessions are always at the front.
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if now - session.last_used <= self.ttl_seconds and len(self._sessions) <= max(1, self.max_sessions):
+                break
+            del self._sessions[key]
+
+    def get(self, user_id: str, report_id: str, role: str) -> Session:
+        """The session for this conversation, created if missing; marks it as used."""
+        key = (user_id, report_id, role)
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = Session(self.max_turns)
+            else:
+                self._sessions.move_to_end(key)
+            session.last_used = now
+            self._evict(now)
+            return session
+
+    def context(self, user_id: str, report_id: str, role: str) -> Dict:
+        """Snapshot of the conversation for an agent context (see Session.context)."""
+        session = self.get(user_id, report_id, role)
+        with self._lock:
+            return session.context()
+
+    def record(self, user_id: str, report_id: str, role: str, question: str, answer: str) -> Session:
+        """Append a question/answer turn to the conversation."""
+        session = self.get(user_id, report_id, role)
+        with self._lock:
+            session.add_turn(question, answer)
+        return session
+
+    def drop_report(self, report_id: str, user_id: Optional[str] = None) -> int:
+        """Forget the conversations about a report (only `user_id`'s, if given); returns how many."""
+        with self._lock:
+            keys = [key for key in self._sessions if key[1] == report_id and user_id in (None, key[0])]
+            for key in keys:
+                del self._sessions[key]
+        return len(keys)
+
+    def clear(self, user_id: Optional[str] = None) -> int:
+        """Drop all sessions, or only those of `user_id`."""
+        with self._lock:
+            keys = [key for key in self._sessions if user_id is None or key[0] == user_id]
+            for key in keys:
+                del self._sessions[key]
+        return len(keys)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+session_store = SessionStore()
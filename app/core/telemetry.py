@@ -0,0 +1,178 @@
+"""
+Request timing spans
+====================
+Per-stage timings (file write, PDF extract, render, OCR, chunk, embed, FAISS
+search, store lookup, LLM calls, guardrails, ...) recorded as Prometheus
+histograms and, for the request that triggered them, collected in a context
+variable so the HTTP middleware can return them in a `Server-Timing` header.
+
+    with telemetry.span("embed"):
+        vecs = model.encode(texts)
+
+    @telemetry.timed("ocr_page")
+    async def call_hf_ocr(image_bytes, mime): ...
+
+LLM calls go through `record_llm()`, which also counts prompt/completion
+tokens per model. `/metrics` serves everything in the Prometheus text format;
+with several workers set PROMETHEUS_MULTIPROC_DIR so they are aggregated.
+"""
+
+import contextvars
+import functools
+import inspect
+import os
+import re
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, List, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+
+# Add a Server-Timing header with the request's stage timings (visible in browser dev tools).
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0").strip().lower() in {"1", "true", "yes"}
+
+_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+
+REQUEST_SECONDS = Histogram(
+    "carebridge_request_seconds", "HTTP request latency", ["method", "route", "status"], buckets=_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    "carebridge_stage_seconds", "Time spent in each pipeline stage", ["stage"], buckets=_BUCKETS
+)
+LLM_SECONDS = Histogram(
+    "carebridge_llm_seconds", "LLM / VLM call latency", ["model", "outcome"], buckets=_BUCKETS
+)
+LLM_TOKENS = Counter("carebridge_llm_tokens", "LLM tokens by model", ["model", "kind"])
+OCR_PAGES = Counter(
+    "carebridge_ocr_pages", "OCR'd images by engine (local, escalated from local, vlm, trocr)", ["engine"]
+)
+EMBEDDINGS = Counter(
+    "carebridge_chunk_embeddings", "Chunks upserted into a collection, by whether the embedding was reused or computed",
+    ["collection", "outcome"],
+)
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+_SPANS: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "carebridge_spans", default=None
+)
+
+
+def _add(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    spans = _SPANS.get()
+    if spans is not None:
+        spans.append((stage, seconds))
+
+
+@contextmanager
+def span(stage: str):
+    """Time the enclosed block as `stage`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _add(stage, time.perf_counter() - started)
+
+
+def timed(stage: str) -> Callable:
+    """Decorator form of span(), for plain and async functions."""
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record_llm(
+    model: str,
+    seconds: float,
+    prompt_tokens: Optional[int] = None,
+    completion_tokens: Optional[int] = None,
+    ok: bool = True,
+    stage: Optional[str] = "llm",
+) -> None:
+    """One LLM call: latency per model/outcome, token counts, and a `stage` span for the request.
+
+    Pass stage=None when the caller already times the call under its own span.
+    """
+    LLM_SECONDS.labels(model, "ok" if ok else "error").observe(seconds)
+    if prompt_tokens:
+        LLM_TOKENS.labels(model, "prompt").inc(prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.labels(model, "completion").inc(completion_tokens)
+    if stage:
+        _add(stage, seconds)
+
+
+def record_llm_usage(model: str, seconds: float, data: Any, ok: bool = True, stage: Optional[str] = "llm") -> None:
+    """record_llm() from an OpenAI-compatible response body ({"usage": {...}})."""
+    usage = (data.get("usage") if isinstance(data, dict) else None) or {}
+    record_llm(model, seconds, usage.get("prompt_tokens"), usage.get("completion_tokens"), ok=ok, stage=stage)
+
+
+def count_ocr(engine: str) -> None:
+    OCR_PAGES.labels(engine).inc()
+
+
+def count_embeddings(collection: str, reused: int, computed: int) -> None:
+    EMBEDDINGS.labels(collection, "reused").inc(reused)
+    EMBEDDINGS.labels(collection, "computed").inc(computed)
+
+
+def in_context(fn: Callable) -> Callable:
+    """Bind `fn` to the caller's context, so spans recorded on a worker thread count for this request."""
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+# ---------- per-request collection ----------
+
+def start_request():
+    """Begin collecting spans for the current request; returns (spans, token)."""
+    spans: List[Tuple[str, float]] = []
+    return spans, _SPANS.set(spans)
+
+
+def end_request(token, method: str, route: str, status: int, seconds: float) -> None:
+    REQUEST_SECONDS.labels(method, route, str(status)).observe(seconds)
+    _SPANS.reset(token)
+
+
+def server_timing(spans: List[Tuple[str, float]], total_seconds: float) -> str:
+    """Server-Timing header value; repeated stages (e.g. OCR per page) are summed with a count."""
+    totals: "OrderedDict[str, List[float]]" = OrderedDict()
+    for stage, seconds in spans:
+        entry = totals.setdefault(stage, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+    parts = []
+    for stage, (seconds, count) in totals.items():
+        name = re.sub(r"[^A-Za-z0-9_-]", "_", stage)
+        part = f"{name};dur={seconds * 1000:.1f}"
+        if count > 1:
+            part += f';desc="{count}x"'
+        parts.append(part)
+    parts.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def render_metrics() -> bytes:
+    """Prometheus exposition of this process, or of all workers in multiprocess mode."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
@@ -0,0 +1,248 @@
+import hashlib
+import io
+import os
+import threading
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.db.vector_store import _lock_file, _stat, _unlock_file
+
+# Columnar per-patient store of lab readings, so trend queries never touch
+# PDFs, the vector index or the LLM. Each analyte is a set of parallel arrays
+# (day, value, reference low/high, unit, report id) kept sorted by day and
+# persisted as one .npz file per patient under data/analytes/. Every API
+# worker keeps its own cache, re-read when the file changes; writes re-read
+# the file under a cross-process lock, so two workers recording reports for
+# the same patient never drop each other's rows.
+
+ANALYTE_DIR = os.path.join("data", "analytes")
+
+_EPOCH = date(1970, 1, 1)
+_COLUMNS = ("days", "values", "low", "high", "units", "report_ids")
+
+
+def _to_day(value) -> int:
+    """Days since epoch for an ISO date/datetime string or date object."""
+    if isinstance(value, datetime):
+        value = value.date()
+    elif isinstance(value, str):
+        value = datetime.fromisoformat(value[:19]).date() if "T" in value else date.fromisoformat(value[:10])
+    return (value - _EPOCH).days
+
+
+def _from_day(day: int) -> str:
+    return date.fromordinal(_EPOCH.toordinal() + int(day)).isoformat()
+
+
+def _empty_series() -> Dict[str, np.ndarray]:
+    return {
+        "days": np.zeros(0, dtype="int32"),
+        "values": np.zeros(0, dtype="float64"),
+        "low": np.zeros(0, dtype="float64"),
+        "high": np.zeros(0, dtype="float64"),
+        "units": np.zeros(0, dtype="U16"),
+        "report_ids": np.zeros(0, dtype="U64"),
+    }
+
+
+class PatientAnalytes:
+    """All analyte time series for a single patient."""
+
+    def __init__(self, series: Optional[Dict[str, Dict[str, np.ndarray]]] = None):
+        self.series: Dict[str, Dict[str, np.ndarray]] = series or {}
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> "PatientAnalytes":
+        """Build series from dicts with analyte, value, date and optional unit/low/high/report_id."""
+        table = cls()
+        for rec in records:
+            table.add_readings(str(rec.get("report_id", "")), rec["date"], [rec])
+        return table
+
+    def add_readings(self, report_id: str, when, readings: List[Dict]) -> int:
+        """Insert one report's readings at `when`, keeping each series sorted by day."""
+        day = _to_day(when)
+        added = 0
+        for r in readings:
+            key = r.get("analyte")
+            if not key:
+                continue
+            s = self.series.setdefault(key, _empty_series())
+            pos = int(np.searchsorted(s["days"], day, side="right"))
+            row = {
+                "days": day,
+                "values": float(r["value"]),
+                "low": np.nan if r.get("low") is None else float(r["low"]),
+                "high": np.nan if r.get("high") is None else float(r["high"]),
+                "units": r.get("unit") or "",
+                "report_ids": report_id,
+            }
+            for col in _COLUMNS:
+                s[col] = np.insert(s[col], pos, row[col])
+            added += 1
+        return added
+
+    def remove_report(self, report_id: str) -> int:
+        return self.remove_reports([report_id])
+
+    def remove_reports(self, report_ids: Iterable[str]) -> int:
+        ids = np.asarray(list(report_ids))
+        if ids.size == 0:
+            return 0
+        removed = 0
+        for key in list(self.series):
+            s = self.series[key]
+            keep = ~np.isin(s["report_ids"], ids)
+            removed += int((~keep).sum())
+            if not keep.all():
+                for col in _COLUMNS:
+                    s[col] = s[col][keep]
+            if s["days"].size == 0:
+                del self.series[key]
+        return removed
+
+    def trend(self, analyte: str) -> Optional[Dict]:
+        """Deltas, slope, percent change and out-of-range streaks for one analyte."""
+        s = self.series.get(analyte)
+        if s is None or s["days"].size == 0:
+            return None
+        days = s["days"].astype("float64")
+        values = s["values"]
+        n = values.size
+
+        deltas = np.diff(values)
+        slope_per_year = None
+        if n >= 2 and days[-1] > days[0]:
+            # Closed-form least squares slope, in units per year.
+            x = days - days.mean()
+            slope_per_year = float((x * (values - values.mean())).sum() / (x * x).sum() * 365.25)
+        pct_change = None
+        if n >= 2 and values[0] != 0:
+            pct_change = float((values[-1] - values[0]) / abs(values[0]) * 100.0)
+
+        # NaN reference bounds compare False, i.e. "not out of range".
+        out = (values < s["low"]) | (values > s["high"])
+        edges = np.diff(np.concatenate(([0], out.astype("int8"), [0])))
+        runs = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+
+        return {
+            "analyte": analyte,
+            "unit": str(s["units"][-1]),
+            "count": int(n),
+            "first_date": _from_day(s["days"][0]),
+            "last_date": _from_day(s["days"][-1]),
+            "latest_value": float(values[-1]),
+            "last_delta": float(deltas[-1]) if n >= 2 else None,
+            "deltas": deltas.round(4).tolist(),
+            "slope_per_year": round(slope_per_year, 4) if slope_per_year is not None else None,
+            "percent_change": round(pct_change, 2) if pct_change is not None else None,
+            "out_of_range_count": int(out.sum()),
+            "longest_out_of_range_streak": int(runs.max()) if runs.size else 0,
+            "current_out_of_range_streak": int(runs[-1]) if runs.size and out[-1] else 0,
+            "points": [
+                {"date": _from_day(d), "value": float(v), "report_id": str(rid)}
+                for d, v, rid in zip(s["days"], values, s["report_ids"])
+            ],
+        }
+
+    def trends(self, analytes: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        keys = list(analytes) if analytes else sorted(self.series)
+        out = {}
+        for key in keys:
+            t = self.trend(key)
+            if t:
+                out[key] = t
+        return out
+
+    def to_npz(self, path: str) -> None:
+        arrays = {f"{key}.{col}": s[col] for key, s in self.series.items() for col in _COLUMNS}
+        buf = io.BytesIO()
+        np.savez(buf, **arrays)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(buf.getvalue())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def from_npz(cls, path: str) -> "PatientAnalytes":
+        series: Dict[str, Dict[str, np.ndarray]] = {}
+        with np.load(path, allow_pickle=False) as data:
+            for name in data.files:
+                key, col = name.rsplit(".", 1)
+                series.setdefault(key, {})[col] = data[name]
+        return cls(series)
+
+
+class AnalyteStore:
+    """Per-patient PatientAnalytes tables, cached in memory and persisted on write."""
+
+    def __init__(self, root: str = ANALYTE_DIR):
+        self.root = root
+        self._tables: Dict[str, Tuple[tuple, PatientAnalytes]] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, patient_id: str) -> str:
+        digest = hashlib.sha1(patient_id.encode("utf-8")).hexdigest()[:20]
+        return os.path.join(self.root, f"{digest}.npz")
+
+    def get(self, patient_id: str) -> PatientAnalytes:
+        """The patient's table, re-read if another worker has rewritten it since it was cached."""
+        path = self._path(patient_id)
+        sig = _stat(path)
+        if sig is None:
+            # Unknown patient: not cached, so lookups of arbitrary ids can't grow the cache.
+            with self._lock:
+                self._tables.pop(patient_id, None)
+            return PatientAnalytes()
+        with self._lock:
+            cached = self._tables.get(patient_id)
+            if cached is not None and cached[0] == sig:
+                return cached[1]
+        table = PatientAnalytes.from_npz(path)
+        with self._lock:
+            self._tables[patient_id] = (sig, table)
+        return table
+
+    def _update(self, patient_id: str, change) -> int:
+        """Apply `change(table) -> count` to the on-disk table under the file lock and persist if it changed."""
+        path = self._path(patient_id)
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock:
+            lock_file = _lock_file(path + ".lock")
+            try:
+                # A fresh copy: readers may still hold the cached table.
+                table = PatientAnalytes.from_npz(path) if os.path.exists(path) else PatientAnalytes()
+                count = change(table)
+                if count:
+                    table.to_npz(path)
+                    self._tables[patient_id] = (_stat(path), table)
+            finally:
+                _unlock_file(lock_file)
+        return count
+
+    def record_report(self, patient_id: str, report_id: str, when, readings: List[Dict]) -> int:
+        """Replace the readings of `report_id` for this patient and persist."""
+        added = 0
+
+        def change(table: PatientAnalytes) -> int:
+            nonlocal added
+            removed = table.remove_report(report_id)
+            added = table.add_readings(report_id, when, readings)
+            return removed + added
+
+        self._update(patient_id, change)
+        return added
+
+    def remove_report(self, patient_id: str, report_id: str) -> int:
+        return self.remove_reports(patient_id, [report_id])
+
+    def remove_reports(self, patient_id: str, report_ids: Iterable[str]) -> int:
+        """Drop the readings of several reports and persist once."""
+        ids = list(report_ids)
+        return self._update(patient_id, lambda table: table.remove_reports(ids))
+
+
+# Singleton instance
+analyte_store = AnalyteStore()
@@ -0,0 +1,106 @@
+"""
+BM25 keyword index
+==================
+An in-memory inverted index over chunk texts, kept next to each FAISS
+collection. Lab questions often hinge on exact tokens ("MCHC", "RDW CV",
+"eGFR") that sentence embeddings match poorly; BM25 scores them directly.
+`VectorCollection` updates it on every add/remove (and when replaying other
+processes' change logs), and `vector_store.retrieve()` fuses its ranking with
+the FAISS ranking via reciprocal-rank fusion.
+"""
+
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+# Letters/digits runs; decimals stay whole ("5.6") and "a1c"/"hba1c" stay one token.
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+_STOPWORDS = frozenset(
+    "a an and are as at be by do does for from how i in is it me my of on or "
+    "the this to was what when which why with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over integer doc ids (the collection's vector ids)."""
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._doc_terms: Dict[int, Counter] = {}
+        self._doc_len: Dict[int, int] = {}
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._doc_terms
+
+    def doc_ids(self) -> List[int]:
+        return list(self._doc_terms)
+
+    def add(self, doc_id: int, text: str) -> None:
+        if doc_id in self._doc_terms:
+            self.remove(doc_id)
+        terms = Counter(tokenize(text))
+        self._doc_terms[doc_id] = terms
+        self._doc_len[doc_id] = sum(terms.values())
+        self._total_len += self._doc_len[doc_id]
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+
+    def add_many(self, docs: Iterable[Tuple[int, str]]) -> None:
+        for doc_id, text in docs:
+            self.add(doc_id, text)
+
+    def remove(self, doc_id: int) -> None:
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._total_len -= self._doc_len.pop(doc_id)
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[term]
+
+    def search(self, query: str, k: int, only_ids: Optional[Iterable[int]] = None) -> List[Tuple[int, float]]:
+        """Top-k (doc_id, score), optionally restricted to `only_ids`."""
+        n = len(self._doc_terms)
+        if n == 0 or k <= 0:
+            return []
+        allowed = set(only_ids) if only_ids is not None else None
+        avg_len = self._total_len / n or 1.0
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1.0 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting.items():
+                if allowed is not None and doc_id not in allowed:
+                    continue
+                norm = tf + self.k1 * (1.0 - self.b + self.b * self._doc_len[doc_id] / avg_len)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1.0) / norm
+        return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:k]
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60) -> Dict[int, float]:
+    """Fused score per id: sum over rankings of 1 / (k + rank), ranks starting at 1."""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return fused
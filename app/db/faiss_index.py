@@ -0,0 +1,291 @@
+"""
+FAISS index backends
+====================
+Builds the vector index used by the RAG store. The backend is chosen with
+FAISS_INDEX_TYPE (like EMBEDDING_MODEL_NAME selects the embedder):
+
+    flat      exact inner-product scan (default)
+    ivf_flat  inverted file over full vectors          - needs training
+    hnsw      graph index, no training, no deletes
+    ivf_pq    inverted file over product-quantized codes - needs training
+    sq8       scalar-quantized int8 codes (4x smaller)   - needs training
+    sq_fp16   float16 codes (2x smaller, near-lossless)
+    pq        product-quantized codes, FAISS_PQ_M bytes/vector - needs training
+
+The quantized types shrink the index so it fits in RAM on small nodes;
+migrate an existing collection (re-embedding from the stored texts when the
+current codes are lossy) with the rebuild command, and compare footprint,
+latency and recall with benchmarks.ann_benchmark.
+
+Search knobs: FAISS_NPROBE (IVF lists probed per query) and FAISS_EF_SEARCH
+(HNSW candidate list size). FAISS_MMAP=1 opens index files memory-mapped and
+read-only, so several workers share one copy through the OS page cache; the
+files are only ever replaced atomically, never rewritten in place. Indexes
+that need training are created by the rebuild command once there is data to
+train on:
+
+    python -m app.db.faiss_index rebuild --type ivf_flat [--collection knowledge]
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+from typing import Callable, List, Optional
+
+import faiss
+import numpy as np
+
+from app.core.config import settings
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq", "sq8", "sq_fp16", "pq")
+TRAINED_TYPES = {"ivf_flat", "ivf_pq", "sq8", "pq"}
+# Stored codes too coarse to rebuild from; rebuilds re-embed the chunk texts.
+LOSSY_TYPES = {"ivf_pq", "sq8", "pq"}
+
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat").strip().lower()
+FAISS_NLIST = int(os.getenv("FAISS_NLIST", "0"))  # 0 = 4 * sqrt(ntotal)
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+FAISS_EF_CONSTRUCTION = int(os.getenv("FAISS_EF_CONSTRUCTION", "80"))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "16"))  # sub-quantizers; must divide the dimension
+FAISS_PQ_NBITS = int(os.getenv("FAISS_PQ_NBITS", "8"))
+FAISS_MMAP = os.getenv("FAISS_MMAP", "0").strip().lower() in {"1", "true", "yes"}
+
+# Maps the stored vectors / inverted lists instead of copying them to the heap.
+# A mapped index is read-only: adding to it aborts inside FAISS, so writers
+# always work on a heap copy (read_index(path, mmap=False)).
+MMAP_IO_FLAGS = faiss.IO_FLAG_MMAP_IFC
+
+
+def _auto_nlist(n: int) -> int:
+    nlist = FAISS_NLIST or int(4 * math.sqrt(max(n, 1)))
+    return max(1, min(nlist, n)) if n else max(1, nlist)
+
+
+def build_index(
+    dim: int,
+    index_type: Optional[str] = None,
+    train_vectors: Optional[np.ndarray] = None,
+) -> faiss.Index:
+    """Create an empty (trained, if required) ID-mapped index of the given type."""
+    index_type = (index_type or FAISS_INDEX_TYPE).strip().lower()
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type '{index_type}' (expected one of {', '.join(INDEX_TYPES)})")
+
+    if index_type in TRAINED_TYPES and (train_vectors is None or len(train_vectors) == 0):
+        print(f"⚠ FAISS index type '{index_type}' needs training data; using 'flat' until rebuilt")
+        index_type = "flat"
+    elif index_type in ("pq", "ivf_pq") and len(train_vectors) < 2 ** FAISS_PQ_NBITS:
+        # Each sub-quantizer trains 2**nbits centroids; FAISS refuses fewer points.
+        print(
+            f"⚠ FAISS index type '{index_type}' needs at least {2 ** FAISS_PQ_NBITS} training vectors "
+            f"(got {len(train_vectors)}); using 'flat' until rebuilt"
+        )
+        index_type = "flat"
+
+    if index_type == "flat":
+        base = faiss.IndexFlatIP(dim)
+    elif index_type == "hnsw":
+        base = faiss.IndexHNSWFlat(dim, FAISS_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        base.hnsw.efConstruction = FAISS_EF_CONSTRUCTION
+    elif index_type in ("sq8", "sq_fp16"):
+        qtype = faiss.ScalarQuantizer.QT_8bit if index_type == "sq8" else faiss.ScalarQuantizer.QT_fp16
+        base = faiss.IndexScalarQuantizer(dim, qtype, faiss.METRIC_INNER_PRODUCT)
+        if not base.is_trained:
+            base.train(np.ascontiguousarray(train_vectors, dtype="float32"))
+    elif index_type == "pq":
+        base = faiss.IndexPQ(dim, FAISS_PQ_M, FAISS_PQ_NBITS, faiss.METRIC_INNER_PRODUCT)
+        base.train(np.ascontiguousarray(train_vectors, dtype="float32"))
+    else:
+        nlist = _auto_nlist(len(train_vectors))
+        quantizer = faiss.IndexFlatIP(dim)
+        if index_type == "ivf_flat":
+            base = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            base = faiss.IndexIVFPQ(quantizer, dim, nlist, FAISS_PQ_M, FAISS_PQ_NBITS, faiss.METRIC_INNER_PRODUCT)
+        base.train(np.ascontiguousarray(train_vectors, dtype="float32"))
+        # IVF indexes take external ids natively; a hashtable direct map keeps
+        # remove_ids and reconstruct-by-id working without an IDMap wrapper.
+        base.set_direct_map_type(faiss.DirectMap.Hashtable)
+
+    index = ensure_id_mapped(base)
+    apply_search_params(index)
+    return index
+
+
+def ensure_id_mapped(index: faiss.Index) -> faiss.Index:
+    """Wrap indexes that can't store external ids (flat, HNSW) in IndexIDMap2."""
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2, faiss.IndexIVF)):
+        return index
+    return faiss.IndexIDMap2(index)
+
+
+def base_index(index: faiss.Index) -> faiss.Index:
+    """Unwrap IndexIDMap/IndexIDMap2 to the underlying index."""
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def index_type_of(index: faiss.Index) -> str:
+    base = base_index(index)
+    if isinstance(base, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(base, faiss.IndexIVF):
+        return "ivf_flat"
+    if isinstance(base, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(base, faiss.IndexScalarQuantizer):
+        return "sq8" if base.sq.qtype == faiss.ScalarQuantizer.QT_8bit else "sq_fp16"
+    if isinstance(base, faiss.IndexPQ):
+        return "pq"
+    return "flat"
+
+
+def apply_search_params(
+    index: faiss.Index,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+) -> None:
+    """Set query-time knobs (nprobe / efSearch) on the wrapped index, if it has them."""
+    base = base_index(index)
+    if isinstance(base, faiss.IndexIVF):
+        base.nprobe = min(int(nprobe or FAISS_NPROBE), base.nlist)
+    elif isinstance(base, faiss.IndexHNSW):
+        base.hnsw.efSearch = int(ef_search or FAISS_EF_SEARCH)
+
+
+def search_params(
+    index: faiss.Index, sel: Optional[faiss.IDSelector] = None, exhaustive: bool = False
+) -> faiss.SearchParameters:
+    """Per-query parameters carrying an id filter plus the index's current nprobe/efSearch.
+
+    `exhaustive` probes every IVF list / widens the HNSW search to the whole
+    graph, for selectors that keep only a few vectors the ANN walk would miss.
+    """
+    base = base_index(index)
+    if isinstance(base, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=sel, nprobe=base.nlist if exhaustive else base.nprobe)
+    if isinstance(base, faiss.IndexHNSW):
+        ef = max(base.hnsw.efSearch, index.ntotal) if exhaustive else base.hnsw.efSearch
+        return faiss.SearchParametersHNSW(sel=sel, efSearch=ef)
+    return faiss.SearchParameters(sel=sel)
+
+
+def supports_remove(index: faiss.Index) -> bool:
+    return not isinstance(base_index(index), faiss.IndexHNSW)
+
+
+def reconstruct_vectors(index: faiss.Index, ids: List[int]) -> Optional[np.ndarray]:
+    """Read stored vectors back out of the index (None if the backend can't)."""
+    if not ids:
+        return np.zeros((0, index.d), dtype="float32")
+    try:
+        return np.vstack([index.reconstruct(int(i)) for i in ids]).astype("float32")
+    except Exception:
+        return None
+
+
+def rebuild_index(
+    index: faiss.Index,
+    store: dict,
+    index_type: str,
+    embed_fn: Optional[Callable[[List[str]], np.ndarray]] = None,
+) -> faiss.Index:
+    """Build a new index of `index_type` holding every vector in `store`.
+
+    Vectors are reconstructed from the current index when possible (exact for
+    flat/HNSW/IVF-Flat, near-exact for fp16); otherwise the chunk texts are
+    re-embedded with embed_fn.
+    """
+    ids = sorted(int(vid) for vid in store.get("vectors", {}))
+    vecs = reconstruct_vectors(index, ids)
+    if vecs is None or index_type_of(index) in LOSSY_TYPES:
+        # PQ / int8 codes are lossy; go back to the texts rather than compounding error.
+        if embed_fn is None:
+            raise RuntimeError("Vectors cannot be reconstructed from this index; an embedder is required")
+        texts = [store["vectors"][str(i)]["text"] for i in ids]
+        vecs = embed_fn(texts) if texts else np.zeros((0, index.d), dtype="float32")
+
+    new_index = build_index(index.d, index_type, train_vectors=vecs)
+    if ids:
+        new_index.add_with_ids(vecs, np.asarray(ids, dtype="int64"))
+    return new_index
+
+
+def read_index(path: str, mmap: bool = False) -> faiss.Index:
+    """Read an index file, memory-mapped (read-only) or fully into the heap."""
+    index = ensure_id_mapped(faiss.read_index(path, MMAP_IO_FLAGS if mmap else 0))
+    apply_search_params(index)
+    return index
+
+
+def write_index_atomic(index: faiss.Index, path: str) -> None:
+    """Write to a temp file and rename over `path`, so mapped readers never see a partial file."""
+    tmp_path = path + ".tmp"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _load(index_path: str, store_path: str):
+    index = read_index(index_path)
+    with open(store_path, "r", encoding="utf-8") as f:
+        store = json.load(f)
+    return index, store
+
+
+COLLECTION_FILES = {
+    "reports": ("faiss.index", "faiss_store.json"),
+    "knowledge": ("knowledge.index", "knowledge_store.json"),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild/train the FAISS index with a different backend.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rb = sub.add_parser("rebuild", help="Retrain and rebuild the index from the stored vectors")
+    rb.add_argument("--type", default=FAISS_INDEX_TYPE, choices=INDEX_TYPES)
+    info = sub.add_parser("info", help="Show the index type and size")
+    for p in (rb, info):
+        p.add_argument("--collection", default="reports", choices=sorted(COLLECTION_FILES))
+    args = parser.parse_args()
+
+    index_file, store_file = COLLECTION_FILES[args.collection]
+    args.index = os.path.join(settings.VECTOR_DB_DIR, index_file)
+    args.store = os.path.join(settings.VECTOR_DB_DIR, store_file)
+
+    if args.command == "info":
+        index, store = _load(args.index, args.store)
+        print(
+            f"{args.collection}: type={index_type_of(index)} ntotal={index.ntotal} dim={index.d} "
+            f"tombstones={len(store.get('tombstones', []))}"
+        )
+        return
+
+    from app.db.vector_store import collection_by_name
+
+    collection = collection_by_name(args.collection)
+    started = time.perf_counter()
+
+    def _embed(texts: List[str]) -> np.ndarray:
+        return collection.embed(texts, batch_size=128)
+
+    # Under the collection's writer lock; publishing a full-rewrite generation
+    # makes running workers reload it on their next query.
+    size_before = os.path.getsize(args.index) if os.path.exists(args.index) else 0
+    with collection.writer():
+        index, store = collection.load()
+        new_index = rebuild_index(index, store, args.type, embed_fn=_embed)
+        collection.replace_index(new_index)
+    print(
+        f"✓ Rebuilt {index_type_of(index)} -> {index_type_of(new_index)} with {new_index.ntotal} vectors "
+        f"in {time.perf_counter() - started:.2f}s ({args.index}, "
+        f"{size_before / 1e6:.1f} MB -> {os.path.getsize(args.index) / 1e6:.1f} MB)."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Shared index writer
+===================
+All writes to the vector collections go through `add_chunks()` /
+`upsert_group()` / `delete_groups()`. They block (embedding, or an HTTP call
+to the writer), so async handlers call them via run_in_threadpool. By
+default they are applied in-process under the collection's cross-process
+writer lock. For multi-worker deployments run a single writer process that
+owns the index files, and point the API workers at it; the workers then
+only read, and pick up each new generation from the collection's version
+file and change log (see VectorCollection.load):
+
+    python -m app.db.index_writer --port 8765
+    INDEX_WRITER_URL=http://127.0.0.1:8765 uvicorn main:app --workers 4
+
+The writer process also runs bulk knowledge ingestion, index compaction
+(started after deletes once enough vectors are tombstoned) and embedding
+model migrations (started on load), so there is exactly one process
+embedding and writing.
+"""
+
+import argparse
+import os
+from typing import Dict, List, Optional
+
+import httpx
+
+INDEX_WRITER_URL = os.getenv("INDEX_WRITER_URL", "").strip().rstrip("/")
+INDEX_WRITER_TIMEOUT = float(os.getenv("INDEX_WRITER_TIMEOUT", "120"))
+
+
+def _post(path: str, payload: Optional[Dict] = None) -> Dict:
+    with httpx.Client(timeout=INDEX_WRITER_TIMEOUT) as client:
+        resp = client.post(f"{INDEX_WRITER_URL}{path}", json=payload or {})
+        resp.raise_for_status()
+        return resp.json()
+
+
+def _apply_add(collection: str, texts: List[str], metadatas: List[Dict], replace_group: Optional[str]) -> int:
+    from app.db.vector_store import collection_by_name
+
+    if replace_group is not None:
+        return _apply_upsert(collection, replace_group, texts, metadatas)["count"]
+    coll = collection_by_name(collection)
+    # Embed before taking the writer lock so other writers aren't held up by the model.
+    model = coll.embedding_model
+    embeddings = coll.embed(texts) if texts else None
+    with coll.writer():
+        if coll.embedding_model != model:  # a migration swapped the index in the meantime
+            embeddings = None
+        coll.add(texts, metadatas, embeddings=embeddings)
+    return len(texts)
+
+
+def _apply_upsert(collection: str, key: str, texts: List[str], metadatas: List[Dict]) -> Dict:
+    import numpy as np
+
+    from app.core import telemetry
+    from app.db.vector_store import collection_by_name
+    from app.utils.chunking import chunk_hash
+
+    coll = collection_by_name(collection)
+    hashes = [chunk_hash(t) for t in texts]
+    metadatas = [dict(meta, chunk_hash=h) for meta, h in zip(metadatas, hashes)]
+
+    def _embed(wanted: Dict[str, str]) -> Dict[str, np.ndarray]:
+        return dict(zip(wanted, coll.embed(list(wanted.values())))) if wanted else {}
+
+    # Embed the chunks the group doesn't have yet before taking the writer lock.
+    model = coll.embedding_model
+    known = coll.group_hashes(key)
+    embedded = _embed({h: t for h, t in zip(hashes, texts) if h not in known})
+    with coll.writer():
+        if coll.embedding_model != model:  # a migration swapped the index in the meantime
+            embedded = {}
+        pool = coll.group_hashes(key)  # again: another writer may have changed the group
+        reused: List[int] = []
+        reused_meta: List[Dict] = []
+        new: List[int] = []
+        for i, h in enumerate(hashes):
+            if pool.get(h):
+                reused.append(pool[h].pop())
+                reused_meta.append(metadatas[i])
+            else:
+                new.append(i)
+        vanished = [vid for ids in pool.values() for vid in ids]
+        coll.remove(vanished)
+        coll.update_metadata(reused, reused_meta)
+        embedded.update(_embed({hashes[i]: texts[i] for i in new if hashes[i] not in embedded}))
+        if new:
+            coll.add(
+                [texts[i] for i in new],
+                [metadatas[i] for i in new],
+                embeddings=np.vstack([embedded[hashes[i]] for i in new]),
+            )
+    telemetry.count_embeddings(collection, len(reused), len(new))
+    return {"count": len(texts), "added": len(new), "reused": len(reused), "removed": len(vanished)}
+
+
+def _apply_delete(collection: str, keys: List[str]) -> int:
+    from app.db.vector_store import collection_by_name
+    from app.jobs import compact_index
+
+    coll = collection_by_name(collection)
+    # One writer section: a bulk delete saves (and publishes) once.
+    with coll.writer():
+        removed = coll.remove([vid for key in keys for vid in coll.group_ids(key)])
+    if coll.compaction_due():
+        compact_index.run_in_background(collection)
+    return removed
+
+
+def add_chunks(
+    collection: str,
+    texts: List[str],
+    metadatas: List[Dict],
+    replace_group: Optional[str] = None,
+) -> int:
+    """Append chunks to a collection; with `replace_group`, upsert_group() that group instead."""
+    if INDEX_WRITER_URL:
+        return _post("/add", {
+            "collection": collection,
+            "texts": texts,
+            "metadatas": metadatas,
+            "replace_group": replace_group,
+        })["count"]
+    return _apply_add(collection, texts, metadatas, replace_group)
+
+
+def upsert_group(collection: str, key: str, texts: List[str], metadatas: List[Dict]) -> Dict:
+    """Make group `key` hold exactly these chunks, re-embedding only chunks it doesn't already have.
+
+    Chunks are matched by content hash: unchanged ones keep their vector (with
+    the new metadata), vanished ones are deleted. Returns
+    {"count", "added", "reused", "removed"}.
+    """
+    if INDEX_WRITER_URL:
+        return _post("/upsert-group", {"collection": collection, "key": key, "texts": texts, "metadatas": metadatas})
+    return _apply_upsert(collection, key, texts, metadatas)
+
+
+def delete_groups(collection: str, keys: List[str]) -> int:
+    """Remove every chunk whose group field is one of `keys`."""
+    if not keys:
+        return 0
+    if INDEX_WRITER_URL:
+        return _post("/delete-groups", {"collection": collection, "keys": keys})["count"]
+    return _apply_delete(collection, keys)
+
+
+def delete_group(collection: str, key: str) -> int:
+    """Remove every chunk whose group field equals `key`."""
+    return delete_groups(collection, [key])
+
+
+def start_knowledge_ingest() -> Dict:
+    """Start bulk knowledge ingestion where the writes happen; {"started": bool, "status": {...}}."""
+    if INDEX_WRITER_URL:
+        return _post("/ingest-dir")
+    from app.jobs.ingest_knowledge import INGEST_STATUS, run_in_background
+
+    started = run_in_background()
+    return {"started": started, "status": INGEST_STATUS}
+
+
+def knowledge_ingest_status() -> Dict:
+    if INDEX_WRITER_URL:
+        with httpx.Client(timeout=INDEX_WRITER_TIMEOUT) as client:
+            resp = client.get(f"{INDEX_WRITER_URL}/ingest-status")
+            resp.raise_for_status()
+            return resp.json()
+    from app.jobs.ingest_knowledge import INGEST_STATUS
+
+    return INGEST_STATUS
+
+
+# ---------- writer process ----------
+
+def create_app():
+    from contextlib import asynccontextmanager
+
+    from fastapi import FastAPI
+    from pydantic import BaseModel
+
+    from app.core.config import settings
+    from app.db.vector_store import COLLECTIONS, collection_by_name
+    from app.jobs.migrate_embeddings import MIGRATION_STATUS
+
+    class AddRequest(BaseModel):
+        collection: str
+        texts: List[str]
+        metadatas: List[Dict]
+        replace_group: Optional[str] = None
+
+    class UpsertGroupRequest(BaseModel):
+        collection: str
+        key: str
+        texts: List[str]
+        metadatas: List[Dict]
+
+    class DeleteGroupRequest(BaseModel):
+        collection: str
+        key: str
+
+    class DeleteGroupsRequest(BaseModel):
+        collection: str
+        keys: List[str]
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        settings.ensure_dirs()
+        # Loading checks each index's embedding model; this process runs any migration.
+        for name in COLLECTIONS:
+            collection_by_name(name).load()
+        yield
+
+    app = FastAPI(title="CARE-BRIDGE index writer", lifespan=lifespan)
+
+    # Plain `def` handlers run in FastAPI's thread pool; the collection locks serialize them.
+    @app.post("/add")
+    def add(req: AddRequest):
+        return {"count": _apply_add(req.collection, req.texts, req.metadatas, req.replace_group)}
+
+    @app.post("/upsert-group")
+    def upsert(req: UpsertGroupRequest):
+        return _apply_upsert(req.collection, req.key, req.texts, req.metadatas)
+
+    @app.post("/delete-group")
+    def delete(req: DeleteGroupRequest):
+        return {"count": _apply_delete(req.collection, [req.key])}
+
+    @app.post("/delete-groups")
+    def delete_many(req: DeleteGroupsRequest):
+        return {"count": _apply_delete(req.collection, req.keys)}
+
+    @app.post("/ingest-dir")
+    def ingest_dir():
+        from app.jobs.ingest_knowledge import INGEST_STATUS, run_in_background
+
+        return {"started": run_in_background(), "status": INGEST_STATUS}
+
+    @app.get("/ingest-status")
+    def ingest_status():
+        from app.jobs.ingest_knowledge import INGEST_STATUS
+
+        return INGEST_STATUS
+
+    @app.get("/status")
+    def status():
+        out = {}
+        for name in COLLECTIONS:
+            coll = collection_by_name(name)
+            index, _ = coll.load()
+            out[name] = {
+                "generation": coll.generation,
+                "ntotal": int(index.ntotal),
+                "tombstones": coll.tombstones,
+                "embedding_model": coll.embedding_model,
+                "migration": MIGRATION_STATUS.get(name),
+            }
+        return out
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the single index writer process for multi-worker deployments.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    uvicorn.run(create_app(), host=args.host, port=args.port, workers=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Cross-encoder reranking
+=======================
+Optional second stage after retrieval: a small CPU cross-encoder scores each
+(query, chunk) pair and only chunks above RERANK_MIN_SCORE are kept, so the
+LLM gets fewer, better chunks. Candidates are scored in batches on a small
+thread pool; if scoring does not finish within RERANK_BUDGET_MS the
+retrieval order is used unchanged, so a slow node degrades to plain retrieval
+rather than slowing down chat.
+
+    RERANK_ENABLED=1 RERANK_MIN_SCORE=0.1 uvicorn main:app
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, List, Optional
+
+import numpy as np
+
+from app.core import telemetry
+
+if TYPE_CHECKING:
+    from sentence_transformers import CrossEncoder
+
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "0").strip().lower() in {"1", "true", "yes"}
+RERANK_MODEL_NAME = os.getenv("RERANK_MODEL_NAME", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "12"))  # retrieved per collection before reranking
+RERANK_MIN_SCORE = float(os.getenv("RERANK_MIN_SCORE", "0.05"))  # sigmoid relevance, 0..1
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "8"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "400"))
+RERANK_THREADS = int(os.getenv("RERANK_THREADS", "2"))
+RERANK_MAX_CHARS = 2000  # longer chunks are truncated by the model anyway
+
+_RERANKER: Optional["CrossEncoder"] = None
+_RERANKER_LOCK = threading.Lock()
+_RERANK_POOL = ThreadPoolExecutor(max_workers=RERANK_THREADS, thread_name_prefix="rerank")
+
+
+def get_reranker() -> "CrossEncoder":
+    """The shared cross-encoder; loaded on first call, always on CPU."""
+    global _RERANKER
+    if _RERANKER is None:
+        with _RERANKER_LOCK:
+            if _RERANKER is None:
+                from sentence_transformers import CrossEncoder
+                _RERANKER = CrossEncoder(RERANK_MODEL_NAME, max_length=512, device="cpu")
+    return _RERANKER
+
+
+def score_pairs(query: str, texts: List[str], budget_ms: float = RERANK_BUDGET_MS) -> Optional[np.ndarray]:
+    """Relevance of each text to `query`, or None if scoring overran the budget."""
+    if not texts:
+        return np.zeros(0, dtype="float32")
+    model = get_reranker()
+    pairs = [(query, t[:RERANK_MAX_CHARS]) for t in texts]
+    batches = [pairs[i:i + RERANK_BATCH_SIZE] for i in range(0, len(pairs), RERANK_BATCH_SIZE)]
+    futures = [
+        _RERANK_POOL.submit(model.predict, batch, batch_size=RERANK_BATCH_SIZE, show_progress_bar=False)
+        for batch in batches
+    ]
+    done, pending = wait(futures, timeout=budget_ms / 1000.0)
+    if pending:
+        for fut in pending:
+            fut.cancel()
+        return None
+    return np.concatenate([np.asarray(f.result(), dtype="float32").reshape(-1) for f in futures])
+
+
+@telemetry.timed("rerank")
+def rerank(
+    query: str,
+    hits: List[dict],
+    k: int,
+    min_score: float = RERANK_MIN_SCORE,
+    min_keep: int = 0,
+) -> List[dict]:
+    """Reorder hits by cross-encoder score and keep at most k above `min_score`.
+
+    The best `min_keep` hits are kept even when they score below the threshold,
+    so a report question never ends up with no report context at all. Each kept
+    hit gets "rerank_score", and its retrieval score moves to "retrieval_score".
+    """
+    if not hits:
+        return []
+    started = time.perf_counter()
+    scores = score_pairs(query, [h["text"] for h in hits])
+    if scores is None:
+        print(f"⚠ Rerank over budget ({(time.perf_counter() - started) * 1000:.0f} ms), using retrieval order")
+        return hits[:k]
+    ranked = sorted(zip(scores.tolist(), hits), key=lambda sh: sh[0], reverse=True)
+    kept = []
+    for i, (score, hit) in enumerate(ranked[:k]):
+        if score < min_score and i >= min_keep:
+            break
+        kept.append(dict(hit, retrieval_score=hit["score"], score=score, rerank_score=score))
+    return kept
@@ -0,0 +1,136 @@
+"""
+Report text blob store
+======================
+The full extracted text of every upload, page by page with how each page
+was read (native text layer, OCR, image OCR), as one zstd-compressed JSON
+blob per report under data/texts/. Chunk size, embedding model or index type
+can then change without re-running OCR on the originals:
+
+    CHUNK_CHARS=700 python -m app.jobs.reindex_reports --workers 8
+
+Blob layout (version 1):
+
+    {"version": 1, "report_id", "filename", "method", "extracted_at",
+     "pages": [{"page": 1, "kind": "text" | "ocr" | "image" | "blank", "text": "..."}, ...]}
+
+Without the zstandard package blobs are gzip-compressed instead (.json.gz);
+both are read back.
+"""
+
+import gzip
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import zstandard
+except ImportError:  # gzip fallback: same layout, larger blobs
+    zstandard = None
+
+REPORT_TEXT_DIR = os.getenv("REPORT_TEXT_DIR", os.path.join("data", "texts"))
+REPORT_TEXT_ZSTD_LEVEL = int(os.getenv("REPORT_TEXT_ZSTD_LEVEL", "10"))
+
+_EXTENSIONS = (".json.zst", ".json.gz")
+
+
+def pages_text(pages: Iterable[Dict]) -> str:
+    """The report text as chunked and shown: OCR'd PDF pages get a [Page N] marker."""
+    parts: List[str] = []
+    for p in pages:
+        text = p.get("text") or ""
+        if p.get("kind") == "ocr" and text.strip():
+            parts.append(f"[Page {p['page']}]\n{text}")
+        elif text:
+            parts.append(text)
+    return "\n\n".join(parts).strip()
+
+
+def compress(data: bytes, level: int = REPORT_TEXT_ZSTD_LEVEL) -> bytes:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return gzip.compress(data, compresslevel=9)
+
+
+def decompress(blob: bytes) -> bytes:
+    if blob[:4] == b"\x28\xb5\x2f\xfd":  # zstd frame magic
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read .json.zst report texts")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return gzip.decompress(blob)
+
+
+class ReportTextStore:
+    """One compressed blob per report; files are replaced atomically."""
+
+    def __init__(self, root: str = REPORT_TEXT_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _path(self, report_id: str, ext: Optional[str] = None) -> str:
+        if ext is None:
+            ext = _EXTENSIONS[0] if zstandard is not None else _EXTENSIONS[1]
+        return os.path.join(self.root, f"{report_id}{ext}")
+
+    def _existing(self, report_id: str) -> Optional[str]:
+        for ext in _EXTENSIONS:
+            path = self._path(report_id, ext)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def put(self, report_id: str, pages: List[Dict], method: str, filename: str = "") -> int:
+        """Store (or replace) a report's pages; returns the compressed size in bytes."""
+        record = {
+            "version": 1,
+            "report_id": report_id,
+            "filename": filename,
+            "method": method,
+            "extracted_at": datetime.now().isoformat(),
+            "pages": pages,
+        }
+        blob = compress(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+        path = self._path(report_id)
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(blob)
+            os.replace(tmp_path, path)
+            for ext in _EXTENSIONS:  # a blob written with the other codec
+                other = self._path(report_id, ext)
+                if other != path and os.path.exists(other):
+                    os.remove(other)
+        return len(blob)
+
+    def get(self, report_id: str) -> Optional[Dict]:
+        path = self._existing(report_id)
+        return read_blob(path) if path else None
+
+    def remove(self, report_id: str) -> bool:
+        with self._lock:
+            path = self._existing(report_id)
+            if path:
+                os.remove(path)
+            return path is not None
+
+    def paths(self) -> Dict[str, str]:
+        """report_id -> blob path for every stored report."""
+        if not os.path.isdir(self.root):
+            return {}
+        out = {}
+        for name in os.listdir(self.root):
+            for ext in _EXTENSIONS:
+                if name.endswith(ext):
+                    out[name[: -len(ext)]] = os.path.join(self.root, name)
+        return out
+
+
+def read_blob(path: str) -> Dict:
+    with open(path, "rb") as f:
+        return json.loads(decompress(f.read()).decode("utf-8"))
+
+
+# Singleton instance
+report_texts = ReportTextStore()
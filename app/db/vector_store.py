@@ -0,0 +1,972 @@
+"""
+RAG vector collections
+======================
+Two logically separate FAISS collections, each with its own index file,
+chunk store and index type:
+
+    reports    patient report chunks   faiss.index / faiss_store.json
+    knowledge  guideline corpora       knowledge.index / knowledge_store.json
+
+Report retrieval only scans the vectors of the requested report (id filter),
+knowledge retrieval only scans the knowledge corpus, and `retrieve()` queries
+both in parallel and merges the hits with per-collection weights.
+
+Each collection also keeps a BM25 keyword index over its chunk texts. In the
+default hybrid mode (RAG_RETRIEVAL_MODE) a collection's FAISS and BM25
+rankings are combined with reciprocal-rank fusion, so exact lab tokens such
+as "MCHC" or "eGFR" find their chunk even when the embedding does not.
+With RERANK_ENABLED a cross-encoder (app.db.reranker) then rescores a larger
+candidate set and keeps only the chunks above its threshold.
+
+Deletes only tombstone vector ids: the chunk records go at once, the vectors
+stay in the FAISS index (filtered out at search time) until compact() drops
+all of them in one pass - see app.jobs.compact_index.
+
+Each store records the embedding model and dimension its vectors were built
+with. Queries and new chunks always use that model; when EMBEDDING_MODEL_NAME
+names another one, app.jobs.migrate_embeddings re-embeds the collection in
+the background and swaps the new index in, and the old one serves meanwhile.
+"""
+
+import base64
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, List, Optional, Set
+
+import faiss
+import numpy as np
+
+from app.core import telemetry
+from app.core.config import settings
+from app.db import reranker
+from app.db.bm25_index import BM25Index, reciprocal_rank_fusion
+from app.db.faiss_index import (
+    FAISS_INDEX_TYPE,
+    FAISS_MMAP,
+    build_index,
+    index_type_of,
+    read_index,
+    rebuild_index,
+    reconstruct_vectors,
+    search_params,
+    supports_remove,
+    write_index_atomic,
+)
+from app.utils.chunking import chunk_hash
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, run a single worker
+    fcntl = None
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+REPORT_INDEX_TYPE = os.getenv("REPORT_INDEX_TYPE", FAISS_INDEX_TYPE).strip().lower()
+KNOWLEDGE_INDEX_TYPE = os.getenv("KNOWLEDGE_INDEX_TYPE", FAISS_INDEX_TYPE).strip().lower()
+RAG_REPORT_WEIGHT = float(os.getenv("RAG_REPORT_WEIGHT", "1.0"))
+RAG_KNOWLEDGE_WEIGHT = float(os.getenv("RAG_KNOWLEDGE_WEIGHT", "0.8"))
+# "hybrid" (FAISS + BM25 fused), "vector" or "keyword".
+RAG_RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "hybrid").strip().lower()
+RAG_HYBRID_CANDIDATES = int(os.getenv("RAG_HYBRID_CANDIDATES", "20"))  # per ranking, before fusion
+RAG_SEARCH_THREADS = int(os.getenv("RAG_SEARCH_THREADS", "8"))  # concurrent collection searches per process
+RAG_RRF_K = int(os.getenv("RAG_RRF_K", "60"))
+# Size cap of each collection's change log (used by other processes for incremental reloads).
+FAISS_LOG_MAX_MB = float(os.getenv("FAISS_LOG_MAX_MB", "64"))
+# Compact a collection once this many vectors, or this share of the index, are tombstoned.
+FAISS_COMPACT_MIN_TOMBSTONES = int(os.getenv("FAISS_COMPACT_MIN_TOMBSTONES", "2000"))
+FAISS_COMPACT_RATIO = float(os.getenv("FAISS_COMPACT_RATIO", "0.2"))
+# Re-embed a collection in the background when its model differs from EMBEDDING_MODEL_NAME.
+EMBEDDING_AUTO_MIGRATE = os.getenv("EMBEDDING_AUTO_MIGRATE", "1").strip().lower() in {"1", "true", "yes"}
+
+_EMBEDDERS: Dict[str, "SentenceTransformer"] = {}
+_EMBEDDER_LOCK = threading.Lock()
+
+
+def get_embedder(model_name: Optional[str] = None) -> "SentenceTransformer":
+    """A shared embedding model (default EMBEDDING_MODEL_NAME); sentence_transformers (and torch) load on first call."""
+    name = model_name or EMBEDDING_MODEL_NAME
+    model = _EMBEDDERS.get(name)
+    if model is None:
+        with _EMBEDDER_LOCK:
+            model = _EMBEDDERS.get(name)
+            if model is None:
+                from sentence_transformers import SentenceTransformer
+                model = _EMBEDDERS[name] = SentenceTransformer(name)
+    return model
+
+
+def embedding_dim(model_name: Optional[str] = None) -> int:
+    return int(get_embedder(model_name).get_sentence_embedding_dimension())
+
+
+def embed_texts(texts: List[str], batch_size: int = 32, model_name: Optional[str] = None) -> np.ndarray:
+    model = get_embedder(model_name)
+    with telemetry.span("embed"):
+        emb = model.encode(texts, normalize_embeddings=True, batch_size=batch_size)
+    arr = np.asarray(emb, dtype="float32")
+    if arr.ndim == 1:
+        arr = arr.reshape(1, -1)
+    return arr
+
+
+def _lock_file(path: str, shared: bool = False):
+    """Take a cross-process lock on `path` (released by _unlock_file)."""
+    if fcntl is None:
+        return None
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    f = open(path, "a")
+    fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+    return f
+
+
+def _unlock_file(f) -> None:
+    if f is not None:
+        fcntl.flock(f, fcntl.LOCK_UN)
+        f.close()
+
+
+def _stat(path: str):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _write_json_atomic(path: str, data, indent: Optional[int] = 2) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        # dumps + one write: with indent=None this is the C encoder, several times faster.
+        f.write(json.dumps(data, indent=indent, ensure_ascii=False))
+    os.replace(tmp_path, path)
+
+
+class _SharedLock:
+    """Any number of shared() holders or one exclusive() holder; waiting writers go first."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._waiting = 0
+
+    @contextmanager
+    def shared(self):
+        with self._cond:
+            while self._writing or self._waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        with self._cond:
+            self._waiting += 1
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+
+class VectorCollection:
+    """A FAISS index plus its JSON chunk store, grouped by one metadata field.
+
+    Writes go through `writer()`: one writer at a time across processes (file
+    lock), files replaced atomically, and every save publishes a new
+    generation: the ops are appended to `<index>.log` and `<index>.version` is
+    bumped. Other processes notice the version change on their next access and
+    apply the logged ops instead of re-reading everything (a full reload only
+    happens when they fall behind the retained log).
+
+    With `mmap=True` the served index is memory-mapped and read-only; the
+    writer works on a heap copy and remaps the new file once it has saved.
+
+    remove() tombstones ids instead of deleting from the index, so a delete
+    rewrites only the chunk store; compact() removes the tombstoned vectors.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        index_path: str,
+        store_path: str,
+        index_type: str,
+        group_field: str,
+        mmap: bool = FAISS_MMAP,
+    ):
+        self.name = name
+        self.index_path = index_path
+        self.store_path = store_path
+        self.version_path = index_path + ".version"
+        self.log_path = index_path + ".log"
+        self.lock_path = index_path + ".lock"
+        self.index_type = index_type
+        self.group_field = group_field
+        self.mmap = mmap
+        self.lock = threading.RLock()
+        # FAISS searches run outside self.lock; in-place index changes wait for them.
+        self._index_guard = _SharedLock()
+        self._index: Optional[faiss.Index] = None
+        self._store: Optional[dict] = None
+        self._groups: Dict[str, List[int]] = {}
+        self._bm25: Optional[BM25Index] = None
+        self._bm25_epoch = 0  # bumped when the store is replaced wholesale
+        self._bm25_ready: Optional[threading.Event] = None  # background build in progress
+        self._mapped = False
+        self._generation = 0
+        self._version_sig = None
+        self._writer_depth = 0
+        self._ops: List[dict] = []
+        self._full_rewrite = False
+        self._tombstones: Set[int] = set()
+        self._tombstone_sel = None
+        self._index_dirty = False
+        self._embedding_checked = False
+
+    # ---------- persistence ----------
+
+    def _load_store(self) -> dict:
+        if os.path.exists(self.store_path):
+            try:
+                with open(self.store_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                    if isinstance(data, dict) and "vectors" in data and "next_id" in data:
+                        return data
+            except Exception:
+                pass
+        return {"next_id": 1, "vectors": {}}
+
+    def _read_version(self) -> dict:
+        try:
+            with open(self.version_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {"generation": 0, "log_start": 1}
+
+    def _index_group(self, vid: int, meta: dict) -> None:
+        key = (meta or {}).get(self.group_field)
+        if key is not None:
+            self._groups.setdefault(key, []).append(vid)
+
+    def _unindex_group(self, vid: int, meta: dict) -> None:
+        key = (meta or {}).get(self.group_field)
+        if key is not None and key in self._groups:
+            self._groups[key] = [i for i in self._groups[key] if i != vid]
+            if not self._groups[key]:
+                del self._groups[key]
+
+    def _read(self, mmap: bool) -> None:
+        """Full reload of index + store. Caller holds a file lock."""
+        self._version_sig = _stat(self.version_path)
+        version = self._read_version()
+        store = self._load_store()
+        idx = None
+        if os.path.exists(self.index_path):
+            try:
+                idx = read_index(self.index_path, mmap=mmap)
+            except Exception as e:
+                print(f"[RAG:{self.name}] Could not read index, starting empty: {e}")
+                idx = None
+        if idx is None:
+            dim = embedding_dim()
+            idx = build_index(dim, self.index_type)
+            mmap = False
+            if not store.get("vectors"):
+                store["embedding"] = {"model": EMBEDDING_MODEL_NAME, "dim": dim}
+        if "embedding" not in store:
+            # Written before the model was recorded: it was EMBEDDING_MODEL_NAME if the dimension fits.
+            model = EMBEDDING_MODEL_NAME if idx.d == embedding_dim() else None
+            store["embedding"] = {"model": model, "dim": idx.d}
+
+        if (self._store or {}).get("embedding") != store["embedding"]:
+            self._embedding_checked = False
+        self._index, self._store, self._mapped = idx, store, mmap
+        self._generation = int(version.get("generation", 0))
+        self._reset_bm25()
+        self._set_tombstones(int(i) for i in store.get("tombstones", []))
+        self._index_dirty = False
+        self._groups = {}
+        for vid_str, rec in store.get("vectors", {}).items():
+            self._index_group(int(vid_str), (rec or {}).get("metadata"))
+
+    def _read_log(self, after: int, upto: int) -> Optional[List[dict]]:
+        """Logged generations after..upto, or None if any is missing."""
+        entries: Dict[int, dict] = {}
+        try:
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    if after < entry["gen"] <= upto:
+                        entries[entry["gen"]] = entry
+        except (FileNotFoundError, ValueError):
+            return None
+        if len(entries) != upto - after:
+            return None
+        return [entries[g] for g in range(after + 1, upto + 1)]
+
+    def _apply(self, entries: List[dict], mmap: bool) -> None:
+        """Replay logged ops on the in-memory store (and heap index)."""
+        vectors = self._store.setdefault("vectors", {})
+        for entry in entries:
+            for op in entry["ops"]:
+                ids = [int(i) for i in op["ids"]]
+                if op["op"] == "add":
+                    for vid, text, meta in zip(ids, op["texts"], op["metadatas"]):
+                        vectors[str(vid)] = {"text": text, "metadata": meta}
+                        self._index_group(vid, meta)
+                        if self._bm25 is not None:
+                            self._bm25.add(vid, text)
+                    if not mmap:
+                        vecs = np.frombuffer(base64.b64decode(op["vectors"]), dtype="float32").reshape(len(ids), -1)
+                        with self._index_guard.exclusive():
+                            self._index.add_with_ids(vecs, np.asarray(ids, dtype="int64"))
+                elif op["op"] == "meta":
+                    self._set_metadata(ids, op["metadatas"])
+                elif op["op"] == "tombstone":
+                    self._drop_records(ids)
+                    self._set_tombstones(self._tombstones.union(ids))
+                else:
+                    self._drop_records(ids)
+                    self._set_tombstones(self._tombstones.difference(ids))
+                    if not mmap:
+                        try:
+                            with self._index_guard.exclusive():
+                                self._index.remove_ids(np.asarray(ids, dtype="int64"))
+                        except Exception:
+                            pass
+            self._store["next_id"] = entry.get("next_id", self._store.get("next_id", 1))
+        if mmap:
+            # Mapping is cheap; the writer already swapped in the new file.
+            self._index = read_index(self.index_path, mmap=True)
+
+    def _refresh(self, mmap: bool) -> None:
+        """Catch up with the on-disk generation. Caller holds a file lock."""
+        self._version_sig = _stat(self.version_path)
+        version = self._read_version()
+        target = int(version.get("generation", 0))
+        if self._index is not None and self._mapped == mmap:
+            if target == self._generation:
+                return
+            if self._generation + 1 >= int(version.get("log_start", 1)) and target > self._generation:
+                entries = self._read_log(self._generation, target)
+                if entries is not None:
+                    self._apply(entries, mmap)
+                    self._generation = target
+                    return
+        self._read(mmap)
+
+    def load(self):
+        """Return (index, store), reading from disk on first use and catching up with other writers."""
+        with self.lock:
+            if self._index is not None and self._store is not None:
+                if self._writer_depth or _stat(self.version_path) == self._version_sig:
+                    return self._index, self._store
+            lock_file = _lock_file(self.lock_path, shared=True)
+            try:
+                self._refresh(mmap=self.mmap)
+            finally:
+                _unlock_file(lock_file)
+            if not self._embedding_checked:
+                self._check_embedding()
+            return self._index, self._store
+
+    def _check_embedding(self) -> None:
+        """Warn once per loaded model, and start a migration, if the index was built with another model."""
+        self._embedding_checked = True
+        embedding = self._store.get("embedding") or {}
+        if embedding.get("model") == EMBEDDING_MODEL_NAME:
+            return
+        print(
+            f"⚠ [RAG:{self.name}] Index was embedded with {embedding.get('model') or 'an unknown model'} "
+            f"(dim {embedding.get('dim')}) but EMBEDDING_MODEL_NAME is {EMBEDDING_MODEL_NAME}; until it is "
+            + ("re-embedded it keeps serving with its own model" if embedding.get("model") else "re-embedded searches use keywords only")
+        )
+        from app.db.index_writer import INDEX_WRITER_URL
+
+        # With a writer process, that process migrates; API workers only read.
+        if EMBEDDING_AUTO_MIGRATE and not INDEX_WRITER_URL:
+            from app.jobs import migrate_embeddings
+
+            migrate_embeddings.run_in_background(self)
+
+    @property
+    def embedding_model(self) -> Optional[str]:
+        """Model the stored vectors were embedded with (None if unknown); queries and new chunks use it."""
+        _, store = self.load()
+        return (store.get("embedding") or {}).get("model")
+
+    def embed(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Embed texts with this collection's model, so they are comparable with its vectors."""
+        model = self.embedding_model
+        if model is None:
+            raise RuntimeError(
+                f"[RAG:{self.name}] The index's embedding model is unknown; "
+                "re-embed it first (python -m app.jobs.migrate_embeddings)"
+            )
+        return embed_texts(texts, batch_size=batch_size, model_name=model)
+
+    def save(self) -> None:
+        """Write store + index and publish a new generation (inside writer())."""
+        with self.writer():
+            index, store = self.load()
+            os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+            store["tombstones"] = sorted(self._tombstones)
+            _write_json_atomic(self.store_path, store, indent=None)
+            if self._index_dirty or not os.path.exists(self.index_path):
+                write_index_atomic(index, self.index_path)
+                self._index_dirty = False
+            self._publish()
+
+    def _publish(self) -> None:
+        version = self._read_version()
+        gen = max(int(version.get("generation", 0)), self._generation) + 1
+        log_start = int(version.get("log_start", 1))
+        if self._full_rewrite:
+            # Readers can't replay a rebuild; point them at a full reload.
+            with open(self.log_path, "w", encoding="utf-8"):
+                pass
+            log_start = gen + 1
+        else:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"gen": gen, "next_id": self._store.get("next_id", 1), "ops": self._ops}) + "\n")
+            if os.path.getsize(self.log_path) > FAISS_LOG_MAX_MB * 1024 * 1024:
+                # Start a fresh log; readers that are behind do one full reload.
+                with open(self.log_path, "w", encoding="utf-8"):
+                    pass
+                log_start = gen + 1
+        _write_json_atomic(self.version_path, {"generation": gen, "log_start": log_start}, indent=None)
+        self._generation = gen
+        self._version_sig = _stat(self.version_path)
+        self._ops = []
+        self._full_rewrite = False
+
+    @contextmanager
+    def writer(self):
+        """Exclusive write section (re-entrant). Unsaved changes are saved when the outermost one exits."""
+        with self.lock:
+            outer = self._writer_depth == 0
+            lock_file = None
+            if outer:
+                lock_file = _lock_file(self.lock_path)
+                try:
+                    # Start from the latest generation, on a heap copy of the index.
+                    self._refresh(mmap=False)
+                except Exception:
+                    _unlock_file(lock_file)
+                    raise
+            self._writer_depth += 1
+            completed = False
+            try:
+                yield self
+                completed = True
+            finally:
+                if not outer:
+                    self._writer_depth -= 1
+                else:
+                    try:
+                        if self._ops or self._full_rewrite:
+                            if completed:
+                                self.save()
+                            else:
+                                self._ops, self._full_rewrite = [], False
+                                self._read(mmap=False)  # discard the half-applied write
+                        if self.mmap and not self._mapped and os.path.exists(self.index_path):
+                            self._index = read_index(self.index_path, mmap=True)
+                            self._mapped = True
+                    finally:
+                        self._writer_depth -= 1
+                        _unlock_file(lock_file)
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    # ---------- writes ----------
+
+    def group_ids(self, key: str) -> List[int]:
+        self.load()
+        return list(self._groups.get(key, []))
+
+    def add(self, texts: List[str], metadatas: List[dict], embeddings: Optional[np.ndarray] = None) -> List[int]:
+        """Embed (unless given) and append chunks; saved when the enclosing writer() exits."""
+        if not texts:
+            return []
+        if embeddings is None:
+            embeddings = self.embed(texts)
+        embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+        with self.writer():
+            index, store = self.load()
+            vectors = store.setdefault("vectors", {})
+            new_ids: List[int] = []
+            for text, meta in zip(texts, metadatas):
+                vid = int(store.get("next_id", 1))
+                store["next_id"] = vid + 1
+                new_ids.append(vid)
+                vectors[str(vid)] = {"text": text, "metadata": meta}
+                self._index_group(vid, meta)
+                if self._bm25 is not None:
+                    self._bm25.add(vid, text)
+            with self._index_guard.exclusive():
+                index.add_with_ids(embeddings, np.asarray(new_ids, dtype="int64"))
+            self._index_dirty = True
+            self._ops.append({
+                "op": "add",
+                "ids": new_ids,
+                "texts": list(texts),
+                "metadatas": list(metadatas),
+                "vectors": base64.b64encode(embeddings.tobytes()).decode("ascii"),
+            })
+            return new_ids
+
+    def group_hashes(self, key: str) -> Dict[str, List[int]]:
+        """chunk_hash -> vector ids of the group's chunks (hashed from the text for older records)."""
+        _, store = self.load()
+        vectors = store.get("vectors", {})
+        out: Dict[str, List[int]] = {}
+        for vid in self._groups.get(key, []):
+            rec = vectors.get(str(vid)) or {}
+            h = (rec.get("metadata") or {}).get("chunk_hash") or chunk_hash(rec.get("text") or "")
+            out.setdefault(h, []).append(vid)
+        return out
+
+    def _set_metadata(self, ids: List[int], metadatas: List[dict]) -> None:
+        vectors = self._store.get("vectors", {})
+        for vid, meta in zip(ids, metadatas):
+            rec = vectors.get(str(vid))
+            if rec is not None:
+                self._unindex_group(vid, rec.get("metadata"))
+                rec["metadata"] = meta
+                self._index_group(vid, meta)
+
+    def update_metadata(self, ids: List[int], metadatas: List[dict]) -> int:
+        """Replace the metadata of existing chunks, keeping their vectors; saved when writer() exits."""
+        with self.writer():
+            _, store = self.load()
+            vectors = store.get("vectors", {})
+            changed = [
+                (int(vid), meta) for vid, meta in zip(ids, metadatas)
+                if str(vid) in vectors and vectors[str(vid)].get("metadata") != meta
+            ]
+            if changed:
+                ids, metadatas = [vid for vid, _ in changed], [meta for _, meta in changed]
+                self._set_metadata(ids, metadatas)
+                self._ops.append({"op": "meta", "ids": ids, "metadatas": metadatas})
+            return len(changed)
+
+    def _drop_records(self, ids: List[int]) -> None:
+        vectors = self._store.get("vectors", {})
+        for vid in ids:
+            rec = vectors.pop(str(vid), None)
+            self._unindex_group(vid, (rec or {}).get("metadata"))
+            if self._bm25 is not None:
+                self._bm25.remove(vid)
+
+    def _set_tombstones(self, ids) -> None:
+        self._tombstones = set(ids)
+        self._tombstone_sel = None
+
+    def remove(self, ids: List[int]) -> int:
+        """Drop chunk records and tombstone their vectors; saved when the enclosing writer() exits.
+
+        The vectors stay in the index, excluded from searches, until compact().
+        """
+        ids = [int(i) for i in ids]
+        if not ids:
+            return 0
+        with self.writer():
+            self.load()
+            self._drop_records(ids)
+            self._set_tombstones(self._tombstones.union(ids))
+            self._ops.append({"op": "tombstone", "ids": ids})
+            return len(ids)
+
+    @property
+    def tombstones(self) -> int:
+        self.load()
+        return len(self._tombstones)
+
+    def compaction_due(
+        self, min_tombstones: int = FAISS_COMPACT_MIN_TOMBSTONES, ratio: float = FAISS_COMPACT_RATIO
+    ) -> bool:
+        index, _ = self.load()
+        count = len(self._tombstones)
+        return count > 0 and (count >= min_tombstones or count >= ratio * max(index.ntotal, 1))
+
+    def compact(self) -> int:
+        """Physically remove every tombstoned vector in one pass; returns how many."""
+        with self.writer():
+            index, store = self.load()
+            ids = sorted(self._tombstones)
+            if not ids:
+                return 0
+            if supports_remove(index):
+                with self._index_guard.exclusive():
+                    index.remove_ids(np.asarray(ids, dtype="int64"))
+                self._index_dirty = True
+                self._ops.append({"op": "remove", "ids": ids})
+            else:
+                # HNSW can't delete: rebuild from the live vectors; readers fully reload.
+                self.replace_index(rebuild_index(index, store, index_type_of(index), embed_fn=self.embed))
+            self._set_tombstones(())
+            return len(ids)
+
+    def replace_all(
+        self,
+        texts: List[str],
+        metadatas: List[dict],
+        embeddings: np.ndarray,
+        index_type: Optional[str] = None,
+        model_name: str = EMBEDDING_MODEL_NAME,
+    ) -> int:
+        """Replace every chunk with these (inside writer()), in a new index of `index_type`.
+
+        `embeddings` come from `model_name`. Ids restart from 1; readers fully
+        reload. Used by app.jobs.reindex_reports.
+        """
+        index_type = index_type or self.index_type
+        with self.writer():
+            dim = embeddings.shape[1] if len(texts) else embedding_dim(model_name)
+            embeddings = np.ascontiguousarray(embeddings, dtype="float32").reshape(len(texts), dim)
+            index = build_index(dim, index_type, train_vectors=embeddings)
+            ids = list(range(1, len(texts) + 1))
+            if ids:
+                index.add_with_ids(embeddings, np.asarray(ids, dtype="int64"))
+            self._store = {
+                "next_id": len(ids) + 1,
+                "vectors": {str(vid): {"text": t, "metadata": m} for vid, t, m in zip(ids, texts, metadatas)},
+            }
+            self._groups = {}
+            for vid, meta in zip(ids, metadatas):
+                self._index_group(vid, meta)
+            self._reset_bm25()
+            self._ops = []
+            self.replace_index(index, embedding={"model": model_name, "dim": dim})
+            return len(ids)
+
+    def replace_index(self, index: faiss.Index, embedding: Optional[dict] = None) -> None:
+        """Swap in an index rebuilt from the store's live ids (inside writer()); readers fully reload.
+
+        Pass `embedding` ({"model", "dim"}) when the new vectors come from another model.
+        """
+        with self.writer():
+            if embedding is not None:
+                self._store["embedding"] = embedding
+                self._embedding_checked = False
+            self._index = index
+            self._set_tombstones(())  # rebuilds only carry live vectors
+            self._index_dirty = True
+            self._full_rewrite = True
+
+    # ---------- reads ----------
+
+    def _hit(self, vid: int, score: float, vectors: dict) -> Optional[dict]:
+        rec = vectors.get(str(int(vid)))
+        if not rec:
+            return None
+        text = rec.get("text")
+        if not (isinstance(text, str) and text.strip()):
+            return None
+        return {
+            "id": int(vid),
+            "score": float(score),
+            "text": text,
+            "metadata": rec.get("metadata") or {},
+            "collection": self.name,
+        }
+
+    def search(self, q_vec: np.ndarray, k: int, only_ids: Optional[List[int]] = None) -> List[dict]:
+        """Top-k hits as {"id", "score", "text", "metadata", "collection"}.
+
+        With `only_ids` (a report's chunks), those vectors are scored exactly:
+        an ANN index filtered by id only visits the probed lists / graph
+        neighbourhood and would miss most of a small group.
+
+        Only the snapshot of (index, store, selector) is taken under self.lock;
+        the search itself runs concurrently with other searches.
+        """
+        with self.lock:
+            index, store = self.load()
+            if index.ntotal == 0 or (only_ids is not None and not only_ids):
+                return []
+            if q_vec.shape[-1] != index.d:  # embedded for the index a migration just replaced
+                return []
+            tombstones = len(self._tombstones)
+            # The (selector, inner) pair stays referenced until the search is done.
+            tombstone_sel = self._tombstone_selector() if tombstones else None
+        vectors = store.get("vectors", {})
+
+        if only_ids is not None:
+            # Group ids come from the store, so they never include tombstones.
+            k = min(k, len(only_ids))
+            with self._index_guard.shared():
+                group = reconstruct_vectors(index, only_ids)
+            if group is not None:
+                with telemetry.span("faiss_search"):
+                    scores = group @ np.asarray(q_vec, dtype="float32").reshape(-1)
+                    order = np.argsort(-scores, kind="stable")[:k]
+                hits = (self._hit(only_ids[i], scores[i], vectors) for i in order.tolist())
+                return [h for h in hits if h]
+            sel = faiss.IDSelectorBatch(np.asarray(only_ids, dtype="int64"))
+            params = search_params(index, sel, exhaustive=True)
+        elif tombstone_sel is not None:
+            params = search_params(index, tombstone_sel[0])
+            k = min(k, max(index.ntotal - tombstones, 1))
+        else:
+            params = None
+        with telemetry.span("faiss_search"), self._index_guard.shared():
+            scores, ids = index.search(q_vec, k, params=params)
+        hits = (self._hit(vid, score, vectors) for score, vid in zip(scores[0].tolist(), ids[0].tolist()) if vid != -1)
+        return [h for h in hits if h]
+
+    def _tombstone_selector(self) -> tuple:
+        """(selector excluding tombstoned ids, its inner batch selector), cached until the tombstones change."""
+        if self._tombstone_sel is None:
+            inner = faiss.IDSelectorBatch(np.asarray(sorted(self._tombstones), dtype="int64"))
+            # IDSelectorNot doesn't own `inner`; keep both alive together.
+            self._tombstone_sel = (faiss.IDSelectorNot(inner), inner)
+        return self._tombstone_sel
+
+    def _reset_bm25(self) -> None:
+        """Drop the keyword index after the store was replaced (caller holds self.lock).
+
+        If this process uses keyword search, it is rebuilt in the background
+        right away rather than by the next query while holding the lock.
+        """
+        used = self._bm25 is not None or self._bm25_ready is not None
+        self._bm25 = None
+        self._bm25_ready = None
+        self._bm25_epoch += 1
+        if used:
+            self._start_bm25_build()
+
+    def _start_bm25_build(self) -> threading.Event:
+        """Build the BM25 index from a snapshot of the store in a thread (caller holds self.lock)."""
+        epoch = self._bm25_epoch
+        docs = [(int(vid), (rec or {}).get("text") or "") for vid, rec in self._store.get("vectors", {}).items()]
+        ready = self._bm25_ready = threading.Event()
+
+        def _build() -> None:
+            try:
+                bm25 = BM25Index()
+                bm25.add_many(docs)
+                with self.lock:
+                    if self._bm25_epoch != epoch or self._bm25 is not None:
+                        return  # the store was replaced again meanwhile
+                    # Catch up with adds / removes applied while building.
+                    vectors = self._store.get("vectors", {})
+                    for vid in bm25.doc_ids():
+                        if str(vid) not in vectors:
+                            bm25.remove(vid)
+                    for vid_str, rec in vectors.items():
+                        if int(vid_str) not in bm25:
+                            bm25.add(int(vid_str), (rec or {}).get("text") or "")
+                    self._bm25 = bm25
+            finally:
+                ready.set()
+
+        threading.Thread(target=_build, name=f"bm25-{self.name}", daemon=True).start()
+        return ready
+
+    def keyword_index(self) -> BM25Index:
+        """The BM25 index over this collection's chunks, built from the store on first use.
+
+        Waits for a background build without holding the collection lock, so
+        vector searches carry on meanwhile; don't call it with self.lock held.
+        """
+        while True:
+            with self.lock:
+                self.load()
+                if self._bm25 is not None:
+                    return self._bm25
+                ready = self._bm25_ready
+                if ready is None or ready.is_set():
+                    ready = self._start_bm25_build()
+            ready.wait()
+
+    def keyword_search(self, query: str, k: int, only_ids: Optional[List[int]] = None) -> List[dict]:
+        """Top-k BM25 hits, same shape as search()."""
+        if only_ids is not None and not only_ids:
+            return []
+        bm25 = self.keyword_index()
+        with self.lock:
+            bm25 = self._bm25 if self._bm25 is not None else bm25  # a reload may have replaced it since
+            with telemetry.span("bm25_search"):
+                ranked = bm25.search(query, k, only_ids)
+            vectors = self._store.get("vectors", {})
+            hits = (self._hit(vid, score, vectors) for vid, score in ranked)
+            return [h for h in hits if h]
+
+    def hybrid_search(
+        self,
+        query: str,
+        q_vec: np.ndarray,
+        k: int,
+        only_ids: Optional[List[int]] = None,
+        candidates: int = RAG_HYBRID_CANDIDATES,
+    ) -> List[dict]:
+        """FAISS and BM25 top candidates fused by reciprocal rank; "score" is the fused score."""
+        n = max(k, candidates)
+        # Not under self.lock: each search snapshots what it needs, and the
+        # keyword index may have to wait for a background build.
+        by_id: Dict[int, dict] = {}
+        rankings = []
+        for hits in (self.search(q_vec, n, only_ids), self.keyword_search(query, n, only_ids)):
+            rankings.append([h["id"] for h in hits])
+            for h in hits:
+                by_id.setdefault(h["id"], h)
+        fused = reciprocal_rank_fusion(rankings, k=RAG_RRF_K)
+        top = sorted(fused.items(), key=lambda kv: kv[1], reverse=True)[:k]
+        return [dict(by_id[vid], score=score) for vid, score in top]
+
+
+_REPORTS = VectorCollection(
+    "reports",
+    os.path.join(settings.VECTOR_DB_DIR, "faiss.index"),
+    os.path.join(settings.VECTOR_DB_DIR, "faiss_store.json"),
+    REPORT_INDEX_TYPE,
+    group_field="report_id",
+)
+_KNOWLEDGE = VectorCollection(
+    "knowledge",
+    os.path.join(settings.VECTOR_DB_DIR, "knowledge.index"),
+    os.path.join(settings.VECTOR_DB_DIR, "knowledge_store.json"),
+    KNOWLEDGE_INDEX_TYPE,
+    group_field="source",
+)
+_SPLIT_DONE = False
+_SEARCH_POOL = ThreadPoolExecutor(max_workers=RAG_SEARCH_THREADS, thread_name_prefix="rag-search")
+
+
+def _split_legacy_knowledge() -> None:
+    """Move knowledge chunks that older versions wrote into the report index."""
+    global _SPLIT_DONE
+    if _SPLIT_DONE:
+        return
+    with _REPORTS.lock:
+        if _SPLIT_DONE:
+            return
+        _, store = _REPORTS.load()
+        if any(((rec or {}).get("metadata") or {}).get("type") == "knowledge" for rec in store.get("vectors", {}).values()):
+            with _REPORTS.writer(), _KNOWLEDGE.writer():
+                index, store = _REPORTS.load()
+                legacy = [
+                    (int(vid), rec) for vid, rec in store.get("vectors", {}).items()
+                    if ((rec or {}).get("metadata") or {}).get("type") == "knowledge"
+                ]
+                ids = [vid for vid, _ in legacy]
+                texts = [rec.get("text", "") for _, rec in legacy]
+                vecs = reconstruct_vectors(index, ids)
+                _KNOWLEDGE.add(texts, [rec.get("metadata") or {} for _, rec in legacy], embeddings=vecs)
+                _REPORTS.remove(ids)
+                _KNOWLEDGE.save()
+                _REPORTS.save()
+                print(f"[RAG] Moved {len(ids)} knowledge chunks out of the report index")
+        _SPLIT_DONE = True
+
+
+def report_collection() -> VectorCollection:
+    _split_legacy_knowledge()
+    return _REPORTS
+
+
+def knowledge_collection() -> VectorCollection:
+    _split_legacy_knowledge()
+    return _KNOWLEDGE
+
+
+COLLECTIONS = {"reports": report_collection, "knowledge": knowledge_collection}
+
+
+def collection_by_name(name: str) -> VectorCollection:
+    if name not in COLLECTIONS:
+        raise ValueError(f"Unknown collection '{name}' (expected one of {', '.join(COLLECTIONS)})")
+    return COLLECTIONS[name]()
+
+
+def _search(collection: VectorCollection, mode: str, query: str, q_vec, k: int, only_ids=None) -> List[dict]:
+    if mode == "keyword" or q_vec is None:  # None: the index's embedding model is unknown
+        return collection.keyword_search(query, k, only_ids)
+    if q_vec.shape[-1] != collection.load()[0].d:  # a migration swapped the index since the query was embedded
+        q_vec = collection.embed([query])
+    if mode == "vector":
+        return collection.search(q_vec, k, only_ids)
+    return collection.hybrid_search(query, q_vec, k, only_ids)
+
+
+def _search_reranked(collection: VectorCollection, mode: str, query: str, q_vec, k: int, only_ids=None, min_keep=0):
+    hits = _search(collection, mode, query, q_vec, max(k, reranker.RERANK_CANDIDATES), only_ids)
+    return reranker.rerank(query, hits, k, min_keep=min_keep)
+
+
+def retrieve(
+    query: str,
+    report_id: Optional[str] = None,
+    k: int = 5,
+    knowledge_k: int = 3,
+    mode: str = RAG_RETRIEVAL_MODE,
+    rerank: bool = reranker.RERANK_ENABLED,
+) -> List[dict]:
+    """Query the report and knowledge collections in parallel and merge by weighted score.
+
+    Up to `k` chunks come from the given report and up to `knowledge_k` from the
+    knowledge corpus; the merged list is ordered by score * collection weight.
+    `mode` is "hybrid" (FAISS + BM25 via reciprocal-rank fusion), "vector" or
+    "keyword". Scores are only comparable between collections searched the same way.
+
+    With `rerank`, each collection's top RERANK_CANDIDATES are rescored by the
+    cross-encoder and only hits above RERANK_MIN_SCORE are returned (at least
+    one report chunk is always kept), so fewer than k chunks may come back.
+    """
+    if mode not in ("hybrid", "vector", "keyword"):
+        raise ValueError(f"Unknown retrieval mode '{mode}' (expected hybrid, vector or keyword)")
+    reports, knowledge = report_collection(), knowledge_collection()
+    q_vecs: Dict[Optional[str], Optional[np.ndarray]] = {None: None}
+
+    def _q_vec(collection: VectorCollection) -> Optional[np.ndarray]:
+        # Each index is queried with its own model (they differ while one is migrating).
+        model = collection.embedding_model if mode != "keyword" else None
+        if model not in q_vecs:
+            q_vecs[model] = embed_texts([query], model_name=model)
+        return q_vecs[model]
+
+    futures = []
+    if report_id and k > 0:
+        report_ids = reports.group_ids(report_id)
+        q_vec = _q_vec(reports)
+        # in_context: spans from the pool threads are attributed to this request.
+        if rerank:
+            fut = _SEARCH_POOL.submit(telemetry.in_context(_search_reranked), reports, mode, query, q_vec, k, report_ids, 1)
+        else:
+            fut = _SEARCH_POOL.submit(telemetry.in_context(_search), reports, mode, query, q_vec, k, report_ids)
+        futures.append((RAG_REPORT_WEIGHT, fut))
+    if knowledge_k > 0:
+        q_vec = _q_vec(knowledge)
+        search_fn = telemetry.in_context(_search_reranked if rerank else _search)
+        futures.append((RAG_KNOWLEDGE_WEIGHT, _SEARCH_POOL.submit(search_fn, knowledge, mode, query, q_vec, knowledge_k)))
+
+    merged: List[dict] = []
+    for weight, fut in futures:
+        for hit in fut.result():
+            hit["weighted_score"] = hit["score"] * weight
+            merged.append(hit)
+    merged.sort(key=lambda h: h["weighted_score"], reverse=True)
+    return merged
@@ -0,0 +1,76 @@
+"""
+Vector index compaction
+=======================
+Deletes only tombstone vector ids (see VectorCollection.remove); this job
+removes the tombstoned vectors from a collection's FAISS index in one pass
+and publishes the result, so the index shrinks back and searches stop
+skipping dead vectors.
+
+After each delete the index writer starts it in the background once a
+collection is due (FAISS_COMPACT_MIN_TOMBSTONES tombstones, or
+FAISS_COMPACT_RATIO of the index). Run it by hand, or from cron, with:
+
+    python -m app.jobs.compact_index [--collection reports] [--force]
+"""
+
+import argparse
+import threading
+import time
+from typing import Dict, List
+
+from app.db.vector_store import COLLECTIONS, collection_by_name
+
+_RUNNING: Dict[str, threading.Lock] = {name: threading.Lock() for name in COLLECTIONS}
+
+
+def compact(collection: str, force: bool = False) -> Dict:
+    """Compact one collection if due (or `force`); {"collection", "removed", "ntotal", "seconds"}."""
+    coll = collection_by_name(collection)
+    started = time.perf_counter()
+    removed = coll.compact() if force or coll.compaction_due() else 0
+    index, _ = coll.load()
+    return {
+        "collection": collection,
+        "removed": removed,
+        "ntotal": int(index.ntotal),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def run_in_background(collection: str) -> bool:
+    """Start a compaction thread for `collection`; False if one is already running."""
+    lock = _RUNNING[collection]
+    if not lock.acquire(blocking=False):
+        return False
+
+    def _target() -> None:
+        try:
+            stats = compact(collection)
+            if stats["removed"]:
+                print(f"✓ Compacted {collection}: {stats['removed']} vectors removed in {stats['seconds']}s")
+        except Exception as e:
+            print(f"Index compaction failed ({collection}): {e}")
+        finally:
+            lock.release()
+
+    threading.Thread(target=_target, name=f"compact-{collection}", daemon=True).start()
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Remove tombstoned vectors from the FAISS indexes.")
+    parser.add_argument("--collection", choices=sorted(COLLECTIONS), help="Default: all collections")
+    parser.add_argument("--force", action="store_true", help="Compact even below the tombstone threshold")
+    args = parser.parse_args()
+
+    names: List[str] = [args.collection] if args.collection else list(COLLECTIONS)
+    for name in names:
+        stats = compact(name, force=args.force)
+        if stats["removed"]:
+            print(f"✓ {name}: removed {stats['removed']} vectors in {stats['seconds']}s ({stats['ntotal']} left)")
+        else:
+            print(f"{name}: nothing to compact ({collection_by_name(name).tombstones} tombstones, {stats['ntotal']} vectors)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Bulk knowledge ingestion
+========================
+Walks MEDICAL_KNOWLEDGE_DIR (PDF / TXT / MD guidelines), extracts pages in a
+process pool, chunks them, embeds in large batches and appends to the
+knowledge collection. PDFs go through the upload path's extractor
+(app.utils.pdf_text); scanned pages are read with local Tesseract OCR when it
+is installed (the remote OCR quota is left for uploads). Progress is checkpointed to
+data/vector_db/knowledge_ingest.json, so a crashed run resumes with the first
+unfinished file; changed files are re-ingested, unchanged ones skipped.
+
+    python -m app.jobs.ingest_knowledge --workers 4 --embed-batch 512
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.db.vector_store import knowledge_collection
+from app.utils import local_ocr
+from app.utils.chunking import chunk_text
+from app.utils.pdf_text import read_pages, resolve_backend
+from app.utils.workers import ProcessPool
+
+KNOWLEDGE_EXTENSIONS = {".pdf", ".txt", ".md"}
+CHECKPOINT_FILE = os.path.join(settings.VECTOR_DB_DIR, "knowledge_ingest.json")
+
+# Shared with the /api/rag/ingest-dir endpoint so progress can be polled.
+INGEST_STATUS: Dict = {"running": False}
+_RUN_LOCK = threading.Lock()
+
+
+def _ocr_pages(path: str, pages: List[Tuple[str, str]]) -> None:
+    """Replace the text of pages marked "ocr" with local Tesseract output, where it reads anything."""
+    import fitz  # PyMuPDF
+
+    from app.utils.ocr_image import render_pdf_page
+
+    with fitz.open(path) as doc:
+        for i, (kind, _) in enumerate(pages):
+            if kind != "ocr":
+                continue
+            image, _ = render_pdf_page(doc.load_page(i))
+            text, _ = local_ocr.ocr_page(image)
+            if text.strip():
+                pages[i] = (kind, text)
+
+
+def _extract_pages(path: str) -> List[str]:
+    """Runs in a worker process: one string per page (a single page for text files)."""
+    if path.lower().endswith(".pdf"):
+        try:
+            pages = read_pages(path)
+            if any(kind == "ocr" for kind, _ in pages) and resolve_backend() == "pymupdf" and local_ocr.available():
+                _ocr_pages(path, pages)
+        except Exception as e:
+            print(f"Knowledge PDF extract failed ({path}): {e}")
+            return []
+        return [text for _, text in pages]
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return [f.read()]
+
+
+def _load_checkpoint(path: str) -> Dict:
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+                if isinstance(data, dict) and "files" in data:
+                    return data
+        except Exception:
+            pass
+    return {"files": {}}
+
+
+def _save_checkpoint(path: str, checkpoint: Dict) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _scan(root: str) -> Dict[str, Dict]:
+    found: Dict[str, Dict] = {}
+    for dirpath, _, filenames in os.walk(root):
+        for name in sorted(filenames):
+            if os.path.splitext(name)[1].lower() not in KNOWLEDGE_EXTENSIONS:
+                continue
+            full = os.path.join(dirpath, name)
+            st = os.stat(full)
+            rel = os.path.relpath(full, root).replace(os.sep, "/")
+            found[rel] = {"path": full, "size": st.st_size, "mtime": int(st.st_mtime)}
+    return found
+
+
+def run(
+    root: Optional[str] = None,
+    workers: Optional[int] = None,
+    embed_batch: int = 512,
+    checkpoint_every: int = 5000,
+    checkpoint_path: str = CHECKPOINT_FILE,
+    progress: Optional[Callable[[Dict], None]] = None,
+) -> Dict:
+    """Ingest every new or changed file under `root` into the knowledge collection."""
+    root = root or settings.MEDICAL_KNOWLEDGE_DIR
+    knowledge = knowledge_collection()
+    checkpoint = _load_checkpoint(checkpoint_path)
+    done = checkpoint["files"]
+    found = _scan(root)
+
+    todo = [
+        rel for rel, info in found.items()
+        if not (done.get(rel, {}).get("size") == info["size"] and done.get(rel, {}).get("mtime") == info["mtime"])
+    ]
+    # Drop vectors of changed files and of files a crashed run left half-written.
+    with knowledge.writer():
+        stale = [vid for rel in todo for vid in knowledge.group_ids(rel)]
+        if stale:
+            knowledge.remove(stale)
+            knowledge.save()
+    for rel in todo:
+        done.pop(rel, None)
+
+    stats = {
+        "files_total": len(found),
+        "files_skipped": len(found) - len(todo),
+        "files_done": 0,
+        "pages": 0,
+        "chunks": 0,
+        "seconds": 0.0,
+        "pages_per_second": 0.0,
+        "chunks_per_second": 0.0,
+    }
+    started = time.perf_counter()
+    pending_texts: List[str] = []
+    pending_metas: List[Dict] = []
+    # Embedded but not yet in the index; added under the writer lock at each checkpoint.
+    embedded_texts: List[str] = []
+    embedded_metas: List[Dict] = []
+    embedded_vecs: List[Tuple[Optional[str], np.ndarray]] = []  # (model, vectors) per batch
+    unflushed_files: List[str] = []
+
+    def _report() -> None:
+        elapsed = time.perf_counter() - started
+        stats["seconds"] = round(elapsed, 2)
+        if elapsed > 0:
+            stats["pages_per_second"] = round(stats["pages"] / elapsed, 1)
+            stats["chunks_per_second"] = round(stats["chunks"] / elapsed, 1)
+        if progress:
+            progress(dict(stats))
+
+    def _flush(final: bool = False) -> None:
+        nonlocal pending_texts, pending_metas, embedded_texts, embedded_metas, embedded_vecs
+        if pending_texts:
+            # Outside the writer lock, so searches on the knowledge collection aren't held up.
+            model = knowledge.embedding_model
+            embedded_vecs.append((model, knowledge.embed(pending_texts, batch_size=128)))
+            embedded_texts += pending_texts
+            embedded_metas += pending_metas
+            pending_texts, pending_metas = [], []
+        if len(embedded_texts) >= checkpoint_every or (final and embedded_texts):
+            # Index + store first (saved when the writer exits), then the checkpoint:
+            # a crash in between only means the listed files get re-ingested, never lost.
+            with knowledge.writer():
+                # Re-embedded by add() if a migration swapped the index since.
+                model = knowledge.embedding_model
+                same_model = all(m == model for m, _ in embedded_vecs)
+                embeddings = np.vstack([v for _, v in embedded_vecs]) if same_model else None
+                knowledge.add(embedded_texts, embedded_metas, embeddings=embeddings)
+            embedded_texts, embedded_metas, embedded_vecs = [], [], []
+        if not embedded_texts:
+            for rel in unflushed_files:
+                done[rel] = {"size": found[rel]["size"], "mtime": found[rel]["mtime"]}
+            unflushed_files.clear()
+            _save_checkpoint(checkpoint_path, checkpoint)
+
+    def _ingest(rel: str, pages: List[str]) -> None:
+        for page_no, page_text in enumerate(pages, start=1):
+            for i, chunk in enumerate(chunk_text(page_text, settings.CHUNK_CHARS, settings.CHUNK_OVERLAP)):
+                pending_texts.append(chunk)
+                pending_metas.append({"source": rel, "type": "knowledge", "page": page_no, "chunk_index": i})
+                stats["chunks"] += 1
+        stats["pages"] += len(pages)
+        stats["files_done"] += 1
+        unflushed_files.append(rel)
+        if len(pending_texts) >= embed_batch:
+            _flush()
+        _report()
+
+    # The index is written only at checkpoints; readers see each one as a new generation.
+    # Spawned workers (this may run on an API thread) with a bounded window of files in flight.
+    pool = ProcessPool("Knowledge extraction", workers or os.cpu_count() or 1)
+    try:
+        pending: Deque = deque()
+        for rel in todo:
+            pending.append((rel, pool.submit(_extract_pages, found[rel]["path"])))
+            if len(pending) >= pool.workers * 2:
+                done_rel, future = pending.popleft()
+                _ingest(done_rel, future.result())
+        while pending:
+            done_rel, future = pending.popleft()
+            _ingest(done_rel, future.result())
+        _flush(final=True)
+    finally:
+        pool.reset(kill=True)
+    _report()
+    return stats
+
+
+def run_in_background(root: Optional[str] = None, workers: Optional[int] = None) -> bool:
+    """Start an ingestion thread for the API; False if one is already running."""
+    if not _RUN_LOCK.acquire(blocking=False):
+        return False
+
+    def _target() -> None:
+        INGEST_STATUS.clear()
+        INGEST_STATUS.update({"running": True, "started_at": time.time()})
+        try:
+            stats = run(root, workers, progress=INGEST_STATUS.update)
+            INGEST_STATUS.update(stats)
+        except Exception as e:
+            print(f"Knowledge ingestion failed: {e}")
+            INGEST_STATUS["error"] = str(e)
+        finally:
+            INGEST_STATUS["running"] = False
+            _RUN_LOCK.release()
+
+    threading.Thread(target=_target, name="knowledge-ingest", daemon=True).start()
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk-ingest MEDICAL_KNOWLEDGE_DIR into the knowledge index.")
+    parser.add_argument("--dir", default=settings.MEDICAL_KNOWLEDGE_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="PDF extraction processes (default: CPU count)")
+    parser.add_argument("--embed-batch", type=int, default=512, help="Chunks embedded per batch")
+    parser.add_argument("--checkpoint-every", type=int, default=5000, help="Chunks between index checkpoints")
+    args = parser.parse_args()
+
+    def _progress(s: Dict) -> None:
+        print(
+            f"\r{s['files_done']}/{s['files_total'] - s['files_skipped']} files, {s['pages']} pages, "
+            f"{s['chunks']} chunks - {s['pages_per_second']} pages/s, {s['chunks_per_second']} chunks/s",
+            end="", flush=True,
+        )
+
+    stats = run(args.dir, args.workers, args.embed_batch, args.checkpoint_every, progress=_progress)
+    print(
+        f"\n✓ Ingested {stats['files_done']} files ({stats['files_skipped']} unchanged): "
+        f"{stats['pages']} pages, {stats['chunks']} chunks in {stats['seconds']}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Embedding model migration
+=========================
+Every collection records the model its vectors were embedded with (see
+VectorCollection.embedding_model) and keeps querying with that model, so a
+new EMBEDDING_MODEL_NAME never mixes vectors from two models. This job
+re-embeds a collection's chunk texts with the new model in batches while the
+old index keeps serving, then builds an index of the same type and swaps it
+in as one full-rewrite generation; running workers switch to the new model
+on their next query.
+
+Uploads and deletes made during the migration are caught up inside the
+writer lock just before the swap. A collection whose model differs is
+migrated in the background on first load (EMBEDDING_AUTO_MIGRATE=0 to turn
+that off), or run it by hand with:
+
+    python -m app.jobs.migrate_embeddings [--collection reports] [--batch 512]
+"""
+
+import argparse
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Union
+
+import numpy as np
+
+from app.db.faiss_index import build_index, index_type_of
+from app.db.vector_store import (
+    COLLECTIONS,
+    EMBEDDING_MODEL_NAME,
+    VectorCollection,
+    collection_by_name,
+    embed_texts,
+    embedding_dim,
+)
+
+EMBEDDING_MIGRATE_BATCH = int(os.getenv("EMBEDDING_MIGRATE_BATCH", "512"))
+
+MIGRATION_STATUS: Dict[str, Dict] = {}
+_RUNNING: Dict[str, threading.Lock] = {}
+_RUNNING_GUARD = threading.Lock()
+
+
+def _running_lock(name: str) -> threading.Lock:
+    with _RUNNING_GUARD:
+        return _RUNNING.setdefault(name, threading.Lock())
+
+
+def migrate(
+    collection: Union[str, VectorCollection],
+    model_name: str = EMBEDDING_MODEL_NAME,
+    batch: int = EMBEDDING_MIGRATE_BATCH,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict:
+    """Re-embed one collection with `model_name` and swap its index; {"collection", "from", "to", "vectors", "seconds"}."""
+    name = collection if isinstance(collection, str) else collection.name
+    # Taken before the collection loads, so its own auto-migration doesn't start alongside.
+    with _running_lock(name):
+        coll = collection_by_name(collection) if isinstance(collection, str) else collection
+        return _migrate(coll, model_name, batch, progress)
+
+
+def _migrate(
+    coll: VectorCollection, model_name: str, batch: int, progress: Optional[Callable[[int, int], None]]
+) -> Dict:
+    started = time.perf_counter()
+    with coll.lock:
+        index, store = coll.load()
+        previous = (store.get("embedding") or {}).get("model")
+        texts = {int(vid): rec["text"] for vid, rec in store.get("vectors", {}).items()}
+        index_type = index_type_of(index)
+    stats = {"collection": coll.name, "from": previous, "to": model_name, "vectors": 0, "seconds": 0.0}
+    if previous == model_name:
+        return stats
+
+    # The slow part, outside the writer lock: the old index keeps serving and taking writes.
+    ids = sorted(texts)
+    vectors: Dict[int, np.ndarray] = {}
+    for start in range(0, len(ids), batch):
+        part = ids[start:start + batch]
+        embedded = embed_texts([texts[vid] for vid in part], batch_size=min(batch, 256), model_name=model_name)
+        vectors.update(zip(part, embedded))
+        if progress:
+            progress(len(vectors), len(ids))
+
+    with coll.writer():
+        index, store = coll.load()
+        if (store.get("embedding") or {}).get("model") == model_name:
+            return stats  # another process finished first
+        live = {int(vid): rec["text"] for vid, rec in store.get("vectors", {}).items()}
+        late = [vid for vid in live if vid not in vectors]  # added since the snapshot
+        if late:
+            vectors.update(zip(late, embed_texts([live[vid] for vid in late], model_name=model_name)))
+        live_ids: List[int] = sorted(live)
+        dim = embedding_dim(model_name)
+        matrix = np.ascontiguousarray(
+            np.vstack([vectors[vid] for vid in live_ids]) if live_ids else np.zeros((0, dim)), dtype="float32"
+        )
+        new_index = build_index(dim, index_type, train_vectors=matrix if live_ids else None)
+        if live_ids:
+            new_index.add_with_ids(matrix, np.asarray(live_ids, dtype="int64"))
+        coll.replace_index(new_index, embedding={"model": model_name, "dim": dim})
+    stats.update({"vectors": len(live_ids), "seconds": round(time.perf_counter() - started, 2)})
+    return stats
+
+
+def run_in_background(collection: VectorCollection) -> bool:
+    """Start a migration thread for `collection`; False if one is already running."""
+    lock = _running_lock(collection.name)
+    if not lock.acquire(blocking=False):
+        return False
+
+    def _progress(done: int, total: int) -> None:
+        MIGRATION_STATUS[collection.name].update({"done": done, "total": total})
+
+    def _target() -> None:
+        MIGRATION_STATUS[collection.name] = {"running": True, "model": EMBEDDING_MODEL_NAME, "started_at": time.time()}
+        try:
+            stats = _migrate(collection, EMBEDDING_MODEL_NAME, EMBEDDING_MIGRATE_BATCH, _progress)
+            MIGRATION_STATUS[collection.name].update(stats)
+            if stats["vectors"]:
+                print(
+                    f"✓ Re-embedded {collection.name}: {stats['vectors']} vectors "
+                    f"{stats['from'] or 'unknown'} -> {stats['to']} in {stats['seconds']}s"
+                )
+        except Exception as e:
+            print(f"Embedding migration failed ({collection.name}): {e}")
+            MIGRATION_STATUS[collection.name]["error"] = str(e)
+        finally:
+            MIGRATION_STATUS[collection.name]["running"] = False
+            lock.release()
+
+    threading.Thread(target=_target, name=f"migrate-{collection.name}", daemon=True).start()
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-embed the vector collections with EMBEDDING_MODEL_NAME.")
+    parser.add_argument("--collection", choices=sorted(COLLECTIONS), help="Default: all collections")
+    parser.add_argument("--batch", type=int, default=EMBEDDING_MIGRATE_BATCH, help="Chunks embedded per batch")
+    args = parser.parse_args()
+
+    def _progress(done: int, total: int) -> None:
+        print(f"\rembed: {done}/{total}", end="", flush=True)
+
+    names: List[str] = [args.collection] if args.collection else list(COLLECTIONS)
+    for name in names:
+        stats = migrate(name, batch=args.batch, progress=_progress)
+        if stats["from"] == stats["to"]:
+            print(f"{name}: already embedded with {stats['to']}")
+        else:
+            print(
+                f"\n✓ {name}: re-embedded {stats['vectors']} vectors "
+                f"{stats['from'] or 'unknown'} -> {stats['to']} in {stats['seconds']}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Archive-wide critical value re-evaluation
+=========================================
+Re-runs the critical-value rules over every stored report and writes a flag
+index (report_id -> critical findings) to data/safety_flags.json.
+
+Run after changing thresholds:
+
+    python -m app.jobs.reevaluate_safety --rules my_rules.json --workers 8
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Deque, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.db.text_store import pages_text, report_texts
+from app.utils.chunking import join_chunks
+from app.utils.lab_values import extract_lab_values, match_analyte
+from app.utils.safety_rules import SAFETY_FLAGS_FILE, CriticalRules
+
+DB_FILE = os.path.join("data", "db.json")
+STORE_FILE = os.path.join(settings.VECTOR_DB_DIR, "faiss_store.json")
+
+
+def _chunk_texts(store_path: str) -> Dict[str, str]:
+    """Reassemble report text from the RAG chunk store, for reports without a text blob."""
+    if not os.path.exists(store_path):
+        return {}
+    try:
+        with open(store_path, "r", encoding="utf-8") as f:
+            vectors = (json.load(f) or {}).get("vectors", {})
+    except Exception as e:
+        print(f"Could not read chunk store: {e}")
+        return {}
+    chunks: Dict[str, List] = {}
+    for rec in vectors.values():
+        meta = (rec or {}).get("metadata") or {}
+        rid = meta.get("report_id")
+        if rid and isinstance(rec.get("text"), str):
+            chunks.setdefault(rid, []).append((meta.get("chunk_index", 0), rec["text"]))
+    return {rid: join_chunks([t for _, t in sorted(parts)]) for rid, parts in chunks.items()}
+
+
+def _iter_json_array(path: str, read_size: int = 1 << 20) -> Iterator[Dict]:
+    """Yield the items of a top-level JSON array one at a time, reading the file in blocks."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf, pos, eof = "", 0, False
+        opened = False
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf):
+                if not opened:
+                    if buf[pos] != "[":
+                        raise ValueError(f"{path} is not a JSON array")
+                    opened, pos = True, pos + 1
+                    continue
+                if buf[pos] == "]":
+                    return
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    yield item
+                    pos = end
+                    continue
+            elif eof:
+                return
+            block = f.read(read_size)
+            eof = not block
+            buf, pos = buf[pos:] + block, 0
+
+
+def _report_text(report: Dict, chunk_texts: Callable[[], Dict[str, str]]) -> str:
+    blob = report_texts.get(report["id"])
+    if blob and blob.get("pages"):
+        return pages_text(blob["pages"])
+    parsed = report.get("parsed_data") or {}
+    return chunk_texts().get(report["id"]) or parsed.get("text_preview") or report.get("text_preview") or ""
+
+
+def iter_reports(db_path: str = DB_FILE, store_path: str = STORE_FILE) -> Iterator[Dict]:
+    """Yield {"id", "text", "tests"} for every report in the report store.
+
+    db.json is read one report at a time and the text comes from the report's
+    text blob; the chunk store is only loaded if some report has no blob
+    (uploaded before blobs were kept).
+    """
+    if not os.path.exists(db_path):
+        return
+    loaded: List[Dict[str, str]] = []
+
+    def chunk_texts() -> Dict[str, str]:
+        if not loaded:
+            loaded.append(_chunk_texts(store_path))
+        return loaded[0]
+
+    for r in _iter_json_array(db_path):
+        parsed = r.get("parsed_data") or {}
+        yield {"id": r["id"], "text": _report_text(r, chunk_texts), "tests": parsed.get("tests") or []}
+
+
+def _batches(items: Iterator[Dict], size: int) -> Iterator[List[Dict]]:
+    batch: List[Dict] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _readings_for(report: Dict) -> List[Dict]:
+    readings = extract_lab_values(report["text"])
+    for t in report["tests"]:
+        key = match_analyte(str(t.get("name", "")))
+        try:
+            value = float(t.get("value"))
+        except (TypeError, ValueError):
+            continue
+        if key:
+            readings.append({"analyte": key, "name": t.get("name"), "value": value, "unit": t.get("unit", "")})
+    return readings
+
+
+def evaluate_batch(batch: List[Dict], rules: Dict[str, Dict]) -> Dict:
+    """Extract readings for a batch of reports and evaluate them in a single vectorized pass."""
+    engine = CriticalRules(rules)
+    owners: List[int] = []
+    readings: List[Dict] = []
+    for i, report in enumerate(batch):
+        for reading in _readings_for(report):
+            if reading["analyte"] in engine.codes:
+                owners.append(i)
+                readings.append(reading)
+
+    flags: Dict[str, List[Dict]] = {}
+    if readings:
+        codes = np.fromiter((engine.codes[r["analyte"]] for r in readings), dtype="int64", count=len(readings))
+        values = np.fromiter((r["value"] for r in readings), dtype="float64", count=len(readings))
+        verdict = engine.evaluate(codes, values)
+        for j in np.flatnonzero(verdict):
+            rid = batch[owners[j]]["id"]
+            flags.setdefault(rid, []).append(engine.finding(readings[j], int(verdict[j])))
+    return {"reports": len(batch), "readings": len(readings), "flags": flags}
+
+
+def run(
+    rules_path: Optional[str] = None,
+    out_path: str = SAFETY_FLAGS_FILE,
+    workers: Optional[int] = None,
+    batch_size: int = 256,
+    db_path: str = DB_FILE,
+    store_path: str = STORE_FILE,
+) -> Dict:
+    """Re-evaluate the whole archive and write the flag index. Returns run stats."""
+    rules = CriticalRules.from_file(rules_path)
+    started = time.perf_counter()
+    totals = {"reports": 0, "readings": 0}
+    flags: Dict[str, List[Dict]] = {}
+
+    def _collect(res: Dict) -> None:
+        totals["reports"] += res["reports"]
+        totals["readings"] += res["readings"]
+        flags.update(res["flags"])
+
+    max_workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        # Keep a bounded window of batches in flight so the archive is streamed, not materialized.
+        pending: Deque = deque()
+        for batch in _batches(iter_reports(db_path, store_path), batch_size):
+            pending.append(pool.submit(evaluate_batch, batch, rules.rules))
+            if len(pending) >= max_workers * 2:
+                _collect(pending.popleft().result())
+        while pending:
+            _collect(pending.popleft().result())
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        "reports": totals["reports"],
+        "readings": totals["readings"],
+        "flagged_reports": len(flags),
+        "seconds": round(elapsed, 3),
+        "reports_per_second": round(totals["reports"] / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+    index = {
+        "generated_at": datetime.now().isoformat(),
+        "rules_fingerprint": rules.fingerprint(),
+        "stats": stats,
+        "flags": flags,
+    }
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, out_path)
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-evaluate critical-value flags across all stored reports.")
+    parser.add_argument("--rules", help="JSON file of thresholds (defaults to the built-in table)")
+    parser.add_argument("--out", default=SAFETY_FLAGS_FILE, help="Where to write the flag index")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=256, help="Reports per vectorized batch")
+    args = parser.parse_args()
+
+    stats = run(args.rules, args.out, args.workers, args.batch_size)
+    print(
+        f"✓ Scanned {stats['reports']} reports ({stats['readings']} readings) in {stats['seconds']}s "
+        f"- {stats['reports_per_second']} reports/s, {stats['flagged_reports']} flagged -> {args.out}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Report re-indexing from stored text
+===================================
+Rebuilds the report collection (chunks, embeddings and the FAISS index)
+from the compressed full texts in app.db.text_store, so a new chunk size,
+embedding model or index type never means re-running OCR on the uploads.
+Blobs are decompressed and chunked in a process pool across all cores, then
+embedded in large batches; the new index replaces the old one in a single
+generation that running workers pick up on their next query.
+
+Reports uploaded before the text store existed have no blob; their stored
+chunks are kept as they are (re-embedded, so a model change still applies).
+
+Chunking defaults to CHUNK_CHARS / CHUNK_OVERLAP, which uploads use too;
+change those settings and re-index, rather than passing other values here,
+or new uploads will be chunked differently from the rest of the index.
+
+    python -m app.jobs.reindex_reports --type sq8 --workers 8
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.db.faiss_index import INDEX_TYPES
+from app.db.text_store import pages_text, read_blob, report_texts
+from app.db.vector_store import embed_texts, report_collection
+from app.utils.chunking import chunk_hash, chunk_text
+
+
+def _chunk_blob(path: str, max_chars: int, overlap: int) -> Tuple[str, List[str], List[Dict]]:
+    """Runs in a worker process: (report_id, chunks, metadatas) of one text blob."""
+    record = read_blob(path)
+    chunks = chunk_text(pages_text(record.get("pages") or []), max_chars=max_chars, overlap=overlap)
+    metas = [
+        {
+            "report_id": record["report_id"],
+            "filename": record.get("filename", ""),
+            "source": "upload",
+            "method": record.get("method", ""),
+            "chunk_index": i,
+            "chunk_hash": chunk_hash(chunk),
+        }
+        for i, chunk in enumerate(chunks)
+    ]
+    return record["report_id"], chunks, metas
+
+
+def _stored_chunks(store: Dict, skip) -> Tuple[List[str], List[Dict]]:
+    """Chunk texts + metadata of reports in `store` that are not in `skip`, in chunk order."""
+    rows = []
+    for rec in store.get("vectors", {}).values():
+        meta = (rec or {}).get("metadata") or {}
+        if meta.get("report_id") not in skip and isinstance(rec.get("text"), str):
+            rows.append((meta.get("report_id"), meta.get("chunk_index", 0), rec["text"], meta))
+    rows.sort(key=lambda r: (r[0], r[1]))
+    return [r[2] for r in rows], [r[3] for r in rows]
+
+
+def _embed(texts: List[str], batch: int, progress: Optional[Callable[[int], None]] = None) -> np.ndarray:
+    out = []
+    for start in range(0, len(texts), batch):
+        out.append(embed_texts(texts[start:start + batch], batch_size=min(batch, 256)))
+        if progress:
+            progress(min(start + batch, len(texts)))
+    return np.vstack(out) if out else np.zeros((0, 0), dtype="float32")
+
+
+def _blob_versions(paths: Dict[str, str]) -> Dict[str, Tuple[str, int]]:
+    """report_id -> (path, mtime_ns), to spot blobs replaced by a re-upload during the run."""
+    out = {}
+    for report_id, path in paths.items():
+        try:
+            out[report_id] = (path, os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            pass
+    return out
+
+
+def run(
+    workers: Optional[int] = None,
+    chunk_chars: Optional[int] = None,
+    overlap: Optional[int] = None,
+    index_type: Optional[str] = None,
+    embed_batch: int = 1024,
+    progress: Optional[Callable[[str, int, int], None]] = None,
+) -> Dict:
+    chunk_chars = chunk_chars or settings.CHUNK_CHARS
+    overlap = settings.CHUNK_OVERLAP if overlap is None else overlap
+    coll = report_collection()
+    versions = _blob_versions(report_texts.paths())
+    paths = {report_id: path for report_id, (path, _) in versions.items()}
+    started = time.perf_counter()
+
+    texts: List[str] = []
+    metas: List[Dict] = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        results = pool.map(_chunk_blob, paths.values(), repeat(chunk_chars), repeat(overlap), chunksize=16)
+        for done, (_, chunks, chunk_metas) in enumerate(results, start=1):
+            texts += chunks
+            metas += chunk_metas
+            if progress:
+                progress("chunk", done, len(paths))
+    chunk_seconds = time.perf_counter() - started
+
+    _, store = coll.load()
+    legacy_texts, legacy_metas = _stored_chunks(store, skip=paths)
+    texts += legacy_texts
+    metas += legacy_metas
+    embed_started = time.perf_counter()
+    embeddings = _embed(texts, embed_batch, progress and (lambda n: progress("embed", n, len(texts))))
+    embed_seconds = time.perf_counter() - embed_started
+
+    with coll.writer():
+        # Catch up with uploads and deletes made while we were embedding.
+        _, store = coll.load()
+        current = {((rec or {}).get("metadata") or {}).get("report_id") for rec in store.get("vectors", {}).values()}
+        live = _blob_versions(report_texts.paths())
+        # Re-uploaded since the snapshot: the chunks from the old blob are stale.
+        changed = {rid for rid, version in live.items() if rid in versions and versions[rid] != version}
+        keep = [
+            i for i, m in enumerate(metas)
+            if m["report_id"] not in changed and (m["report_id"] in current or m["report_id"] in live)
+        ]
+        seen = {m["report_id"] for m in metas}
+        late_texts, late_metas = _stored_chunks(store, skip=seen | changed)
+        for rid in sorted(changed):
+            _, chunks, chunk_metas = _chunk_blob(live[rid][0], chunk_chars, overlap)
+            late_texts += chunks
+            late_metas += chunk_metas
+        texts = [texts[i] for i in keep] + late_texts
+        metas = [metas[i] for i in keep] + late_metas
+        vectors = [embeddings[keep]] if keep else []
+        if late_texts:
+            vectors.append(embed_texts(late_texts))
+        embeddings = np.vstack(vectors) if vectors else np.zeros((0, 0), dtype="float32")
+        coll.replace_all(texts, metas, embeddings, index_type=index_type)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "reports": len(paths),
+        "rechunked_late": len(changed),
+        "legacy_reports": len({m["report_id"] for m in legacy_metas}),
+        "chunks": len(texts),
+        "chunk_seconds": round(chunk_seconds, 2),
+        "embed_seconds": round(embed_seconds, 2),
+        "seconds": round(elapsed, 2),
+        "chunks_per_second": round(len(texts) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the report index from the stored report texts (no OCR).")
+    parser.add_argument("--workers", type=int, default=None, help="Chunking processes (default: CPU count)")
+    parser.add_argument("--chunk-chars", type=int, default=settings.CHUNK_CHARS, help="Default: CHUNK_CHARS")
+    parser.add_argument("--overlap", type=int, default=settings.CHUNK_OVERLAP, help="Default: CHUNK_OVERLAP")
+    parser.add_argument("--type", default=None, choices=INDEX_TYPES, help="Index type (default: REPORT_INDEX_TYPE)")
+    parser.add_argument("--embed-batch", type=int, default=1024, help="Chunks embedded per batch")
+    args = parser.parse_args()
+    if (args.chunk_chars, args.overlap) != (settings.CHUNK_CHARS, settings.CHUNK_OVERLAP):
+        print(
+            f"⚠ Chunking {args.chunk_chars}/{args.overlap} differs from CHUNK_CHARS/CHUNK_OVERLAP "
+            f"({settings.CHUNK_CHARS}/{settings.CHUNK_OVERLAP}); set those too, or new uploads won't match"
+        )
+
+    def _progress(stage: str, done: int, total: int) -> None:
+        print(f"\r{stage}: {done}/{total}", end="", flush=True)
+
+    stats = run(args.workers, args.chunk_chars, args.overlap, args.type, args.embed_batch, progress=_progress)
+    print(
+        f"\n✓ Re-indexed {stats['reports']} reports ({stats['legacy_reports']} without stored text kept as is): "
+        f"{stats['chunks']} chunks in {stats['seconds']}s (chunking {stats['chunk_seconds']}s, "
+        f"embedding {stats['embed_seconds']}s, {stats['chunks_per_second']} chunks/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,38 @@
-import requests
-import chromadb
-from chromadb.utils import embedding_functions
-from app.core.config import settings
+from app.db.index_writer import add_chunks
+from app.db.vector_store import retrieve
 from google.adk.tools import BaseTool
 
 # This tool acts as the "Medical Library".
-# It uses ChromaDB to store and retrieve chunks of text from medical guidelines.
-# We use Hugging Face for "embeddings" (turning text into numbers for search).
+# It stores and retrieves chunks of text from medical guidelines in the
+# knowledge collection of the shared FAISS vector store (app.db.vector_store),
+# so the API and the agents load one embedding model and one index.
 
 class MedicalRAGTool(BaseTool):
     name = "medical_rag"
     description = "Searches medical guidelines for relevant context."
 
-    def __init__(self):
+    def __init__(self, top_k: int = 3):
         super().__init__(name="medical_rag", description="Searches medical guidelines for relevant context.")
-        # Initialize ChromaDB (persistent storage)
-        self.client = chromadb.PersistentClient(path=settings.VECTOR_DB_DIR)
-        
-        # We use a simple local embedding function via Chroma's built-in SentenceTransformers default
-        # Or we could call HF API if local is too heavy. Let's try default lightweight local first.
-        self.ef = embedding_functions.DefaultEmbeddingFunction()
-        
-        self.collection = self.client.get_or_create_collection(
-            name="medical_guidelines", 
-            embedding_function=self.ef
-        )
+        self.top_k = top_k
 
     def add_knowledge(self, text_chunks: list, source_name: str):
         """
-        Adds new medical knowledge to the library.
+        Adds new medical knowledge to the library (replacing an earlier copy of the same source).
         """
-        ids = [f"{source_name}_{i}" for i in range(len(text_chunks))]
-        metadatas = [{"source": source_name} for _ in text_chunks]
-        
-        self.collection.add(
-            documents=text_chunks,
-            ids=ids,
-            metadatas=metadatas
-        )
+        metadatas = [
+            {"source": source_name, "type": "knowledge", "chunk_index": i}
+            for i in range(len(text_chunks))
+        ]
+        add_chunks("knowledge", text_chunks, metadatas, replace_group=source_name)
 
     def run(self, query: str):
         """
         Retrieves the top 3 most relevant medical facts for a query.
         """
         print(f"--- [RAG] Searching for: {query} ---")
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=3
-        )
-        
+        hits = retrieve(query, k=0, knowledge_k=self.top_k)
+
         # Format results into a single string context
-        context_str = ""
-        if results['documents']:
-            context_str = "\n".join(results['documents'][0])
-        
+        context_str = "\n".join(h["text"] for h in hits)
+
         return context_str if context_str else "No specific medical guidelines found for this."
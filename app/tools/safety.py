@@ -1,4 +1,6 @@
 from google.adk.tools import BaseTool
+from app.utils.lab_values import ANALYTES, match_analyte
+from app.utils.safety_rules import CriticalRules
 
 # This tool acts as the "Safety Net".
 # It quickly scans for values that are "Critical" (life-threatening)
@@ -10,28 +12,25 @@ class SafetyCheckerTool(BaseTool):
 
     def __init__(self):
         super().__init__(name="safety_checker", description="Checks extracted values for critical/panic levels.")
+        self.rules = CriticalRules()
 
     def run(self, extracted_data: dict):
         warnings = []
         
-        # In a real system, this would be a comprehensive rules engine.
-        # Here we demonstrate the LOGIC with some examples.
+        # Thresholds live in app.utils.safety_rules so the archive-wide
+        # re-evaluation job (app.jobs.reevaluate_safety) applies the same rules.
         
         if "results" in extracted_data:
+            readings = []
             for item in extracted_data["results"]:
-                test_name = item.get("test", "").lower()
+                analyte = match_analyte(item.get("test", ""))
                 try:
                     val = float(item.get("value", 0))
                 except:
                     continue
-                
-                # Example Rule: Hemoglobin < 7 is critical
-                if "hemoglobin" in test_name and val < 7.0:
-                    warnings.append(f"CRITICAL: Hemoglobin is {val} g/dL (Severe Anemia Risk)")
-                    
-                # Example Rule: Potassium > 6.0 is critical
-                if "potassium" in test_name and val > 6.0:
-                    warnings.append(f"CRITICAL: Potassium is {val} mmol/L (Hyperkalemia Risk)")
+                if analyte:
+                    readings.append({"analyte": analyte, "name": ANALYTES[analyte][0], "value": val})
+            warnings = [f["message"] for f in self.rules.check(readings)]
 
         if warnings:
             return "SAFETY ALERT: " + " | ".join(warnings)
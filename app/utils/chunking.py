@@ -0,0 +1,56 @@
+import hashlib
+from typing import List
+
+
+def chunk_text(text: str, max_chars: int = 900, overlap: int = 150) -> List[str]:
+    """Split text into overlapping windows of at most `max_chars` for embedding.
+
+    Windows end and start at line breaks when one falls within `overlap` chars
+    of the cut, so lab rows stay whole and an edit to one page leaves the
+    chunks of the other pages unchanged (see chunk_hash).
+    """
+    cleaned = (text or "").replace("\r\n", "\n").strip()
+    if not cleaned:
+        return []
+    parts: List[str] = []
+    idx = 0
+    while idx < len(cleaned):
+        end = min(len(cleaned), idx + max_chars)
+        if end < len(cleaned):
+            cut = cleaned.rfind("\n", max(idx + 1, end - overlap), end)
+            end = cut if cut != -1 else end
+        chunk = cleaned[idx:end].strip()
+        if chunk:
+            parts.append(chunk)
+        if end >= len(cleaned):
+            break
+        start = max(idx + 1, end - overlap)
+        line = cleaned.find("\n", start, end)
+        idx = line + 1 if line != -1 else start
+    return parts
+
+
+def chunk_hash(text: str) -> str:
+    """Content key of a chunk: re-uploads reuse the embedding of any chunk with the same hash."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def join_chunks(chunks: List[str]) -> str:
+    """Rebuild text from consecutive chunk_text windows, dropping the overlap between them.
+
+    Each window starts at a line that ends the previous one, so the longest
+    suffix of the text so far that is also a prefix of the next window (and
+    starts a line) is the overlap.
+    """
+    text = ""
+    for chunk in chunks:
+        if not text:
+            text = chunk
+            continue
+        overlap = 0
+        for k in range(min(len(text), len(chunk)), 0, -1):
+            if text.endswith(chunk[:k]) and (k == len(text) or text[-k - 1] == "\n"):
+                overlap = k
+                break
+        text = text + chunk[overlap:] if overlap else f"{text}\n{chunk}"
+    return text
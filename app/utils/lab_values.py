@@ -0,0 +1,187 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Lightweight lab-value extraction from OCR / PDF text.
+# Report lines look like "Hemoglobin g/dL 13.0 - 16.5Colorimetric 14.5" or
+# "Glucose: 105 mg/dL (H)", so we match a known analyte name, pull out the
+# reference range if there is one, blank out numbers that belong to units
+# ("10^3/uL", "1.73m2") or thresholds (">60"), and take the first remaining
+# number as the value.
+
+# analyte key -> (display name, canonical unit, name patterns)
+ANALYTES: Dict[str, Tuple[str, str, Tuple[str, ...]]] = {
+    "hemoglobin": ("Hemoglobin", "g/dL", ("hemoglobin", "haemoglobin", "hgb", "hb")),
+    "hba1c": ("HbA1c", "%", ("hba1c", "hb a1c", "glycated hemoglobin", "a1c")),
+    "glucose": ("Glucose", "mg/dL", ("glucose", "blood sugar", "fbs", "rbs")),
+    "potassium": ("Potassium", "mmol/L", ("potassium", "k\\+")),
+    "sodium": ("Sodium", "mmol/L", ("sodium", "na\\+")),
+    "calcium": ("Calcium", "mg/dL", ("calcium",)),
+    "creatinine": ("Creatinine", "mg/dL", ("creatinine",)),
+    "egfr": ("eGFR", "mL/min/1.73m2", ("egfr",)),
+    "wbc": ("WBC Count", "/cmm", ("wbc count", "wbc", "white blood cell count", "leukocytes")),
+    "rbc": ("RBC Count", "million/cmm", ("rbc count", "rbc", "red blood cell count")),
+    "platelets": ("Platelet Count", "/cmm", ("platelet count", "platelets", "plt")),
+    "hematocrit": ("Hematocrit", "%", ("hematocrit", "haematocrit", "hct", "pcv")),
+    "mcv": ("MCV", "fL", ("mcv",)),
+    "mch": ("MCH", "pg", ("mch",)),
+    "mchc": ("MCHC", "g/dL", ("mchc",)),
+    "rdw": ("RDW CV", "%", ("rdw cv", "rdw")),
+    "tsh": ("TSH", "mIU/L", ("tsh",)),
+    "cholesterol": ("Total Cholesterol", "mg/dL", ("total cholesterol", "cholesterol")),
+    "ldl": ("LDL Cholesterol", "mg/dL", ("ldl",)),
+    "hdl": ("HDL Cholesterol", "mg/dL", ("hdl",)),
+    "triglycerides": ("Triglycerides", "mg/dL", ("triglycerides",)),
+    "alt": ("ALT", "U/L", ("alt", "sgpt")),
+    "ast": ("AST", "U/L", ("ast", "sgot")),
+}
+
+# Counts that are reported either per cmm or in thousands (x10^3/uL).
+_THOUSANDS_SCALED = {"wbc": 200.0, "platelets": 2000.0}
+
+_NUM = r"\d+(?:\.\d+)?"
+_RANGE_RE = re.compile(rf"({_NUM})\s*-\s*({_NUM})")
+_NUM_RE = re.compile(_NUM)
+_UNIT_RE = re.compile(
+    r"(mg/dl|g/dl|mmol/l|meq/l|miu/l|u/l|iu/l|ml/min(?:/1\.73m2)?|million/cmm|/cmm|10\^3/ul|fl|pg|%)",
+    re.IGNORECASE,
+)
+# Numbers that are part of a unit or a one-sided reference limit, never the value.
+_NOT_VALUE_RE = re.compile(
+    rf"(?:[x×*]\s*)?10\s*\^\s*\d+|1\.73\s*m2|[<>≤≥]=?\s*{_NUM}",
+    re.IGNORECASE,
+)
+_DATE_RE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b|\b(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})\b")
+# Labels in order of preference for the report date; dates of birth never are.
+_DATE_LABELS = (
+    re.compile(r"collect|sample|specimen|drawn", re.IGNORECASE),
+    re.compile(r"report|result|received|registered", re.IGNORECASE),
+)
+_BIRTH_LABEL_RE = re.compile(r"\bdob\b|d\.o\.b|birth|\bborn\b", re.IGNORECASE)
+
+
+def _compile_patterns() -> List[Tuple[str, "re.Pattern"]]:
+    compiled = []
+    for key, (_, _, names) in ANALYTES.items():
+        # Longest alias first so "wbc count" wins over "wbc".
+        alt = "|".join(sorted(names, key=len, reverse=True))
+        compiled.append((key, re.compile(rf"(?<![a-z0-9])(?:{alt})(?![a-z0-9])", re.IGNORECASE)))
+    return compiled
+
+
+_PATTERNS = _compile_patterns()
+
+
+def _first_match(line: str) -> Optional[Tuple[str, "re.Match"]]:
+    # Earliest, then longest, match wins: "Glycated hemoglobin" is HbA1c, not Hemoglobin.
+    best = None
+    for key, pattern in _PATTERNS:
+        m = pattern.search(line)
+        if m and (best is None or (m.start(), -len(m.group(0))) < (best[1].start(), -len(best[1].group(0)))):
+            best = (key, m)
+    return best
+
+
+def match_analyte(name: str) -> Optional[str]:
+    """Map a free-text test name onto an analyte key, if it is one we know."""
+    found = _first_match(name or "")
+    return found[0] if found else None
+
+
+def _parse_line(line: str) -> Optional[Dict]:
+    found = _first_match(line)
+    if not found:
+        return None
+    key, m = found
+    rest = line[m.end():]
+    low = high = None
+    # Blank unit/threshold numbers out (same length) so neither the range nor the value picks them up.
+    masked = _NOT_VALUE_RE.sub(lambda n: " " * len(n.group(0)), rest)
+    spans: List[Tuple[int, int]] = []
+    rng = _RANGE_RE.search(masked)
+    if rng:
+        low, high = float(rng.group(1)), float(rng.group(2))
+        spans.append(rng.span())
+    candidates = [
+        n for n in _NUM_RE.finditer(masked)
+        if not any(s <= n.start() < e for s, e in spans)
+    ]
+    if not candidates:
+        return None
+    value = float(candidates[0].group(0))
+    display, unit, _ = ANALYTES[key]
+    unit_m = _UNIT_RE.search(rest)
+    if unit_m:
+        unit = unit_m.group(1)
+    scale_below = _THOUSANDS_SCALED.get(key)
+    if scale_below is not None and value < scale_below:
+        value *= 1000.0
+        low = low * 1000.0 if low is not None and low < scale_below else low
+        high = high * 1000.0 if high is not None and high < scale_below else high
+        unit = "/cmm"
+    return {
+        "analyte": key,
+        "name": display,
+        "value": value,
+        "unit": unit,
+        "low": low,
+        "high": high,
+    }
+
+
+def extract_lab_values(text: str) -> List[Dict]:
+    """Extract analyte readings from report text, one per (analyte, value)."""
+    out: List[Dict] = []
+    seen = set()
+    for raw in (text or "").splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        parsed = _parse_line(line)
+        if not parsed:
+            continue
+        # Overlapping RAG chunks repeat lines; keep one reading per analyte/value.
+        sig = (parsed["analyte"], parsed["value"])
+        if sig in seen:
+            continue
+        seen.add(sig)
+        out.append(parsed)
+    return out
+
+
+def _date_of(m: "re.Match") -> Optional[str]:
+    if m.group(1):
+        y, mo, d = int(m.group(1)), int(m.group(2)), int(m.group(3))
+    else:
+        d, mo, y = int(m.group(4)), int(m.group(5)), int(m.group(6))
+    if not (1 <= mo <= 12 and 1 <= d <= 31):
+        return None
+    return f"{y:04d}-{mo:02d}-{d:02d}"
+
+
+def extract_report_date(text: str) -> Optional[str]:
+    """Find the date the report is about, as YYYY-MM-DD.
+
+    A date labelled as the sample collection date wins, then one labelled as
+    the report date, then the first other date; dates of birth are skipped.
+    """
+    best: Optional[Tuple[int, str]] = None
+    label_above = ""
+    for line in (text or "").splitlines():
+        start = 0
+        for m in _DATE_RE.finditer(line):
+            # The label is the text since the previous date on the line, or the line above.
+            label = line[start:m.start()]
+            if not re.search(r"[a-z]", label, re.IGNORECASE):
+                label = label_above
+            start = m.end()
+            if _BIRTH_LABEL_RE.search(label):
+                continue
+            rank = next((i for i, pattern in enumerate(_DATE_LABELS) if pattern.search(label)), len(_DATE_LABELS))
+            day = _date_of(m)
+            if day and (best is None or rank < best[0]):
+                best = (rank, day)
+                if rank == 0:
+                    return day
+        if line.strip():
+            label_above = "" if start else line  # only a line holding nothing but a label
+    return best[1] if best else None
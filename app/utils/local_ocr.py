@@ -0,0 +1,115 @@
+"""
+Local OCR engine
+================
+Tesseract (via pytesseract) in a process pool, so scanned pages can be read
+without a network round trip or an HF quota unit, and offline. Each page
+comes back with Tesseract's mean word confidence (0-100); with
+HF_OCR_MODE=local, pages below LOCAL_OCR_MIN_CONFIDENCE are escalated to the
+remote VLM, while HF_OCR_MODE=local_only never leaves the machine.
+
+Optional: needs the `pytesseract` package and the `tesseract` binary
+(apt install tesseract-ocr, or TESSERACT_CMD pointing at it). Without them
+available() is False and OCR goes to the remote path as before.
+
+    result = await local_ocr.ocr(image_bytes)    # (text, confidence) or None
+    python -m benchmarks.ocr_engine_benchmark    # local vs remote vs escalation
+"""
+
+import asyncio
+import importlib.util
+import io
+import os
+import shutil
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.workers import ProcessPool
+
+LOCAL_OCR_LANG = os.getenv("LOCAL_OCR_LANG", "eng")
+LOCAL_OCR_MIN_CONFIDENCE = float(os.getenv("LOCAL_OCR_MIN_CONFIDENCE", "75"))
+LOCAL_OCR_WORKERS = int(os.getenv("LOCAL_OCR_WORKERS", "2"))
+LOCAL_OCR_TIMEOUT = float(os.getenv("LOCAL_OCR_TIMEOUT", "30"))
+TESSERACT_CMD = os.getenv("TESSERACT_CMD", "")
+# Page segmentation: 4 = a single column of variable-size text (lab report tables read best).
+LOCAL_OCR_PSM = int(os.getenv("LOCAL_OCR_PSM", "4"))
+
+# HF_OCR_MODE values that use this engine ("tesseract" is an alias of "local").
+LOCAL_OCR_MODES = {"local", "local_only", "tesseract"}
+
+_POOL = ProcessPool("Local OCR", LOCAL_OCR_WORKERS)
+_AVAILABLE: Optional[bool] = None
+
+
+def available() -> bool:
+    """True if pytesseract and the tesseract binary are both installed."""
+    global _AVAILABLE
+    if _AVAILABLE is None:
+        _AVAILABLE = importlib.util.find_spec("pytesseract") is not None and bool(
+            TESSERACT_CMD or shutil.which("tesseract")
+        )
+        if not _AVAILABLE:
+            print("⚠ Local OCR unavailable (install pytesseract and tesseract-ocr)")
+    return _AVAILABLE
+
+
+# ---------- runs in the worker ----------
+
+def _lines(data: Dict[str, List]) -> Tuple[str, float]:
+    """Text (one line per Tesseract line) and length-weighted mean word confidence."""
+    lines: Dict[Tuple[int, int, int], List[str]] = {}
+    weighted = chars = 0.0
+    for word, conf, block, par, line in zip(
+        data["text"], data["conf"], data["block_num"], data["par_num"], data["line_num"]
+    ):
+        word = (word or "").strip()
+        conf = float(conf)
+        if not word or conf < 0:
+            continue
+        lines.setdefault((block, par, line), []).append(word)
+        weighted += conf * len(word)
+        chars += len(word)
+    text = "\n".join(" ".join(words) for _, words in sorted(lines.items()))
+    return text, (weighted / chars if chars else 0.0)
+
+
+def ocr_page(image_bytes: bytes, lang: str = LOCAL_OCR_LANG) -> Tuple[str, float]:
+    """(text, confidence 0-100) of one page image. Runs in-process."""
+    import pytesseract
+    from PIL import Image
+
+    if TESSERACT_CMD:
+        pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+    img = Image.open(io.BytesIO(image_bytes))
+    data = pytesseract.image_to_data(
+        img, lang=lang, config=f"--psm {LOCAL_OCR_PSM}", output_type=pytesseract.Output.DICT
+    )
+    return _lines(data)
+
+
+def _import_engine() -> None:
+    import pytesseract  # noqa: F401
+    from PIL import Image  # noqa: F401
+
+
+
+# ---------- pool ----------
+
+def warm_pool():
+    return _POOL.warm(_import_engine)
+
+
+def reset_pool(kill: bool = False) -> None:
+    _POOL.reset(kill)
+
+
+async def ocr(image_bytes: bytes, timeout: float = LOCAL_OCR_TIMEOUT) -> Optional[Tuple[str, float]]:
+    """ocr_page() in the pool; None if the engine is missing, failed or timed out."""
+    if not available():
+        return None
+    try:
+        return await _POOL.run(ocr_page, image_bytes, LOCAL_OCR_LANG, timeout=timeout)
+    except (asyncio.TimeoutError, BrokenProcessPool):
+        pass  # already reported and restarted by the pool
+    except Exception as e:
+        print(f"Local OCR failed: {e}")
+    return None
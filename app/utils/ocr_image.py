@@ -0,0 +1,128 @@
+"""
+OCR image preparation
+=====================
+Turns PDF pages and uploaded photos into compact OCR payloads. The VLM OCR
+request carries the image base64-encoded in JSON, so a 200 dpi colour PNG of
+a Letter page (several MB) mostly costs upload time and provider-side decode.
+For each image:
+
+  * PDF pages are rendered at a DPI chosen from the page size so the long edge
+    lands near OCR_TARGET_LONG_EDGE pixels (clamped to OCR_MIN_DPI..OCR_MAX_DPI);
+    photos larger than that are downscaled;
+  * grayscale (OCR_GRAYSCALE) - lab reports carry no information in colour;
+  * blank margins are cropped (OCR_CROP_MARGINS), keeping a small border;
+  * encoded as OCR_IMAGE_FORMAT (jpeg | webp | png) at OCR_IMAGE_QUALITY.
+
+Any failure falls back to the original bytes. benchmarks/ocr_payload_benchmark.py
+compares payload size, upload time and OCR accuracy across settings.
+"""
+
+import io
+import os
+from typing import Tuple
+
+OCR_TARGET_LONG_EDGE = int(os.getenv("OCR_TARGET_LONG_EDGE", "1800"))  # px
+OCR_MIN_DPI = int(os.getenv("OCR_MIN_DPI", "110"))
+OCR_MAX_DPI = int(os.getenv("OCR_MAX_DPI", "200"))
+OCR_GRAYSCALE = os.getenv("OCR_GRAYSCALE", "1").strip().lower() not in {"0", "false", "no"}
+OCR_CROP_MARGINS = os.getenv("OCR_CROP_MARGINS", "1").strip().lower() not in {"0", "false", "no"}
+OCR_IMAGE_FORMAT = os.getenv("OCR_IMAGE_FORMAT", "jpeg").strip().lower()  # jpeg | webp | png
+OCR_IMAGE_QUALITY = int(os.getenv("OCR_IMAGE_QUALITY", "80"))
+
+_MIME = {"jpeg": "image/jpeg", "webp": "image/webp", "png": "image/png"}
+_INK_THRESHOLD = 200  # gray level below which a pixel counts as content when cropping
+_CROP_PAD = 16  # px of margin kept around the content
+
+
+def page_dpi(width_pt: float, height_pt: float, target_long_edge: int = OCR_TARGET_LONG_EDGE) -> int:
+    """Render DPI that puts the page's long edge near `target_long_edge` pixels."""
+    long_edge_in = max(width_pt, height_pt, 1.0) / 72.0
+    return int(min(OCR_MAX_DPI, max(OCR_MIN_DPI, round(target_long_edge / long_edge_in))))
+
+
+def _crop_margins(img):
+    from PIL import ImageOps
+
+    gray = img if img.mode == "L" else img.convert("L")
+    bbox = ImageOps.invert(gray).point(lambda v: 255 if v > 255 - _INK_THRESHOLD else 0).getbbox()
+    if not bbox:
+        return img  # blank page
+    left, top, right, bottom = bbox
+    return img.crop((
+        max(0, left - _CROP_PAD),
+        max(0, top - _CROP_PAD),
+        min(img.width, right + _CROP_PAD),
+        min(img.height, bottom + _CROP_PAD),
+    ))
+
+
+def encode_image(
+    img,
+    fmt: str = OCR_IMAGE_FORMAT,
+    quality: int = OCR_IMAGE_QUALITY,
+    grayscale: bool = OCR_GRAYSCALE,
+    crop: bool = OCR_CROP_MARGINS,
+    max_long_edge: int = OCR_TARGET_LONG_EDGE,
+) -> Tuple[bytes, str]:
+    """(bytes, mime) of a PIL image after grayscale/crop/downscale and re-encoding."""
+    from PIL import Image
+
+    img = img.convert("L") if grayscale else img.convert("RGB")
+    if crop:
+        img = _crop_margins(img)
+    if max_long_edge and max(img.size) > max_long_edge:
+        scale = max_long_edge / max(img.size)
+        img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.LANCZOS)
+    fmt = fmt if fmt in _MIME else "jpeg"
+    buf = io.BytesIO()
+    if fmt == "png":
+        img.save(buf, format="PNG", optimize=True)
+    elif fmt == "webp":
+        img.save(buf, format="WEBP", quality=quality, method=4)
+    else:
+        img.save(buf, format="JPEG", quality=quality, optimize=True)
+    return buf.getvalue(), _MIME[fmt]
+
+
+def render_pdf_page(page, **encode_kwargs) -> Tuple[bytes, str]:
+    """(bytes, mime) of a PyMuPDF page rendered at page_dpi() and prepared for OCR."""
+    import fitz  # PyMuPDF
+    from PIL import Image
+
+    grayscale = encode_kwargs.get("grayscale", OCR_GRAYSCALE)
+    dpi = page_dpi(page.rect.width, page.rect.height, encode_kwargs.get("max_long_edge") or OCR_TARGET_LONG_EDGE)
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY if grayscale else fitz.csRGB, alpha=False)
+    img = Image.frombytes("L" if grayscale else "RGB", (pix.width, pix.height), pix.samples)
+    return encode_image(img, **encode_kwargs)
+
+
+def page_is_blank(page, dpi: int = 30) -> bool:
+    """True if a PyMuPDF page renders with no ink (e.g. an empty scanned sheet); cheap low-DPI check."""
+    import fitz  # PyMuPDF
+    from PIL import Image
+
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    # Ignore the outermost pixels, where scanner edges and shadows sit.
+    border = max(1, min(img.size) // 20)
+    inner = img.crop((border, border, img.width - border, img.height - border))
+    return inner.getextrema()[0] >= _INK_THRESHOLD
+
+
+def prepare_image(image_bytes: bytes, **encode_kwargs) -> Tuple[bytes, str]:
+    """(bytes, mime) of an uploaded photo/scan prepared for OCR.
+
+    The original is returned when it is already smaller or cannot be decoded.
+    """
+    original_mime = "image/jpeg" if image_bytes[:3] == b"\xff\xd8\xff" else "image/png"
+    try:
+        from PIL import Image, ImageOps
+
+        img = ImageOps.exif_transpose(Image.open(io.BytesIO(image_bytes)))
+        prepared, mime = encode_image(img, **encode_kwargs)
+    except Exception as e:
+        print(f"⚠ OCR image prep failed, sending original: {e}")
+        return image_bytes, original_mime
+    if len(prepared) >= len(image_bytes):
+        return image_bytes, original_mime
+    return prepared, mime
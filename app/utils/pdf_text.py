@@ -0,0 +1,141 @@
+"""
+Off-loop PDF text extraction
+============================
+Native text extraction and per-page classification run in a small process
+pool, so a large report never stalls the event loop (or, being CPU-bound,
+the other requests' threads via the GIL). Backends:
+
+  * pymupdf - PyMuPDF `get_text`; also classifies each page as "text", "ocr"
+    (scanned / image-only / vector-drawn) or "blank";
+  * pypdf   - pure Python and slower; pages without enough text are marked
+    "ocr" and left to the OCR stage to sort out;
+  * auto    - pymupdf when installed, else pypdf.
+
+Each document gets PDF_EXTRACT_TIMEOUT seconds; a worker that overruns is
+killed and replaced without
+disturbing the other extractions in flight. PDF_EXTRACT_WORKERS=0 extracts on a thread
+instead of a process (e.g. where spawning processes is not allowed).
+
+    pages = await pdf_text.extract_pages(path, data)   # [(kind, text), ...] or None
+    python -m benchmarks.pdf_extract_benchmark         # pages/second per backend
+"""
+
+import asyncio
+import importlib.util
+import io
+import os
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+
+from app.utils.workers import ProcessPool
+
+PDF_TEXT_BACKEND = os.getenv("PDF_TEXT_BACKEND", "auto").strip().lower()  # auto | pymupdf | pypdf
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "2"))
+PDF_EXTRACT_TIMEOUT = float(os.getenv("PDF_EXTRACT_TIMEOUT", "30"))
+# A page with this much native text uses it; sparser pages are candidates for OCR.
+PDF_PAGE_TEXT_CHARS = int(os.getenv("PDF_PAGE_TEXT_CHARS", "200"))
+# ...and are OCR'd when at least this share of the page is covered by images.
+PDF_PAGE_IMAGE_COVERAGE = float(os.getenv("PDF_PAGE_IMAGE_COVERAGE", "0.3"))
+
+BACKENDS = ("pymupdf", "pypdf")
+
+Page = Tuple[str, str]  # (kind, native text); kind is "text", "ocr" or "blank"
+
+
+def resolve_backend(backend: str = PDF_TEXT_BACKEND) -> str:
+    if backend in BACKENDS:
+        return backend
+    return "pymupdf" if importlib.util.find_spec("fitz") is not None else "pypdf"
+
+
+# ---------- extraction (runs in the worker) ----------
+
+def _classify_page(page) -> Page:
+    import fitz  # PyMuPDF
+
+    from app.utils.ocr_image import page_is_blank
+
+    text = (page.get_text() or "").strip()
+    if len(text) >= PDF_PAGE_TEXT_CHARS:
+        return "text", text
+    images = page.get_image_info()
+    covered = sum(abs(fitz.Rect(info["bbox"]) & page.rect) for info in images)
+    if covered / (abs(page.rect) or 1.0) >= PDF_PAGE_IMAGE_COVERAGE or (images and not text):
+        return ("ocr" if text or not page_is_blank(page) else "blank"), text
+    if text:
+        return "text", text
+    return ("ocr" if page.get_cdrawings() else "blank"), text
+
+
+def _pages_pymupdf(source) -> List[Page]:
+    import fitz
+
+    doc = fitz.open(stream=source, filetype="pdf") if isinstance(source, bytes) else fitz.open(source)
+    with doc:
+        return [_classify_page(page) for page in doc]
+
+
+def _pages_pypdf(source) -> List[Page]:
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(source) if isinstance(source, bytes) else source)
+    pages = []
+    for page in reader.pages:
+        text = (page.extract_text() or "").strip()
+        pages.append(("text" if len(text) >= PDF_PAGE_TEXT_CHARS else "ocr", text))
+    return pages
+
+
+def read_pages(source, backend: str = PDF_TEXT_BACKEND) -> List[Page]:
+    """(kind, native text) per page of a PDF given as a path or bytes. Runs in-process."""
+    if resolve_backend(backend) == "pymupdf":
+        return _pages_pymupdf(source)
+    return _pages_pypdf(source)
+
+
+def _import_backend(backend: str) -> None:
+    if backend == "pymupdf":
+        import fitz  # noqa: F401
+
+        from app.utils import ocr_image  # noqa: F401  (PIL, for blank-page checks)
+    else:
+        import pypdf  # noqa: F401
+
+
+# ---------- pool ----------
+
+_POOL = ProcessPool("PDF extraction", PDF_EXTRACT_WORKERS)
+
+
+def get_pool():
+    return _POOL
+
+
+def warm_pool(backend: str = PDF_TEXT_BACKEND):
+    """Start every worker and import the backend there, so the first upload pays nothing."""
+    return _POOL.warm(_import_backend, resolve_backend(backend))
+
+
+def reset_pool(kill: bool = False) -> None:
+    _POOL.reset(kill)
+
+
+async def extract_pages(
+    file_path: str,
+    data: Optional[bytes] = None,
+    backend: str = PDF_TEXT_BACKEND,
+    timeout: float = PDF_EXTRACT_TIMEOUT,
+) -> Optional[List[Page]]:
+    """read_pages() off the event loop within `timeout`; None if it failed or timed out."""
+    source = data if data is not None else file_path
+    try:
+        if PDF_EXTRACT_WORKERS <= 0:
+            return await asyncio.wait_for(asyncio.to_thread(read_pages, source, backend), timeout)
+        return await _POOL.run(read_pages, source, backend, timeout=timeout)
+    except asyncio.TimeoutError:
+        print(f"⚠ PDF text extraction timed out after {timeout:g}s: {file_path}")
+    except BrokenProcessPool:
+        pass  # already reported and restarted by the pool
+    except Exception as e:
+        print(f"PDF text extract failed: {e}")
+    return None
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Critical ("panic") value rules shared by the SafetyCheckerTool and the
+# archive-wide re-evaluation job. Thresholds are per analyte key from
+# app.utils.lab_values; a reading strictly below `low` or above `high` is critical.
+
+SAFETY_FLAGS_FILE = os.path.join("data", "safety_flags.json")
+
+DEFAULT_CRITICAL_RULES: Dict[str, Dict] = {
+    "hemoglobin": {"low": 7.0, "high": 20.0, "unit": "g/dL",
+                   "low_label": "Severe Anemia Risk", "high_label": "Polycythemia Risk"},
+    "potassium": {"low": 2.5, "high": 6.0, "unit": "mmol/L",
+                  "low_label": "Hypokalemia Risk", "high_label": "Hyperkalemia Risk"},
+    "sodium": {"low": 120.0, "high": 160.0, "unit": "mmol/L",
+               "low_label": "Hyponatremia Risk", "high_label": "Hypernatremia Risk"},
+    "glucose": {"low": 50.0, "high": 400.0, "unit": "mg/dL",
+                "low_label": "Hypoglycemia Risk", "high_label": "Hyperglycemia Risk"},
+    "calcium": {"low": 6.0, "high": 13.0, "unit": "mg/dL",
+                "low_label": "Hypocalcemia Risk", "high_label": "Hypercalcemia Risk"},
+    "creatinine": {"low": None, "high": 7.0, "unit": "mg/dL",
+                   "high_label": "Acute Kidney Injury Risk"},
+    "wbc": {"low": 2000.0, "high": 30000.0, "unit": "/cmm",
+            "low_label": "Severe Leukopenia", "high_label": "Marked Leukocytosis"},
+    "platelets": {"low": 20000.0, "high": 1000000.0, "unit": "/cmm",
+                  "low_label": "Bleeding Risk", "high_label": "Thrombosis Risk"},
+    "hematocrit": {"low": 20.0, "high": 60.0, "unit": "%",
+                   "low_label": "Severe Anemia Risk", "high_label": "Hyperviscosity Risk"},
+}
+
+
+class CriticalRules:
+    """Critical thresholds laid out as arrays so a batch of readings is checked in one pass."""
+
+    def __init__(self, rules: Optional[Dict[str, Dict]] = None):
+        self.rules = dict(rules or DEFAULT_CRITICAL_RULES)
+        self.analytes: List[str] = sorted(self.rules)
+        self.codes = {a: i for i, a in enumerate(self.analytes)}
+        self.low = np.array(
+            [np.nan if self.rules[a].get("low") is None else float(self.rules[a]["low"]) for a in self.analytes],
+            dtype="float64",
+        )
+        self.high = np.array(
+            [np.nan if self.rules[a].get("high") is None else float(self.rules[a]["high"]) for a in self.analytes],
+            dtype="float64",
+        )
+
+    @classmethod
+    def from_file(cls, path: Optional[str]) -> "CriticalRules":
+        """Load thresholds from a JSON file, falling back to the built-in table."""
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return cls(json.load(f))
+        return cls()
+
+    def fingerprint(self) -> str:
+        """Stable identifier of the threshold set, stored with the flag index."""
+        blob = json.dumps(self.rules, sort_keys=True).encode("utf-8")
+        return hashlib.sha1(blob).hexdigest()[:12]
+
+    def evaluate(self, codes: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """Return -1 / 0 / +1 per reading (critically low / fine / critically high).
+
+        `codes` are indices into `self.analytes`; readings for analytes without a
+        rule must be filtered out by the caller.
+        """
+        if codes.size == 0:
+            return np.zeros(0, dtype="int8")
+        low = self.low[codes]
+        high = self.high[codes]
+        # NaN thresholds compare False, so one-sided rules need no special casing.
+        out = np.zeros(codes.shape, dtype="int8")
+        out[values < low] = -1
+        out[values > high] = 1
+        return out
+
+    def check(self, readings: Sequence[Dict]) -> List[Dict]:
+        """Evaluate a list of readings ({"analyte", "value", ...}) and return critical findings."""
+        keep = [r for r in readings if r.get("analyte") in self.codes]
+        if not keep:
+            return []
+        codes = np.fromiter((self.codes[r["analyte"]] for r in keep), dtype="int64", count=len(keep))
+        values = np.fromiter((float(r["value"]) for r in keep), dtype="float64", count=len(keep))
+        verdict = self.evaluate(codes, values)
+        return [self.finding(keep[i], int(verdict[i])) for i in np.flatnonzero(verdict)]
+
+    def finding(self, reading: Dict, direction: int) -> Dict:
+        rule = self.rules[reading["analyte"]]
+        side = "low" if direction < 0 else "high"
+        label = rule.get(f"{side}_label") or f"Critically {side}"
+        name = reading.get("name") or reading["analyte"]
+        unit = reading.get("unit") or rule.get("unit", "")
+        return {
+            "analyte": reading["analyte"],
+            "value": reading["value"],
+            "unit": unit,
+            "direction": side,
+            "threshold": rule[side],
+            "message": f"CRITICAL: {name} is {reading['value']:g} {unit} ({label})".replace("  ", " "),
+        }
+
+
+_FLAG_CACHE: Dict[str, object] = {"mtime": None, "flags": {}}
+
+
+def load_flag_index(path: str = SAFETY_FLAGS_FILE) -> Dict[str, List[Dict]]:
+    """report_id -> critical findings, as written by app.jobs.reevaluate_safety (cached by mtime)."""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    if _FLAG_CACHE["mtime"] != mtime:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                _FLAG_CACHE["flags"] = (json.load(f) or {}).get("flags", {})
+        except Exception:
+            _FLAG_CACHE["flags"] = {}
+        _FLAG_CACHE["mtime"] = mtime
+    return _FLAG_CACHE["flags"]  # type: ignore[return-value]
@@ -0,0 +1,196 @@
+"""
+Restartable process pools
+=========================
+CPU-bound work that must not run on the event loop (PDF text extraction,
+local OCR) goes to a small pool of lazily started worker processes. Workers
+are spawned, not forked, so they never inherit the server's threads or locks.
+
+Each worker has its own pipe and runs one task at a time, so a task that
+overruns its timeout is stopped by killing just the worker running it; the
+other tasks in flight carry on and a fresh worker replaces the killed one on
+next use. (ProcessPoolExecutor can't do this: losing any worker breaks the
+whole executor and fails every pending task.)
+
+    pool = ProcessPool("ocr", workers=2)
+    text = await pool.run(ocr_page, image_bytes, timeout=30)
+    future = pool.submit(extract, path)       # from a batch job's thread
+"""
+
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, List, Optional, Set
+
+
+def _serve(conn) -> None:
+    """Worker main loop: run (fn, args) messages until the pipe closes."""
+    while True:
+        try:
+            fn, args = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            reply = (True, fn(*args))
+        except BaseException as e:
+            reply = (False, e)
+        try:
+            conn.send(reply)
+        except Exception as e:  # unpicklable result or exception
+            conn.send((False, RuntimeError(f"{getattr(fn, '__name__', fn)}: could not return result: {e!r}")))
+
+
+class _Worker:
+    """One spawned process and the parent's end of its pipe."""
+
+    def __init__(self, ctx, generation: int):
+        self.generation = generation
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_serve, args=(child,), daemon=True)
+        self.proc.start()
+        child.close()
+
+    def call(self, fn: Callable, args: tuple) -> Any:
+        self.conn.send((fn, args))
+        ok, value = self.conn.recv()
+        if not ok:
+            raise value
+        return value
+
+    def stop(self, kill: bool = False) -> None:
+        if kill:
+            self.proc.terminate()
+        self.conn.close()  # an idle worker exits when its pipe closes
+
+
+class _Task:
+    __slots__ = ("worker", "timed_out")
+
+    def __init__(self):
+        self.worker: Optional[_Worker] = None
+        self.timed_out = False
+
+
+class ProcessPool:
+    """A named, lazily started spawn-context pool whose workers can be killed one at a time."""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = max(1, workers)
+        self._ctx = multiprocessing.get_context("spawn")
+        # One dispatcher thread per worker: a task waits here (cancellable) until a worker is free.
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._idle: List[_Worker] = []
+        self._busy: Set[_Worker] = set()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _dispatcher(self) -> ThreadPoolExecutor:
+        if self._threads is None:
+            with self._lock:
+                if self._threads is None:
+                    self._threads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+        return self._threads
+
+    def _checkout(self) -> _Worker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.proc.is_alive():
+                    self._busy.add(worker)
+                    return worker
+                worker.stop()
+            generation = self._generation
+        worker = _Worker(self._ctx, generation)
+        with self._lock:
+            self._busy.add(worker)
+        return worker
+
+    def _checkin(self, worker: _Worker) -> None:
+        """Return a worker after a clean call; workers from before a reset() are stopped instead."""
+        with self._lock:
+            self._busy.discard(worker)
+            if worker.generation == self._generation and len(self._idle) < self.workers:
+                self._idle.append(worker)
+                return
+        worker.stop()
+
+    def _call(self, task: _Task, fn: Callable, args: tuple) -> Any:
+        with self._lock:
+            if task.timed_out:
+                return None  # gave up while queued; don't start it
+        worker = self._checkout()
+        with self._lock:
+            started = not task.timed_out
+            if started:
+                task.worker = worker
+        if not started:
+            self._checkin(worker)
+            return None
+        try:
+            result = worker.call(fn, args)
+        except (EOFError, OSError) as e:
+            self._release(task, worker, dead=True)
+            raise BrokenProcessPool(f"{self.name} worker exited ({worker.proc.exitcode})") from e
+        except BaseException:
+            self._release(task, worker)
+            raise
+        self._release(task, worker)
+        return result
+
+    def _release(self, task: _Task, worker: _Worker, dead: bool = False) -> None:
+        with self._lock:
+            task.worker = None
+            dead = dead or task.timed_out  # run() has terminated it
+            if dead:
+                self._busy.discard(worker)
+        if dead:
+            worker.stop(kill=True)
+        else:
+            self._checkin(worker)
+
+    def warm(self, fn: Callable, *args) -> "ProcessPool":
+        """Start every worker and run `fn(*args)` once in each."""
+        workers = [self._checkout() for _ in range(self.workers)]  # processes boot in parallel
+        try:
+            for worker in workers:
+                worker.call(fn, args)
+        finally:
+            for worker in workers:
+                self._checkin(worker)
+        return self
+
+    def reset(self, kill: bool = False) -> None:
+        """Stop idle workers (new ones start on next use); kill=True also terminates busy workers."""
+        with self._lock:
+            self._generation += 1
+            idle, self._idle = self._idle, []
+            busy = list(self._busy) if kill else []
+        for worker in idle:
+            worker.stop(kill=True)
+        for worker in busy:
+            worker.proc.terminate()
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """fn(*args) in a worker, for batch jobs on plain threads (no timeout; see run())."""
+        return self._dispatcher().submit(self._call, _Task(), fn, args)
+
+    async def run(self, fn: Callable, *args, timeout: float) -> Any:
+        """fn(*args) in a worker. Raises asyncio.TimeoutError (after killing that worker) or BrokenProcessPool."""
+        loop = asyncio.get_running_loop()
+        task = _Task()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(self._dispatcher(), self._call, task, fn, args), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                task.timed_out = True
+                worker = task.worker
+            if worker is not None:
+                # Only this task's process; the dispatcher thread sees the pipe close and drops it.
+                print(f"⚠ {self.name} worker timed out after {timeout:g}s; restarting it")
+                worker.proc.terminate()
+            raise
+        except BrokenProcessPool as e:
+            print(f"⚠ {self.name} worker died ({e}); starting a new one")
+            raise
@@ -0,0 +1,4 @@
+"""
+CARE-BRIDGE AI benchmarks. Run from the repository root, e.g.
+    python -m benchmarks.ann_benchmark --synthetic 200000
+"""
@@ -0,0 +1,141 @@
+"""
+ANN index benchmark
+===================
+Compares every FAISS backend in app.db.faiss_index against the exact float32
+flat index: recall@k, single-query QPS and p50/p99 latency, build time and
+serialized size (= resident memory) per index and per vector.
+
+    # on the live corpus (vectors read back from data/vector_db/faiss.index)
+    python -m benchmarks.ann_benchmark [--collection knowledge]
+
+    # quantized storage only
+    python -m benchmarks.ann_benchmark --types flat,sq_fp16,sq8,pq
+
+    # on a synthetic corpus of clustered unit vectors
+    python -m benchmarks.ann_benchmark --synthetic 200000 --dim 384
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import List, Tuple
+
+import faiss
+import numpy as np
+
+from app.core.config import settings
+from app.db.faiss_index import (
+    COLLECTION_FILES,
+    INDEX_TYPES,
+    apply_search_params,
+    build_index,
+    ensure_id_mapped,
+    reconstruct_vectors,
+)
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype("float32")
+
+
+def synthetic_corpus(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors - closer to sentence embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(16, n // 200), dim))
+    assign = rng.integers(0, len(centers), n)
+    return _normalize(centers[assign] + 0.35 * rng.standard_normal((n, dim)))
+
+
+def live_corpus(index_path: str, store_path: str) -> np.ndarray:
+    index = ensure_id_mapped(faiss.read_index(index_path))
+    with open(store_path, "r", encoding="utf-8") as f:
+        ids = sorted(int(vid) for vid in json.load(f).get("vectors", {}))
+    vecs = reconstruct_vectors(index, ids)
+    if vecs is None or not len(vecs):
+        raise SystemExit(f"Could not read vectors back from {index_path}; use --synthetic")
+    return vecs
+
+
+def make_queries(corpus: np.ndarray, n: int, seed: int = 1) -> np.ndarray:
+    """Perturbed corpus vectors, so each query has true near neighbours."""
+    rng = np.random.default_rng(seed)
+    picks = corpus[rng.integers(0, len(corpus), n)]
+    return _normalize(picks + 0.1 * rng.standard_normal(picks.shape))
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f[f >= 0]) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def timed_search(index, queries: np.ndarray, k: int) -> Tuple[np.ndarray, float, np.ndarray]:
+    """Search one query at a time, the way the API does; returns (ids, QPS, per-query ms)."""
+    out = np.empty((len(queries), k), dtype="int64")
+    latencies = np.empty(len(queries))
+    started = time.perf_counter()
+    for i in range(len(queries)):
+        t0 = time.perf_counter()
+        _, ids = index.search(queries[i : i + 1], k)
+        latencies[i] = (time.perf_counter() - t0) * 1000
+        out[i] = ids[0]
+    return out, len(queries) / (time.perf_counter() - started), latencies
+
+
+def sweep(index_type: str) -> List[dict]:
+    if index_type in {"ivf_flat", "ivf_pq"}:
+        return [{"nprobe": p} for p in (1, 4, 16, 64)]
+    if index_type == "hnsw":
+        return [{"ef_search": e} for e in (16, 64, 256)]
+    return [{}]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recall@k / QPS of ANN backends versus the flat index.")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic vectors instead of the live index")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--collection", default="reports", choices=sorted(COLLECTION_FILES))
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", default=",".join(INDEX_TYPES))
+    args = parser.parse_args()
+
+    if args.synthetic:
+        corpus = synthetic_corpus(args.synthetic, args.dim)
+    else:
+        index_file, store_file = COLLECTION_FILES[args.collection]
+        corpus = live_corpus(
+            os.path.join(settings.VECTOR_DB_DIR, index_file),
+            os.path.join(settings.VECTOR_DB_DIR, store_file),
+        )
+    queries = make_queries(corpus, args.queries)
+    ids = np.arange(1, len(corpus) + 1, dtype="int64")
+    print(f"Corpus: {len(corpus)} x {corpus.shape[1]}, {len(queries)} queries, k={args.k}\n")
+
+    exact = build_index(corpus.shape[1], "flat")
+    exact.add_with_ids(corpus, ids)
+    truth, _, _ = timed_search(exact, queries, args.k)
+
+    print(
+        f"{'type':<10} {'params':<14} {'recall@k':>9} {'QPS':>9} {'p50 ms':>7} {'p99 ms':>7} "
+        f"{'build s':>8} {'size MB':>8} {'B/vec':>6}"
+    )
+    for index_type in [t.strip() for t in args.types.split(",") if t.strip()]:
+        started = time.perf_counter()
+        index = build_index(corpus.shape[1], index_type, train_vectors=corpus)
+        index.add_with_ids(corpus, ids)
+        build_s = time.perf_counter() - started
+        size_mb = faiss.serialize_index(index).nbytes / 1e6
+        for params in sweep(index_type):
+            apply_search_params(index, **params)
+            found, qps, latencies = timed_search(index, queries, args.k)
+            label = ",".join(f"{k}={v}" for k, v in params.items()) or "-"
+            p50, p99 = np.percentile(latencies, [50, 99])
+            print(
+                f"{index_type:<10} {label:<14} {recall_at_k(found, truth):>9.3f} {qps:>9.0f} "
+                f"{p50:>7.3f} {p99:>7.3f} {build_s:>8.2f} {size_mb:>8.1f} {size_mb * 1e6 / len(corpus):>6.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Synthetic lab-report corpus
+===========================
+Generates multi-panel lab reports (patient header, panels with analyte lines
+in the "Name unit low - high value" layout lab_values parses, narrative notes
+between panels) and writes them as text PDFs, scanned (image-only) PDFs and
+PNG images, plus a manifest.json with each file's ground-truth text.
+
+The mock HF router (benchmarks.mock_hf_router) reads the manifest so OCR of a
+corpus image returns that image's real text.
+
+    python -m benchmarks.corpus --out data/bench_corpus --pdfs 40 --scanned 10 --images 20
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import random
+from typing import Dict, List, Tuple
+
+from app.utils.lab_values import ANALYTES
+
+PANELS = {
+    "Complete Blood Count": ["hemoglobin", "rbc", "hematocrit", "mcv", "mch", "mchc", "rdw", "wbc", "platelets"],
+    "Kidney Function": ["creatinine", "egfr", "sodium", "potassium", "calcium"],
+    "Lipid Profile": ["cholesterol", "ldl", "hdl", "triglycerides"],
+    "Liver Function": ["alt", "ast"],
+    "Diabetes Screening": ["glucose", "hba1c"],
+    "Thyroid": ["tsh"],
+}
+RANGES = {
+    "hemoglobin": (13.0, 16.5), "rbc": (4.5, 5.5), "hematocrit": (40, 49), "mcv": (83, 101),
+    "mch": (27.1, 32.5), "mchc": (32.5, 36.7), "rdw": (11.6, 14.0), "wbc": (4000, 10000),
+    "platelets": (150000, 410000), "creatinine": (0.7, 1.3), "egfr": (90, 120), "sodium": (136, 145),
+    "potassium": (3.5, 5.1), "calcium": (8.6, 10.3), "cholesterol": (125, 200), "ldl": (0, 100),
+    "hdl": (40, 60), "triglycerides": (0, 150), "alt": (0, 45), "ast": (0, 35), "glucose": (70, 100),
+    "hba1c": (4.0, 5.6), "tsh": (0.4, 4.0),
+}
+NOTES = [
+    "Sample collected in the morning after overnight fasting; processed within two hours of collection.",
+    "Results should be interpreted in the context of the clinical history and other investigations.",
+    "Values outside the biological reference interval are flagged and may warrant repeat testing.",
+    "Hemolysed or lipemic samples can interfere with several of the measurements reported here.",
+    "Reference intervals are method specific and were established on the local adult population.",
+    "This panel is commonly requested as part of a routine health check or follow-up visit.",
+    "Please correlate clinically. Kindly discuss these findings with your treating physician.",
+    "Automated analyzer results were verified by a qualified laboratory professional before release.",
+]
+LINES_PER_PAGE = 45
+
+
+def synthetic_reports(n: int, seed: int = 7) -> List[Tuple[str, str]]:
+    """(report_id, text) for n multi-panel lab reports with narrative notes between panels."""
+    rng = random.Random(seed)
+    reports = []
+    for r in range(n):
+        lines = [f"PATIENT REPORT #{r:05d}", f"Collected: 2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"]
+        for panel in rng.sample(list(PANELS), rng.randint(3, len(PANELS))):
+            lines.append(f"\n{panel.upper()}")
+            lines.extend(rng.sample(NOTES, 2))
+            for key in PANELS[panel]:
+                display, unit, _ = ANALYTES[key]
+                low, high = RANGES[key]
+                value = round(rng.uniform(low * 0.7, high * 1.3), 1)
+                lines.append(f"{display} {unit} {low} - {high} {value}")
+            lines.append(rng.choice(NOTES))
+        reports.append((f"bench_{r}", "\n".join(lines)))
+    return reports
+
+
+def _pages(text: str) -> List[str]:
+    lines = text.splitlines()
+    return ["\n".join(lines[i:i + LINES_PER_PAGE]) for i in range(0, len(lines), LINES_PER_PAGE)] or [""]
+
+
+def render_png(text: str, width: int = 1240, font_size: int = 22) -> bytes:
+    """Black-on-white rendering of `text`, roughly a 150 dpi scan of one page."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    font = ImageFont.load_default(size=font_size)
+    line_h = int(font_size * 1.4)
+    lines = text.splitlines() or [""]
+    img = Image.new("L", (width, 80 + line_h * len(lines)), color=255)
+    draw = ImageDraw.Draw(img)
+    for i, line in enumerate(lines):
+        draw.text((60, 40 + i * line_h), line, fill=0, font=font)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def write_text_pdf(path: str, text: str) -> None:
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    for page_text in _pages(text):
+        page = doc.new_page()
+        page.insert_text((50, 60), page_text, fontsize=10)
+    doc.save(path)
+    doc.close()
+
+
+def write_scanned_pdf(path: str, text: str) -> None:
+    """Image-only PDF (no text layer), so uploads take the render + OCR path."""
+    import fitz
+
+    doc = fitz.open()
+    for page_text in _pages(text):
+        page = doc.new_page()
+        page.insert_image(page.rect, stream=render_png(page_text))
+    doc.save(path)
+    doc.close()
+
+
+def generate(out_dir: str, pdfs: int, scanned: int, images: int, seed: int = 7) -> List[Dict]:
+    """Write the corpus to out_dir and return the manifest entries."""
+    os.makedirs(out_dir, exist_ok=True)
+    reports = synthetic_reports(pdfs + scanned + images, seed=seed)
+    manifest: List[Dict] = []
+    for i, (report_id, text) in enumerate(reports):
+        if i < pdfs:
+            kind, name = "pdf_text", f"{report_id}.pdf"
+            write_text_pdf(os.path.join(out_dir, name), text)
+            digests = []
+        elif i < pdfs + scanned:
+            kind, name = "pdf_scanned", f"{report_id}_scan.pdf"
+            write_scanned_pdf(os.path.join(out_dir, name), text)
+            digests = []
+        else:
+            kind, name = "image", f"{report_id}.png"
+            text = _pages(text)[0]  # one photographed page
+            data = render_png(text)
+            with open(os.path.join(out_dir, name), "wb") as f:
+                f.write(data)
+            digests = [hashlib.sha256(data).hexdigest()]
+        manifest.append({"file": name, "kind": kind, "report_id": report_id, "text": text, "sha256": digests})
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic lab-report corpus for benchmarks.")
+    parser.add_argument("--out", default="data/bench_corpus")
+    parser.add_argument("--pdfs", type=int, default=40, help="Text-layer PDFs")
+    parser.add_argument("--scanned", type=int, default=10, help="Image-only PDFs (OCR path)")
+    parser.add_argument("--images", type=int, default=20, help="PNG photos of one page")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    manifest = generate(args.out, args.pdfs, args.scanned, args.images, seed=args.seed)
+    print(f"✓ Wrote {len(manifest)} reports to {args.out} (manifest.json has the ground-truth text)")
+
+
+if __name__ == "__main__":
+    main()
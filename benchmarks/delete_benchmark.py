@@ -0,0 +1,127 @@
+"""
+Report deletion benchmark
+=========================
+Cost of deleting many reports from a report-sized FAISS collection (random
+unit vectors, no embedder needed), three ways:
+
+  immediate  remove + compact per report (every delete rewrote the index file)
+  tombstone  one delete per report, a single compaction at the end
+  bulk       one delete for all reports (/api/documents/delete), then compaction
+
+plus the filtered search latency with the tombstones still in place versus
+after compaction.
+
+    python -m benchmarks.delete_benchmark --reports 2000 --chunks 8 --delete 500
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from app.db.faiss_index import build_index, write_index_atomic
+from app.db.vector_store import VectorCollection
+
+MODES = ("immediate", "tombstone", "bulk")
+
+
+def _collection(root: str) -> VectorCollection:
+    return VectorCollection(
+        "bench", os.path.join(root, "bench.index"), os.path.join(root, "bench.json"),
+        "flat", group_field="report_id", mmap=False,
+    )
+
+
+def _build(root: str, reports: int, chunks: int, dim: int, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    write_index_atomic(build_index(dim, "flat"), os.path.join(root, "bench.index"))
+    vecs = rng.standard_normal((reports * chunks, dim)).astype("float32")
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    metas = [{"report_id": f"r{r}", "chunk_index": c} for r in range(reports) for c in range(chunks)]
+    coll = _collection(root)
+    with coll.writer():
+        coll.add([f"chunk {m['report_id']}/{m['chunk_index']}" for m in metas], metas, embeddings=vecs)
+
+
+def _search_ms(coll: VectorCollection, queries: np.ndarray, k: int = 5) -> float:
+    started = time.perf_counter()
+    for q in queries:
+        coll.search(q.reshape(1, -1), k)
+    return (time.perf_counter() - started) * 1000 / len(queries)
+
+
+def _run(mode: str, template: str, delete: List[str], queries: np.ndarray) -> Dict:
+    root = tempfile.mkdtemp(prefix=f"delete-bench-{mode}-")
+    for name in os.listdir(template):
+        shutil.copy(os.path.join(template, name), root)
+    coll = _collection(root)
+    coll.load()
+
+    started = time.perf_counter()
+    if mode == "bulk":
+        with coll.writer():
+            coll.remove([vid for key in delete for vid in coll.group_ids(key)])
+    else:
+        for key in delete:
+            with coll.writer():
+                coll.remove(coll.group_ids(key))
+                if mode == "immediate":
+                    coll.compact()
+    delete_s = time.perf_counter() - started
+    tombstoned_ms = _search_ms(coll, queries) if coll.tombstones else None
+
+    started = time.perf_counter()
+    coll.compact()
+    compact_s = time.perf_counter() - started
+    row = {
+        "mode": mode,
+        "delete_s": delete_s,
+        "compact_s": compact_s,
+        "per_report_ms": (delete_s + compact_s) * 1000 / len(delete),
+        "search_tombstoned_ms": tombstoned_ms,
+        "search_compacted_ms": _search_ms(coll, queries),
+        "ntotal": int(coll.load()[0].ntotal),
+    }
+    shutil.rmtree(root, ignore_errors=True)
+    return row
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark per-report vs tombstoned vs bulk deletes.")
+    parser.add_argument("--reports", type=int, default=2000)
+    parser.add_argument("--chunks", type=int, default=8, help="Chunks per report")
+    parser.add_argument("--delete", type=int, default=500, help="Reports to delete")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    template = tempfile.mkdtemp(prefix="delete-bench-")
+    started = time.perf_counter()
+    _build(template, args.reports, args.chunks, args.dim, args.seed)
+    print(f"✓ {args.reports} reports, {args.reports * args.chunks} vectors ({time.perf_counter() - started:.1f}s)")
+    rng = np.random.default_rng(args.seed + 1)
+    delete = [f"r{i}" for i in rng.choice(args.reports, size=min(args.delete, args.reports), replace=False)]
+    queries = rng.standard_normal((50, args.dim)).astype("float32")
+
+    rows = [_run(m.strip(), template, delete, queries) for m in args.modes.split(",") if m.strip()]
+    shutil.rmtree(template, ignore_errors=True)
+
+    print(f"\n{'mode':<11}{'delete s':>10}{'compact s':>11}{'ms/report':>11}{'search ms (tomb)':>18}{'search ms':>11}")
+    for r in rows:
+        tomb = f"{r['search_tombstoned_ms']:.2f}" if r["search_tombstoned_ms"] is not None else "-"
+        print(
+            f"{r['mode']:<11}{r['delete_s']:>10.2f}{r['compact_s']:>11.2f}{r['per_report_ms']:>11.2f}"
+            f"{tomb:>18}{r['search_compacted_ms']:>11.2f}"
+        )
+    if len({r["ntotal"] for r in rows}) == 1:
+        print(f"\nAll modes leave {rows[0]['ntotal']} vectors; mean search {statistics.mean(r['search_compacted_ms'] for r in rows):.2f} ms.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+Load test
+=========
+Starts the mock HF router (benchmarks.mock_hf_router) and the API in their
+own processes, the API in a temp working directory so its data/ is isolated,
+generates a synthetic corpus (benchmarks.corpus) and uploads it, then runs
+each scenario at each concurrency level and reports p50/p95/p99 latency,
+throughput and error rate.
+
+    python -m benchmarks.load_test --scenarios upload,explain,chat,compare --concurrency 1,4,16 --requests 40
+
+    # keep a run and fail (exit 1) when a later run regresses by more than 20%
+    python -m benchmarks.load_test --save bench.json
+    python -m benchmarks.load_test --baseline bench.json --tolerance 0.2
+
+    # against an API that is already running (real or mocked upstream)
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8000
+
+Mock latency/error options (--chat-latency, --error-rate, ...) are passed
+through to the router. Note that main.py loads the repo's .env with
+override=True, so values in it win over the HF_* variables set here.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+import httpx
+import numpy as np
+
+from benchmarks.corpus import generate
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("upload", "explain", "chat", "compare")
+QUESTIONS = [
+    "What does my MCHC result mean?",
+    "Is my hemoglobin normal?",
+    "What is eGFR and is mine okay?",
+    "Why is my LDL cholesterol flagged?",
+    "What questions should I ask my doctor about these results?",
+]
+MOCK_OPTIONS = ("chat_latency", "vlm_latency", "ocr_latency", "ms_per_token", "error_rate", "error_status")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(url: str, proc: subprocess.Popen, timeout: float, log_path: str) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url} exited with {proc.returncode}; see {log_path}")
+        try:
+            if httpx.get(url, timeout=2.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} not ready after {timeout:.0f}s; see {log_path}")
+
+
+@contextmanager
+def local_stack(args, workdir: str, manifest: str):
+    """Mock router + API (uvicorn) subprocesses; yields the API base URL."""
+    mock_port, api_port = _free_port(), _free_port()
+    mock_cmd = [sys.executable, "-m", "benchmarks.mock_hf_router", "--port", str(mock_port), "--manifest", manifest]
+    for opt in MOCK_OPTIONS:
+        mock_cmd += [f"--{opt.replace('_', '-')}", str(getattr(args, opt))]
+    mock_url = f"http://127.0.0.1:{mock_port}"
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(p for p in (REPO_ROOT, os.environ.get("PYTHONPATH")) if p),
+        HF_API_KEY="bench-key",
+        HF_ROUTER_CHAT_URL=f"{mock_url}/v1/chat/completions",
+        HF_OCR_MODEL_ID=f"{mock_url}/models/trocr",
+        WARMUP_ON_STARTUP="1",
+    )
+    api_cmd = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(api_port), "--workers", str(args.workers)]
+    procs = []
+    try:
+        mock_log = open(os.path.join(workdir, "mock.log"), "w")
+        procs.append(subprocess.Popen(mock_cmd, cwd=REPO_ROOT, env=env, stdout=mock_log, stderr=subprocess.STDOUT))
+        _wait_ready(f"{mock_url}/stats", procs[-1], 60, mock_log.name)
+
+        api_log = open(os.path.join(workdir, "api.log"), "w")
+        # --app-dir so main is importable while data/ lands in the temp working dir.
+        procs.append(subprocess.Popen(api_cmd + ["--app-dir", REPO_ROOT], cwd=workdir, env=env,
+                                      stdout=api_log, stderr=subprocess.STDOUT))
+        base_url = f"http://127.0.0.1:{api_port}"
+        _wait_ready(f"{base_url}/readyz", procs[-1], args.startup_timeout, api_log.name)
+        print(f"✓ Mock router on {mock_url}, API on {base_url} (logs in {workdir})")
+        yield base_url, mock_url
+    finally:
+        for proc in reversed(procs):
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+# ---------- scenarios ----------
+
+async def _upload(client: httpx.AsyncClient, i: int, ctx: Dict) -> httpx.Response:
+    entry = ctx["corpus"][i % len(ctx["corpus"])]
+    with open(os.path.join(ctx["corpus_dir"], entry["file"]), "rb") as f:
+        data = f.read()
+    mime = "application/pdf" if entry["file"].endswith(".pdf") else "image/png"
+    resp = await client.post(
+        "/api/upload-report",
+        files={"file": (entry["file"], data, mime)},
+        data={"role": "patient", "patient_id": f"bench_{i % 5}"},
+    )
+    if resp.status_code == 200:
+        ctx["report_ids"].append(resp.json()["report_id"])
+    return resp
+
+
+async def _explain(client: httpx.AsyncClient, i: int, ctx: Dict) -> httpx.Response:
+    rid = ctx["report_ids"][i % len(ctx["report_ids"])]
+    return await client.get(f"/api/explain/{rid}", params={"role": ("patient", "provider")[i % 2]})
+
+
+async def _chat(client: httpx.AsyncClient, i: int, ctx: Dict) -> httpx.Response:
+    rid = ctx["report_ids"][i % len(ctx["report_ids"])]
+    params = {"question": QUESTIONS[i % len(QUESTIONS)], "role": ("patient", "provider")[i % 2]}
+    # A handful of users, so later requests are follow-ups carrying session history.
+    params["user_id"] = f"bench-user-{i % 8}"
+    return await client.post(f"/api/chat/{rid}", params=params)
+
+
+async def _compare(client: httpx.AsyncClient, i: int, ctx: Dict) -> httpx.Response:
+    rid = ctx["report_ids"][i % len(ctx["report_ids"])]
+    return await client.post("/api/agent/compare", params={"question": QUESTIONS[i % len(QUESTIONS)], "report_id": rid})
+
+
+_RUNNERS = {"upload": _upload, "explain": _explain, "chat": _chat, "compare": _compare}
+
+
+async def run_level(base_url: str, scenario: str, concurrency: int, requests: int, ctx: Dict, timeout: float) -> Dict:
+    """`requests` calls of one scenario from `concurrency` concurrent clients."""
+    latencies: List[float] = []
+    errors = 0
+    next_i = 0
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal next_i, errors
+        while next_i < requests:
+            i = next_i
+            next_i += 1
+            started = time.perf_counter()
+            try:
+                resp = await _RUNNERS[scenario](client, i, ctx)
+                ok = resp.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+
+    lat_ms = np.asarray(latencies) * 1000 if latencies else np.zeros(1)
+    p50, p95, p99 = np.percentile(lat_ms, [50, 95, 99]).tolist()
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(p50, 1),
+        "p95_ms": round(p95, 1),
+        "p99_ms": round(p99, 1),
+        "mean_ms": round(float(lat_ms.mean()), 1),
+        "rps": round(len(latencies) / wall, 2) if wall else 0.0,
+    }
+
+
+def compare_baseline(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[str]:
+    """Regressions of p95 latency or throughput beyond `tolerance` (a fraction)."""
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline}
+    problems = []
+    for r in results:
+        old = previous.get((r["scenario"], r["concurrency"]))
+        if not old:
+            continue
+        key = f"{r['scenario']}@{r['concurrency']}"
+        if old["p95_ms"] and r["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+            problems.append(f"{key}: p95 {old['p95_ms']:.0f} -> {r['p95_ms']:.0f} ms")
+        if old["rps"] and r["rps"] < old["rps"] * (1 - tolerance):
+            problems.append(f"{key}: throughput {old['rps']:.2f} -> {r['rps']:.2f} req/s")
+    return problems
+
+
+def _print_table(results: List[Dict]) -> None:
+    print(f"\n{'scenario':<9} {'conc':>4} {'reqs':>5} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>7}")
+    for r in results:
+        print(
+            f"{r['scenario']:<9} {r['concurrency']:>4} {r['requests']:>5} {r['errors']:>4} "
+            f"{r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} {r['p99_ms']:>8.0f} {r['rps']:>7.2f}"
+        )
+
+
+def run(args, base_url: str, corpus_dir: str, corpus: List[Dict]) -> List[Dict]:
+    ctx = {"corpus": corpus, "corpus_dir": corpus_dir, "report_ids": []}
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    levels = [int(c) for c in args.concurrency.split(",")]
+    if "upload" not in scenarios or scenarios.index("upload") > 0:
+        # explain/chat/compare need reports to work on.
+        asyncio.run(run_level(base_url, "upload", 4, min(args.seed_reports, len(corpus)), ctx, args.timeout))
+        print(f"✓ Seeded {len(ctx['report_ids'])} reports")
+    results = []
+    for scenario in scenarios:
+        for level in levels:
+            res = asyncio.run(run_level(base_url, scenario, level, args.requests, ctx, args.timeout))
+            results.append(res)
+            print(f"  {scenario}@{level}: p95 {res['p95_ms']:.0f} ms, {res['rps']:.2f} req/s, {res['errors']} errors")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the API against a mocked HF router.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=40, help="Requests per scenario and level")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the local API")
+    parser.add_argument("--pdfs", type=int, default=20)
+    parser.add_argument("--scanned", type=int, default=5)
+    parser.add_argument("--images", type=int, default=10)
+    parser.add_argument("--seed-reports", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request client timeout (s)")
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--base-url", help="Test a running API instead of starting one")
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare with a JSON file written by --save")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression, as a fraction")
+    parser.add_argument("--chat-latency", default="lognormal:900:0.4")
+    parser.add_argument("--vlm-latency", default="lognormal:2500:0.3")
+    parser.add_argument("--ocr-latency", default="lognormal:600:0.3")
+    parser.add_argument("--ms-per-token", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="carebridge-load-") as workdir:
+        corpus_dir = os.path.join(workdir, "corpus")
+        corpus = generate(corpus_dir, args.pdfs, args.scanned, args.images)
+        print(f"✓ Generated {len(corpus)} synthetic reports")
+        if args.base_url:
+            results = run(args, args.base_url.rstrip("/"), corpus_dir, corpus)
+        else:
+            with local_stack(args, workdir, os.path.join(corpus_dir, "manifest.json")) as (base_url, mock_url):
+                results = run(args, base_url, corpus_dir, corpus)
+                print(f"Mock router served: {httpx.get(f'{mock_url}/stats').json()}")
+
+    _print_table(results)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✓ Saved results to {args.save}")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            problems = compare_baseline(results, json.load(f), args.tolerance)
+        if problems:
+            print(f"\n⚠ Regressions beyond {args.tolerance:.0%}:")
+            for p in problems:
+                print(f"    {p}")
+            sys.exit(1)
+        print(f"\n✓ No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Local HF router stand-in
+========================
+Serves the two Hugging Face endpoints the backend calls, with configurable
+latency and error distributions, so load tests are reproducible and free:
+
+    POST /v1/chat/completions   LLM chat and VLM OCR (OpenAI-compatible, with usage)
+    POST /models/{model}        image-to-text (TrOCR-style [{"generated_text": ...}])
+    GET  /stats                 calls, errors and tokens served so far
+
+OCR of an image listed in a corpus manifest (benchmarks.corpus) returns that
+image's ground-truth text; other images (e.g. PDF pages rendered by the API)
+get the text of a corpus report instead.
+
+Latencies are "fixed:MS", "uniform:LOW:HIGH" or "lognormal:MEDIAN:SIGMA" (ms),
+plus --ms-per-token for each completion token generated.
+
+    python -m benchmarks.mock_hf_router --port 9100 --chat-latency lognormal:900:0.4 --error-rate 0.02
+    HF_API_KEY=bench HF_ROUTER_CHAT_URL=http://127.0.0.1:9100/v1/chat/completions \\
+        HF_OCR_MODEL_ID=http://127.0.0.1:9100/models/trocr uvicorn main:app
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import os
+import random
+from typing import Callable, Dict, List, Optional
+
+_WORDS = (
+    "your results show values within the reference range for most tests measured in this panel "
+    "a few values are slightly outside the range and are worth discussing with your doctor "
+    "these numbers describe how your blood carries oxygen filters waste and manages sugar"
+).split()
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Latency sampler in seconds from "fixed:MS", "uniform:LOW:HIGH" or "lognormal:MEDIAN:SIGMA"."""
+    kind, *params = spec.split(":")
+    values = [float(p) for p in params]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0] / 1000.0
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000.0
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(max(values[0], 1e-3))
+        return lambda rng: rng.lognormvariate(mu, values[1]) / 1000.0
+    raise ValueError(f"Bad latency spec '{spec}' (fixed:MS, uniform:LOW:HIGH, lognormal:MEDIAN:SIGMA)")
+
+
+def _load_manifest(path: Optional[str]) -> Dict:
+    by_digest: Dict[str, str] = {}
+    texts: List[str] = []
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for entry in json.load(f):
+                texts.append(entry["text"])
+                for digest in entry.get("sha256", []):
+                    by_digest[digest] = entry["text"]
+    return {"by_digest": by_digest, "texts": texts}
+
+
+def create_app(
+    chat_latency: str = "lognormal:900:0.4",
+    vlm_latency: str = "lognormal:2500:0.3",
+    ocr_latency: str = "lognormal:600:0.3",
+    ms_per_token: float = 0.0,
+    error_rate: float = 0.0,
+    error_status: int = 503,
+    manifest: Optional[str] = None,
+    seed: int = 7,
+):
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse
+
+    rng = random.Random(seed)
+    samplers = {name: parse_latency(spec) for name, spec in
+                (("chat", chat_latency), ("vlm", vlm_latency), ("ocr", ocr_latency))}
+    corpus = _load_manifest(manifest)
+    stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(kind: str, key: str, n: int = 1) -> None:
+        stats.setdefault(kind, {}).setdefault(key, 0)
+        stats[kind][key] += n
+
+    def _ocr_text(image_bytes: bytes) -> str:
+        text = corpus["by_digest"].get(hashlib.sha256(image_bytes).hexdigest())
+        if text is None and corpus["texts"]:
+            text = rng.choice(corpus["texts"])
+        return text or "Hemoglobin g/dL 13.0 - 16.5 14.1\nGlucose mg/dL 70 - 100 96"
+
+    async def _delay(kind: str, completion_tokens: int = 0) -> Optional[JSONResponse]:
+        await asyncio.sleep(samplers[kind](rng) + completion_tokens * ms_per_token / 1000.0)
+        _count(kind, "calls")
+        if error_rate and rng.random() < error_rate:
+            _count(kind, "errors")
+            return JSONResponse(status_code=error_status, content={"error": "mock upstream error"})
+        return None
+
+    app = FastAPI(title="Mock HF router")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages") or []
+        image = None
+        prompt_chars = 0
+        for msg in messages:
+            content = msg.get("content")
+            if isinstance(content, str):
+                prompt_chars += len(content)
+                continue
+            for part in content or []:
+                if part.get("type") == "image_url":
+                    url = (part.get("image_url") or {}).get("url", "")
+                    image = base64.b64decode(url.split(",", 1)[-1])
+                else:
+                    prompt_chars += len(part.get("text") or "")
+
+        if image is not None:
+            kind, text = "vlm", _ocr_text(image)
+        else:
+            kind = "chat"
+            n_words = max(20, int(int(body.get("max_tokens") or 300) * rng.uniform(0.4, 0.9) * 0.75))
+            text = "<p>" + " ".join(rng.choice(_WORDS) for _ in range(n_words)) + ".</p>"
+        completion_tokens = len(text) // 4
+        error = await _delay(kind, completion_tokens)
+        if error is not None:
+            return error
+        _count(kind, "prompt_tokens", prompt_chars // 4)
+        _count(kind, "completion_tokens", completion_tokens)
+        return {
+            "id": "mock-chat",
+            "object": "chat.completion",
+            "model": body.get("model"),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+            "usage": {
+                "prompt_tokens": prompt_chars // 4,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_chars // 4 + completion_tokens,
+            },
+        }
+
+    @app.post("/models/{model_id:path}")
+    async def image_to_text(model_id: str, request: Request):
+        image = await request.body()
+        try:
+            # huggingface_hub may send {"inputs": "<base64>"} instead of raw bytes.
+            image = base64.b64decode(json.loads(image)["inputs"])
+        except Exception:
+            pass
+        error = await _delay("ocr")
+        if error is not None:
+            return error
+        return [{"generated_text": _ocr_text(image)}]
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the HF router.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--chat-latency", default="lognormal:900:0.4")
+    parser.add_argument("--vlm-latency", default="lognormal:2500:0.3")
+    parser.add_argument("--ocr-latency", default="lognormal:600:0.3")
+    parser.add_argument("--ms-per-token", type=float, default=0.0, help="Extra latency per completion token")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls that fail")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--manifest", help="Corpus manifest.json from benchmarks.corpus")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    app = create_app(
+        chat_latency=args.chat_latency,
+        vlm_latency=args.vlm_latency,
+        ocr_latency=args.ocr_latency,
+        ms_per_token=args.ms_per_token,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        manifest=args.manifest,
+        seed=args.seed,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
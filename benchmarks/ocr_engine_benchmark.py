@@ -0,0 +1,117 @@
+"""
+OCR engine benchmark
+====================
+Throughput and accuracy of the OCR engines behind main.call_hf_ocr on
+scanned lab-report pages (prepared exactly as uploads are, see
+app.utils.ocr_image):
+
+  local     HF_OCR_MODE=local_only  Tesseract in the local process pool
+  remote    HF_OCR_MODE=vlm         the HF router VLM (needs HF_API_KEY)
+  escalate  HF_OCR_MODE=local       Tesseract, low-confidence pages sent to the VLM
+
+For each: pages/s at --concurrency pages in flight, mean and p95 latency per
+page, character similarity and lab-number recall against the ground truth,
+and the share of pages escalated.
+
+    python -m benchmarks.ocr_engine_benchmark --pages 12 --engines local
+    HF_API_KEY=... python -m benchmarks.ocr_engine_benchmark --pages 12 --concurrency 4
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+from benchmarks.ocr_payload_benchmark import ocr_accuracy, sample_pages
+
+ENGINES = {"local": "local_only", "remote": "vlm", "escalate": "local"}
+
+
+def _prepare(sample) -> List:
+    import fitz
+
+    from app.utils.ocr_image import render_pdf_page
+
+    pages = []
+    for path, index, truth in sample:
+        with fitz.open(path) as doc:
+            image, mime = render_pdf_page(doc.load_page(index))
+        pages.append((image, mime, truth))
+    return pages
+
+
+def _ocr_count(engine: str) -> float:
+    from prometheus_client import REGISTRY
+
+    return REGISTRY.get_sample_value("carebridge_ocr_pages_total", {"engine": engine}) or 0.0
+
+
+async def _run_engine(mode: str, pages: List, concurrency: int) -> Dict:
+    import main
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    scores: List = []
+
+    async def one(image: bytes, mime: str, truth: str) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            text = await main.call_hf_ocr(image, mime, mode=mode)
+            latencies.append(time.perf_counter() - started)
+            scores.append(ocr_accuracy(truth, text or ""))
+
+    escalated_before = _ocr_count("escalated")
+    started = time.perf_counter()
+    await asyncio.gather(*(one(*page) for page in pages))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "pages_per_s": len(pages) / elapsed,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000,
+        "char_sim": statistics.mean(s for s, _ in scores),
+        "num_recall": statistics.mean(r for _, r in scores),
+        "escalated": (_ocr_count("escalated") - escalated_before) / len(pages),
+    }
+
+
+async def run(engines: List[str], pages: List, concurrency: int) -> List[Dict]:
+    from app.utils import local_ocr
+
+    rows = []
+    for engine in engines:
+        mode = ENGINES[engine]
+        if mode in local_ocr.LOCAL_OCR_MODES:
+            if not local_ocr.available():
+                print(f"⚠ Skipping {engine}: Tesseract is not installed")
+                continue
+            local_ocr.warm_pool()
+        rows.append({"engine": engine, **await _run_engine(mode, pages, concurrency)})
+    local_ocr.reset_pool()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare local and remote OCR engines.")
+    parser.add_argument("--pages", type=int, default=12)
+    parser.add_argument("--corpus", default="", help="Directory from benchmarks.corpus (uses its scanned PDFs)")
+    parser.add_argument("--engines", default=",".join(ENGINES), help="Comma-separated subset of: " + ", ".join(ENGINES))
+    parser.add_argument("--concurrency", type=int, default=4, help="Pages OCR'd at once")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    pages = _prepare(sample_pages(args.pages, args.corpus, args.seed))
+    print(f"✓ {len(pages)} scanned pages")
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    rows = asyncio.run(run(engines, pages, args.concurrency))
+    print(f"\n{'engine':<10}{'pages/s':>9}{'mean ms':>9}{'p95 ms':>9}{'char sim':>10}{'nums':>7}{'escalated':>11}")
+    for r in rows:
+        print(
+            f"{r['engine']:<10}{r['pages_per_s']:>9.2f}{r['mean_ms']:>9.0f}{r['p95_ms']:>9.0f}"
+            f"{r['char_sim']:>10.3f}{r['num_recall']:>7.2f}{r['escalated']:>10.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+OCR payload benchmark
+=====================
+Compares OCR image preparation settings (app.utils.ocr_image) on scanned
+lab-report pages: bytes sent per page (base64 in the JSON body, as the VLM
+request carries it), prep time, upload time at a given uplink speed and, with
+--live, OCR accuracy against the ground-truth text (character similarity and
+the share of ground-truth numbers the OCR output contains, since lab values
+are what matter).
+
+The baseline is the old pipeline: every page at 200 dpi, colour PNG.
+
+    python -m benchmarks.ocr_payload_benchmark --pages 12 --uplink-mbps 10
+    HF_API_KEY=... python -m benchmarks.ocr_payload_benchmark --pages 6 --live
+    python -m benchmarks.ocr_payload_benchmark --corpus data/bench_corpus   # scanned PDFs from benchmarks.corpus
+"""
+
+import argparse
+import asyncio
+import base64
+import difflib
+import json
+import os
+import re
+import statistics
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from app.utils import ocr_image
+from benchmarks.corpus import _pages, synthetic_reports, write_scanned_pdf
+
+# name -> (render DPI or None for page_dpi(), encode_image kwargs); None kwargs = baseline PNG
+SETTINGS: Dict[str, Tuple] = {
+    "png200_rgb": (200, None),
+    "png_gray": (None, {"fmt": "png", "grayscale": True, "crop": True}),
+    "jpeg60": (None, {"fmt": "jpeg", "quality": 60}),
+    "jpeg80": (None, {"fmt": "jpeg", "quality": 80}),
+    "jpeg90": (None, {"fmt": "jpeg", "quality": 90}),
+    "webp60": (None, {"fmt": "webp", "quality": 60}),
+    "webp80": (None, {"fmt": "webp", "quality": 80}),
+}
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+def sample_pages(pages: int, corpus: str, seed: int) -> List[Tuple[str, int, str]]:
+    """(pdf path, page index, ground-truth text) for up to `pages` scanned pages."""
+    import fitz
+
+    sample = []
+    if corpus:
+        with open(os.path.join(corpus, "manifest.json"), "r", encoding="utf-8") as f:
+            entries = [e for e in json.load(f) if e["kind"] == "pdf_scanned"]
+        docs = [(os.path.join(corpus, e["file"]), e["text"]) for e in entries]
+    else:
+        tmp = tempfile.mkdtemp(prefix="ocr-bench-")
+        docs = []
+        for report_id, text in synthetic_reports(max(1, pages // 2), seed=seed):
+            path = os.path.join(tmp, f"{report_id}.pdf")
+            write_scanned_pdf(path, text)
+            docs.append((path, text))
+    for path, text in docs:
+        page_texts = _pages(text)
+        with fitz.open(path) as doc:
+            for i in range(min(len(doc), len(page_texts))):
+                sample.append((path, i, page_texts[i]))
+                if len(sample) >= pages:
+                    return sample
+    return sample
+
+
+def _render(path: str, index: int, setting: str) -> Tuple[bytes, str]:
+    import fitz
+
+    dpi, kwargs = SETTINGS[setting]
+    with fitz.open(path) as doc:
+        page = doc.load_page(index)
+        if kwargs is None:
+            return page.get_pixmap(dpi=dpi).tobytes("png"), "image/png"
+        return ocr_image.render_pdf_page(page, **kwargs)
+
+
+def ocr_accuracy(truth: str, text: str) -> Tuple[float, float]:
+    """(character similarity 0..1, share of ground-truth numbers present in the OCR text)."""
+    norm = lambda t: " ".join((t or "").split()).lower()
+    similarity = difflib.SequenceMatcher(None, norm(truth), norm(text), autojunk=False).ratio()
+    numbers = _NUMBER.findall(truth)
+    found = set(_NUMBER.findall(text or ""))
+    recall = sum(n in found for n in numbers) / len(numbers) if numbers else 1.0
+    return similarity, recall
+
+
+async def _ocr(image: bytes, mime: str) -> str:
+    import main  # the production OCR path (VLM, TrOCR fallback)
+
+    return await main.call_hf_ocr(image, mime) or ""
+
+
+def run(pages: int, corpus: str, settings: List[str], uplink_mbps: float, live: bool, seed: int) -> List[Dict]:
+    sample = sample_pages(pages, corpus, seed)
+    print(f"✓ {len(sample)} scanned pages")
+    rows = []
+    for setting in settings:
+        sizes, prep_ms, sims, recalls, ocr_ms = [], [], [], [], []
+        for path, index, truth in sample:
+            started = time.perf_counter()
+            image, mime = _render(path, index, setting)
+            prep_ms.append((time.perf_counter() - started) * 1000)
+            sizes.append(len(base64.b64encode(image)))
+            if live:
+                started = time.perf_counter()
+                text = asyncio.run(_ocr(image, mime))
+                ocr_ms.append((time.perf_counter() - started) * 1000)
+                sim, recall = ocr_accuracy(truth, text)
+                sims.append(sim)
+                recalls.append(recall)
+        mean_bytes = statistics.mean(sizes)
+        rows.append({
+            "setting": setting,
+            "kb_per_page": mean_bytes / 1024,
+            "prep_ms": statistics.mean(prep_ms),
+            "upload_ms": mean_bytes * 8 / (uplink_mbps * 1e6) * 1000,
+            "ocr_ms": statistics.mean(ocr_ms) if ocr_ms else None,
+            "char_sim": statistics.mean(sims) if sims else None,
+            "num_recall": statistics.mean(recalls) if recalls else None,
+        })
+    return rows
+
+
+def _fmt(value, width: int, spec: str) -> str:
+    return "-".rjust(width) if value is None else format(value, f">{width}{spec}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare OCR image preparation settings.")
+    parser.add_argument("--pages", type=int, default=12)
+    parser.add_argument("--corpus", default="", help="Directory from benchmarks.corpus (uses its scanned PDFs)")
+    parser.add_argument("--settings", default=",".join(SETTINGS), help="Comma-separated subset of: " + ", ".join(SETTINGS))
+    parser.add_argument("--uplink-mbps", type=float, default=10.0, help="For the computed upload time")
+    parser.add_argument("--live", action="store_true", help="OCR every page through the configured HF OCR path")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    settings = [s.strip() for s in args.settings.split(",") if s.strip()]
+    rows = run(args.pages, args.corpus, settings, args.uplink_mbps, args.live, args.seed)
+    base = rows[0]["kb_per_page"]
+    print(f"\n{'setting':<12}{'KB/page':>9}{'vs base':>9}{'prep ms':>9}{'upload ms':>11}{'ocr ms':>9}{'char sim':>10}{'nums':>7}")
+    for r in rows:
+        print(
+            f"{r['setting']:<12}{r['kb_per_page']:>9.0f}{r['kb_per_page'] / base:>8.0%} {r['prep_ms']:>8.0f}"
+            f"{r['upload_ms']:>11.0f}{_fmt(r['ocr_ms'], 9, '.0f')}{_fmt(r['char_sim'], 10, '.3f')}{_fmt(r['num_recall'], 7, '.2f')}"
+        )
+    if not args.live:
+        print("\n(run with --live and HF_API_KEY set to measure OCR latency and accuracy)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+PDF text extraction benchmark
+=============================
+Pages per second for each app.utils.pdf_text backend (pypdf, PyMuPDF) on
+synthetic multi-page lab-report PDFs, measured two ways:
+
+  inline  read_pages() on the event loop (what upload_report used to do)
+  pool    extract_pages() through the process pool, --concurrency documents at once
+
+and, for each, the worst event-loop stall seen by a 10 ms ticker running
+alongside - the latency every other request would have felt.
+
+    python -m benchmarks.pdf_extract_benchmark --docs 12 --pages 20
+    python -m benchmarks.pdf_extract_benchmark --backends pymupdf --concurrency 4
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+from app.utils import pdf_text
+from benchmarks.corpus import synthetic_reports, write_text_pdf
+
+
+def _make_docs(docs: int, pages: int, seed: int) -> List[bytes]:
+    """`docs` PDFs of about `pages` pages each (reports concatenated until long enough)."""
+    reports = [text for _, text in synthetic_reports(docs * pages, seed=seed)]
+    tmp = tempfile.mkdtemp(prefix="pdf-bench-")
+    out = []
+    for d in range(docs):
+        # A report fills roughly one page; stack `pages` of them per document.
+        text = "\n\n".join(reports[d * pages:(d + 1) * pages])
+        path = os.path.join(tmp, f"doc_{d}.pdf")
+        write_text_pdf(path, text)
+        with open(path, "rb") as f:
+            out.append(f.read())
+    return out
+
+
+async def _ticker(stop: asyncio.Event, lags: List[float], interval: float = 0.01) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+
+async def _measure(mode: str, backend: str, docs: List[bytes], concurrency: int) -> Dict:
+    stop, lags = asyncio.Event(), []
+    ticker = asyncio.create_task(_ticker(stop, lags))
+    await asyncio.sleep(0.02)
+    started = time.perf_counter()
+    pages = 0
+    if mode == "inline":
+        for data in docs:
+            pages += len(pdf_text.read_pages(data, backend))
+            await asyncio.sleep(0)
+    else:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(data: bytes) -> int:
+            async with semaphore:
+                result = await pdf_text.extract_pages("bench.pdf", data, backend=backend)
+                return len(result or [])
+
+        pages = sum(await asyncio.gather(*(one(d) for d in docs)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+    return {
+        "backend": backend,
+        "mode": mode,
+        "pages": pages,
+        "pages_per_s": pages / elapsed,
+        "max_stall_ms": max(lags, default=0.0) * 1000,
+    }
+
+
+async def run(backends: List[str], docs: List[bytes], concurrency: int) -> List[Dict]:
+    rows = []
+    for backend in backends:
+        rows.append(await _measure("inline", backend, docs, concurrency))
+        pdf_text.reset_pool()
+        pdf_text.warm_pool(backend)  # exclude worker start-up from the timing
+        rows.append(await _measure("pool", backend, docs, concurrency))
+    pdf_text.reset_pool()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark PDF text extraction backends.")
+    parser.add_argument("--docs", type=int, default=12)
+    parser.add_argument("--pages", type=int, default=20, help="Approximate pages per document")
+    parser.add_argument("--backends", default=",".join(pdf_text.BACKENDS))
+    parser.add_argument("--concurrency", type=int, default=pdf_text.PDF_EXTRACT_WORKERS or 2,
+                        help="Documents in flight in pool mode (PDF_EXTRACT_WORKERS sets the pool size)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    docs = _make_docs(args.docs, args.pages, args.seed)
+    print(f"✓ {len(docs)} PDFs, {sum(len(d) for d in docs) / 1e6:.1f} MB")
+    rows = asyncio.run(run([b.strip() for b in args.backends.split(",") if b.strip()], docs, args.concurrency))
+    print(f"\n{'backend':<9}{'mode':<8}{'pages':>7}{'pages/s':>10}{'max loop stall ms':>19}")
+    for r in rows:
+        print(f"{r['backend']:<9}{r['mode']:<8}{r['pages']:>7}{r['pages_per_s']:>10.0f}{r['max_stall_ms']:>19.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Retrieval quality benchmark
+===========================
+Compares vector (FAISS), keyword (BM25) and hybrid (reciprocal-rank fusion)
+retrieval of report chunks at several k. Each query asks about one analyte
+("What does my MCHC result mean?"), scoped to one report the way chat is;
+the relevant chunks are the ones lab_values extracts that analyte from.
+
+Reports hit@k (a relevant chunk is in the top k), MRR and the prompt tokens
+the top k chunks cost (~4 chars/token), so the k a mode needs for a given
+quality translates directly into context per chat.
+
+    # synthetic multi-panel lab reports
+    python -m benchmarks.retrieval_benchmark --synthetic 200
+
+    # the uploaded reports in data/vector_db (re-embedded into a temp index)
+    python -m benchmarks.retrieval_benchmark
+
+    # also each mode followed by the cross-encoder reranker (app.db.reranker)
+    python -m benchmarks.retrieval_benchmark --synthetic 200 --rerank
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from app.core.config import settings
+from app.db import reranker
+from app.db.vector_store import VectorCollection, embed_texts
+from app.utils.chunking import chunk_text
+from app.utils.lab_values import ANALYTES, extract_lab_values
+from benchmarks.corpus import synthetic_reports
+
+MODES = ("vector", "keyword", "hybrid")
+
+
+def live_reports() -> List[Tuple[str, List[str]]]:
+    """(report_id, chunks) from the report collection's store, in chunk order."""
+    with open(os.path.join(settings.VECTOR_DB_DIR, "faiss_store.json"), "r", encoding="utf-8") as f:
+        vectors = json.load(f).get("vectors", {})
+    by_report: Dict[str, List[Tuple[int, str]]] = {}
+    for rec in vectors.values():
+        meta = (rec or {}).get("metadata") or {}
+        if meta.get("report_id"):
+            by_report.setdefault(meta["report_id"], []).append((meta.get("chunk_index", 0), rec.get("text") or ""))
+    return [(rid, [t for _, t in sorted(chunks)]) for rid, chunks in by_report.items()]
+
+
+def build_queries(coll: VectorCollection, limit: int, seed: int = 7) -> List[Dict]:
+    """One query per (report, analyte) found in the report's chunks."""
+    _, store = coll.load()
+    relevant: Dict[Tuple[str, str], List[int]] = {}
+    for vid, rec in store["vectors"].items():
+        rid = rec["metadata"]["report_id"]
+        for reading in extract_lab_values(rec["text"]):
+            relevant.setdefault((rid, reading["analyte"]), []).append(int(vid))
+    queries = [
+        {"query": f"What does my {ANALYTES[key][0]} result mean?", "report_id": rid, "relevant": set(ids)}
+        for (rid, key), ids in relevant.items()
+    ]
+    random.Random(seed).shuffle(queries)
+    return queries[:limit]
+
+
+def _ranked(coll: VectorCollection, mode: str, query: str, k: int, only_ids: List[int]) -> List[dict]:
+    if mode.endswith("+rerank"):
+        hits = _ranked(coll, mode[: -len("+rerank")], query, max(k, reranker.RERANK_CANDIDATES), only_ids)
+        return reranker.rerank(query, hits, k, min_keep=1)
+    if mode == "keyword":
+        return coll.keyword_search(query, k, only_ids)
+    q_vec = embed_texts([query])
+    if mode == "vector":
+        return coll.search(q_vec, k, only_ids)
+    return coll.hybrid_search(query, q_vec, k, only_ids)
+
+
+def evaluate(coll: VectorCollection, queries: List[Dict], mode: str, ks: List[int]) -> Dict:
+    max_k = max(ks)
+    hits = {k: 0 for k in ks}
+    tokens = {k: 0 for k in ks}
+    rr = 0.0
+    started = time.perf_counter()
+    for q in queries:
+        ranked = _ranked(coll, mode, q["query"], max_k, coll.group_ids(q["report_id"]))
+        ids = [h["id"] for h in ranked]
+        first = next((i for i, vid in enumerate(ids) if vid in q["relevant"]), None)
+        if first is not None:
+            rr += 1.0 / (first + 1)
+        for k in ks:
+            hits[k] += first is not None and first < k
+            tokens[k] += sum(len(h["text"]) for h in ranked[:k]) // 4
+    n = len(queries) or 1
+    return {
+        "hit": {k: hits[k] / n for k in ks},
+        "tokens": {k: tokens[k] / n for k in ks},
+        "mrr": rr / n,
+        "ms_per_query": (time.perf_counter() - started) * 1000 / n,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark vector vs BM25 vs hybrid report retrieval.")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic lab reports")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--ks", default="1,2,3,5")
+    parser.add_argument("--chunk-chars", type=int, default=900)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--rerank", action="store_true", help="Also run each mode followed by the reranker")
+    args = parser.parse_args()
+    ks = sorted(int(k) for k in args.ks.split(","))
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    if args.rerank:
+        modes += [f"{m}+rerank" for m in modes]
+
+    if args.synthetic:
+        reports = [(rid, chunk_text(text, max_chars=args.chunk_chars)) for rid, text in synthetic_reports(args.synthetic)]
+    else:
+        reports = live_reports()
+    texts = [t for _, chunks in reports for t in chunks]
+    metas = [{"report_id": rid, "chunk_index": i} for rid, chunks in reports for i in range(len(chunks))]
+
+    with tempfile.TemporaryDirectory(prefix="retrieval-bench-") as tmp:
+        coll = VectorCollection(
+            "bench", os.path.join(tmp, "bench.index"), os.path.join(tmp, "bench.json"),
+            "flat", group_field="report_id", mmap=False,
+        )
+        started = time.perf_counter()
+        with coll.writer():
+            coll.add(texts, metas, embeddings=embed_texts(texts, batch_size=64))
+        print(f"Corpus: {len(reports)} reports, {len(texts)} chunks (embedded in {time.perf_counter() - started:.1f}s)")
+        queries = build_queries(coll, args.queries)
+        print(f"Queries: {len(queries)} analyte questions scoped to their report\n")
+
+        results = {mode: evaluate(coll, queries, mode, ks) for mode in modes}
+
+    header = f"{'mode':<15} " + " ".join(f"{'hit@' + str(k):>7}" for k in ks) + f" {'MRR':>6} {'ms/q':>6}  " + \
+        " ".join(f"{'tok@' + str(k):>7}" for k in ks)
+    print(header)
+    for mode, res in results.items():
+        print(
+            f"{mode:<15} " + " ".join(f"{res['hit'][k]:>7.3f}" for k in ks)
+            + f" {res['mrr']:>6.3f} {res['ms_per_query']:>6.1f}  "
+            + " ".join(f"{res['tokens'][k]:>7.0f}" for k in ks)
+        )
+
+    if "vector" in results and "hybrid" in results:
+        base_k = ks[-1]
+        target = results["vector"]["hit"][base_k]
+        k = next((k for k in ks if results["hybrid"]["hit"][k] >= target), None)
+        if k is not None:
+            saved = results["vector"]["tokens"][base_k] - results["hybrid"]["tokens"][k]
+            print(
+                f"\nHybrid matches vector hit@{base_k} ({target:.3f}) at k={k}: "
+                f"~{saved:.0f} fewer context tokens per chat."
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Cold-start benchmark
+====================
+Measures how long `import main` takes in a fresh interpreter, using
+`python -X importtime`, and lists the most expensive top-level packages.
+With --baseline the same measurement runs against another git revision
+(exported to a temp dir) so the difference shows up side by side.
+
+    python -m benchmarks.startup_benchmark --runs 5
+    python -m benchmarks.startup_benchmark --baseline HEAD~1
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _parse_importtime(stderr: str, module: str) -> Tuple[int, Dict[str, int]]:
+    """Cumulative microseconds of `module` and of each top-level package it pulls in."""
+    total = 0
+    packages: Dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue  # header row
+        cumulative = int(parts[1])
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        if depth == 0 and name == module:
+            total = cumulative
+        elif depth == 1:
+            # Direct imports of the measured module (nested imports are included in them).
+            top = name.split(".")[0]
+            packages[top] = packages.get(top, 0) + cumulative
+    return total, packages
+
+
+def measure(root: str, module: str) -> Optional[Dict]:
+    """Import `module` from `root` in a fresh interpreter; None if the import fails."""
+    env = dict(os.environ, PYTHONPATH=root, PYTHONDONTWRITEBYTECODE="1")
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=root, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        last = proc.stderr.strip().splitlines()[-1:] or ["unknown error"]
+        print(f"⚠ import {module} failed in {root}: {last[0]}")
+        return None
+    total_us, packages = _parse_importtime(proc.stderr, module)
+    return {"wall_s": wall, "import_s": total_us / 1e6, "packages": packages}
+
+
+def measure_many(root: str, module: str, runs: int) -> Optional[Dict]:
+    results: List[Dict] = []
+    for _ in range(runs):
+        res = measure(root, module)
+        if res is None:
+            return None
+        results.append(res)
+    # The median run's package breakdown is representative; averaging it is noise.
+    results.sort(key=lambda r: r["import_s"])
+    median = results[len(results) // 2]
+    return {
+        "wall_s": statistics.median(r["wall_s"] for r in results),
+        "import_s": statistics.median(r["import_s"] for r in results),
+        "packages": median["packages"],
+    }
+
+
+def export_revision(rev: str, dest: str) -> str:
+    """Write the tree of a git revision into `dest` (no worktree bookkeeping)."""
+    archive = os.path.join(dest, "rev.tar")
+    subprocess.run(["git", "archive", "--format=tar", "-o", archive, rev], cwd=REPO_ROOT, check=True)
+    with tarfile.open(archive) as tar:
+        tar.extractall(dest)
+    os.remove(archive)
+    return dest
+
+
+def _print_report(label: str, res: Dict, top: int) -> None:
+    print(f"{label}: import {res['import_s']:.3f}s, process wall {res['wall_s']:.3f}s")
+    ranked = sorted(res["packages"].items(), key=lambda kv: kv[1], reverse=True)[:top]
+    for name, us in ranked:
+        print(f"    {name:<28} {us / 1e3:>9.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of the API.")
+    parser.add_argument("--module", default="main", help="Module to import (default: main)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=12, help="Slowest top-level packages to list")
+    parser.add_argument("--baseline", help="Git revision to compare against, e.g. HEAD~1")
+    args = parser.parse_args()
+
+    current = measure_many(REPO_ROOT, args.module, args.runs)
+    if current:
+        _print_report("current", current, args.top)
+
+    if args.baseline:
+        with tempfile.TemporaryDirectory(prefix="startup-baseline-") as tmp:
+            baseline = measure_many(export_revision(args.baseline, tmp), args.module, args.runs)
+        if baseline:
+            _print_report(f"\nbaseline ({args.baseline})", baseline, args.top)
+            if current:
+                saved = baseline["import_s"] - current["import_s"]
+                pct = saved / baseline["import_s"] * 100 if baseline["import_s"] else 0.0
+                print(f"\nCold-start reduction: {saved:.3f}s ({pct:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
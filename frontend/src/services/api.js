@@ -13,6 +13,7 @@ export const uploadReport = async (file, role) => {
   const formData = new FormData();
   formData.append('file', file);
   formData.append('role', role);
+  formData.append('patient_id', localStorage.getItem('userEmail') || 'default');
 
   const response = await api.post('/upload-report', formData, {
     headers: {
@@ -45,8 +46,20 @@ export const feedKnowledge = async (text, source) => {
 };
 
 export const chatWithReport = async (reportId, question, role) => {
-  const response = await api.post(`/chat/${reportId}`, null, {
-    params: { question, role }
+  // Without an email, reuse the conversation id the API handed out; omitting
+  // user_id on the first call lets the backend start a fresh conversation.
+  const userId = localStorage.getItem('userEmail') || localStorage.getItem('chatUserId');
+  const params = userId ? { question, role, user_id: userId } : { question, role };
+  const response = await api.post(`/chat/${reportId}`, null, { params });
+  if (!localStorage.getItem('userEmail') && response.data?.user_id) {
+    localStorage.setItem('chatUserId', response.data.user_id);
+  }
+  return response.data;
+};
+
+export const getTrends = async (patientId, analyte) => {
+  const response = await api.get(`/trends/${encodeURIComponent(patientId)}`, {
+    params: analyte ? { analyte } : {}
   });
   return response.data;
 };
@@ -5,10 +5,12 @@ Uses Hugging Face Inference API for all AI operations
 Features multi-agent orchestration with role-based specialized agents
 """
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import Body, FastAPI, UploadFile, File, Form, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 import httpx
-import shutil
+import time
 import uuid
 import os
 
@@ -16,36 +18,44 @@ import os
 os.environ.setdefault("TRANSFORMERS_NO_TF", "1")
 os.environ.setdefault("TRANSFORMERS_NO_FLAX", "1")
 
+import asyncio
 import json
 import socket
 import base64
+import hashlib
+from contextlib import asynccontextmanager
 from datetime import datetime
 from dotenv import load_dotenv
 
 from typing import Optional, List, Tuple
 
-from pypdf import PdfReader
-
-from huggingface_hub import AsyncInferenceClient
-
-import numpy as np
+_here = os.path.dirname(os.path.abspath(__file__))
+# Load env from common locations before the app modules read their settings;
+# override=True so key changes take effect.
+load_dotenv(dotenv_path=os.path.join(_here, ".env"), override=True)
+load_dotenv(dotenv_path=os.path.join(_here, "app", ".env"), override=True)
 
-import faiss
-from sentence_transformers import SentenceTransformer
+from app.core import registry, telemetry
+from app.core.config import settings
+from app.core.sessions import session_store
+from app.db.vector_store import retrieve
+from app.db.index_writer import add_chunks, delete_groups, knowledge_ingest_status, start_knowledge_ingest, upsert_group
+from app.utils.chunking import chunk_text
+from app.utils import local_ocr, pdf_text
+from app.utils.local_ocr import LOCAL_OCR_MIN_CONFIDENCE
+from app.utils.ocr_image import page_is_blank, prepare_image, render_pdf_page
 
 # Import multi-agent system
 from app.core.agent import (
     create_care_bridge_agent,
-    create_supervisory_agent,
     PatientAgent,
     ClinicianAgent,
     SupervisoryAgent
 )
-
-_here = os.path.dirname(os.path.abspath(__file__))
-# Load env from common locations; override=True so key changes take effect.
-load_dotenv(dotenv_path=os.path.join(_here, ".env"), override=True)
-load_dotenv(dotenv_path=os.path.join(_here, "app", ".env"), override=True)
+from app.utils.safety_rules import load_flag_index
+from app.utils.lab_values import extract_lab_values, extract_report_date
+from app.db.analyte_store import analyte_store
+from app.db.text_store import pages_text, report_texts
 
 # ==================== CONFIGURATION ====================
 HF_API_KEY = os.getenv("HF_API_KEY", "")
@@ -59,14 +69,10 @@ HF_LLM_MODEL_ID = os.getenv("HF_LLM_MODEL_ID", "meta-llama/Llama-3.3-70B-Instruc
 HF_LLM_FALLBACK_MODEL_ID = os.getenv(
     "HF_LLM_FALLBACK_MODEL_ID", "Qwen/Qwen2.5-7B-Instruct"
 )
-HF_OCR_MODE = os.getenv("HF_OCR_MODE", "vlm").strip().lower()  # trocr | qwen_vl | vlm
+HF_OCR_MODE = os.getenv("HF_OCR_MODE", "vlm").strip().lower()  # trocr | qwen_vl | vlm | local | local_only
 HF_OCR_MODEL_ID = os.getenv("HF_OCR_MODEL_ID", "microsoft/trocr-base-printed")
 HF_OCR_VLM_MODEL_ID = os.getenv("HF_OCR_VLM_MODEL_ID", "meta-llama/Llama-3.2-11B-Vision-Instruct")
 
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-os.makedirs("data", exist_ok=True)
-os.makedirs(VECTOR_DB_DIR, exist_ok=True)
-
 AI_READY = bool(HF_API_KEY)
 print(f"{'✓ Hugging Face API Ready' if AI_READY else '⚠ No HF_API_KEY - using fallback'}")
 if AI_READY:
@@ -79,88 +85,34 @@ HF_ROUTER_CHAT_URL = os.getenv(
 )
 HF_HEADERS = {"Authorization": f"Bearer {HF_API_KEY}"} if HF_API_KEY else {}
 
-HF_CLIENT: Optional[AsyncInferenceClient] = (
-    # Still used for non-chat tasks (e.g., image_to_text) when enabled.
-    AsyncInferenceClient(api_key=HF_API_KEY, timeout=60) if HF_API_KEY else None
-)
+# Uploads are streamed to disk in UPLOAD_CHUNK_KB pieces and rejected (413)
+# as soon as they pass MAX_UPLOAD_MB.
+MAX_UPLOAD_MB = float(os.getenv("MAX_UPLOAD_MB", "25"))
+MAX_UPLOAD_BYTES = int(MAX_UPLOAD_MB * 1024 * 1024)
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_KB", "1024")) * 1024
+# Leading bytes of the formats extract_report_text() handles.
+UPLOAD_SIGNATURES = ((b"%PDF-", ".pdf"), (b"\x89PNG\r\n\x1a\n", ".png"), (b"\xff\xd8\xff", ".jpg"))
+
+# PDF pages are classified one by one (app.utils.pdf_text); up to
+# OCR_MAX_PAGES pages per PDF are OCR'd, OCR_CONCURRENCY at a time.
+OCR_MAX_PAGES = int(os.getenv("OCR_MAX_PAGES", "10"))
+OCR_CONCURRENCY = int(os.getenv("OCR_CONCURRENCY", "4"))
 
 # ==================== MULTI-AGENT SYSTEM ====================
-# Initialize supervisory agent for orchestration
-supervisory_agent = create_supervisory_agent()
-print("✓ Multi-Agent System Initialized (Patient Agent + Clinician Agent + Supervisory Agent)")
+# The supervisory agent and the HF inference client (still used for non-chat
+# tasks such as image_to_text) are built on first use by app.core.registry.
 
 # ==================== RAG (FAISS) ====================
+# Report and knowledge chunks live in separate collections (app.db.vector_store).
 
-FAISS_INDEX_PATH = os.path.join(VECTOR_DB_DIR, "faiss.index")
-FAISS_STORE_PATH = os.path.join(VECTOR_DB_DIR, "faiss_store.json")
-
-_EMBEDDER: Optional[SentenceTransformer] = None
-_FAISS_INDEX: Optional[faiss.IndexIDMap2] = None
-_FAISS_STORE: Optional[dict] = None
-
-
-def _get_embedder() -> SentenceTransformer:
-    global _EMBEDDER
-    if _EMBEDDER is None:
-        model_name = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
-        _EMBEDDER = SentenceTransformer(model_name)
-    return _EMBEDDER
-
-
-def _load_store() -> dict:
-    if os.path.exists(FAISS_STORE_PATH):
-        try:
-            with open(FAISS_STORE_PATH, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                if isinstance(data, dict) and "vectors" in data and "next_id" in data:
-                    return data
-        except Exception:
-            pass
-    return {"next_id": 1, "vectors": {}}
-
-
-def _save_store(store: dict) -> None:
-    with open(FAISS_STORE_PATH, "w", encoding="utf-8") as f:
-        json.dump(store, f, indent=2, ensure_ascii=False)
-
-
-def _ensure_faiss_loaded() -> Tuple[faiss.IndexIDMap2, dict]:
-    global _FAISS_INDEX, _FAISS_STORE
-    if _FAISS_INDEX is not None and _FAISS_STORE is not None:
-        return _FAISS_INDEX, _FAISS_STORE
-
-    store = _load_store()
-
-    if os.path.exists(FAISS_INDEX_PATH):
-        try:
-            idx = faiss.read_index(FAISS_INDEX_PATH)
-            if not isinstance(idx, faiss.IndexIDMap2):
-                idx = faiss.IndexIDMap2(idx)
-        except Exception:
-            idx = None
-    else:
-        idx = None
-
-    if idx is None:
-        # Create a new index using embedder dimension.
-        dim = int(_get_embedder().get_sentence_embedding_dimension())
-        base = faiss.IndexFlatIP(dim)
-        idx = faiss.IndexIDMap2(base)
-
-    _FAISS_INDEX, _FAISS_STORE = idx, store
-    return _FAISS_INDEX, _FAISS_STORE
-
+RAG_KNOWLEDGE_K = int(os.getenv("RAG_KNOWLEDGE_K", "3"))
+# Report chunks per chat question. Hybrid retrieval (RAG_RETRIEVAL_MODE) finds
+# exact lab tokens at lower k; see benchmarks/retrieval_benchmark.py.
+RAG_CHAT_K = int(os.getenv("RAG_CHAT_K", "5"))
 
-def _save_faiss_index(index: faiss.IndexIDMap2) -> None:
-    faiss.write_index(index, FAISS_INDEX_PATH)
-
-
-def _embed_texts(texts: List[str]) -> np.ndarray:
-    emb = _get_embedder().encode(texts, normalize_embeddings=True)
-    arr = np.asarray(emb, dtype="float32")
-    if arr.ndim == 1:
-        arr = arr.reshape(1, -1)
-    return arr
+# Load the embedder, FAISS indexes and agents in the background at startup;
+# /readyz reports 503 until they are hot. 0 = load lazily on first request.
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "1").strip().lower() not in {"0", "false", "no"}
 
 # ==================== DATABASE ====================
 def load_db():
@@ -190,6 +142,7 @@ async def call_huggingface_chat(messages: list, max_tokens: int = 500) -> Option
         for model_id in [HF_LLM_MODEL_ID, HF_LLM_FALLBACK_MODEL_ID]:
             if not model_id:
                 continue
+            started = time.perf_counter()
             try:
                 resp = await client.post(
                     HF_ROUTER_CHAT_URL,
@@ -201,9 +154,11 @@ async def call_huggingface_chat(messages: list, max_tokens: int = 500) -> Option
                     },
                 )
                 if resp.status_code != 200:
+                    telemetry.record_llm(model_id, time.perf_counter() - started, ok=False)
                     print(f"HF Chat Error ({model_id}): {resp.status_code} - {resp.text}")
                     continue
                 data = resp.json()
+                telemetry.record_llm_usage(model_id, time.perf_counter() - started, data)
                 choices = (data or {}).get("choices") or []
                 if not choices:
                     continue
@@ -211,6 +166,7 @@ async def call_huggingface_chat(messages: list, max_tokens: int = 500) -> Option
                 if isinstance(content, str) and content.strip():
                     return content.strip()
             except Exception as e:
+                telemetry.record_llm(model_id, time.perf_counter() - started, ok=False)
                 print(f"HF Chat Exception ({model_id}): {e}")
                 continue
 
@@ -222,7 +178,7 @@ def _image_bytes_to_data_url(image_bytes: bytes, mime: str = "image/png") -> str
     return f"data:{mime};base64,{b64}"
 
 
-async def call_hf_vlm_ocr(image_bytes: bytes) -> Optional[str]:
+async def call_hf_vlm_ocr(image_bytes: bytes, mime: str = "image/png") -> Optional[str]:
     """OCR via a vision-language model over the HF router (OpenAI-compatible chat).
 
     This is intended for *remote inference* (no local transformers load).
@@ -230,7 +186,7 @@ async def call_hf_vlm_ocr(image_bytes: bytes) -> Optional[str]:
     if not HF_API_KEY:
         return None
     try:
-        data_url = _image_bytes_to_data_url(image_bytes, mime="image/png")
+        data_url = _image_bytes_to_data_url(image_bytes, mime=mime)
         messages = [
             {
                 "role": "user",
@@ -248,6 +204,8 @@ async def call_hf_vlm_ocr(image_bytes: bytes) -> Optional[str]:
             }
         ]
         # Use the same router chat-completions endpoint for VLM OCR
+        # (timed as LLM metrics only; the span is the caller's "ocr_page").
+        started = time.perf_counter()
         async with httpx.AsyncClient(timeout=60.0) as client:
             resp = await client.post(
                 HF_ROUTER_CHAT_URL,
@@ -259,9 +217,11 @@ async def call_hf_vlm_ocr(image_bytes: bytes) -> Optional[str]:
                 },
             )
             if resp.status_code != 200:
+                telemetry.record_llm(HF_OCR_VLM_MODEL_ID, time.perf_counter() - started, ok=False, stage=None)
                 print(f"HF VLM OCR Error: {resp.status_code} - {resp.text}")
                 return None
             data = resp.json()
+            telemetry.record_llm_usage(HF_OCR_VLM_MODEL_ID, time.perf_counter() - started, data, stage=None)
             choices = (data or {}).get("choices") or []
             if not choices:
                 return None
@@ -272,25 +232,67 @@ async def call_hf_vlm_ocr(image_bytes: bytes) -> Optional[str]:
         return None
 
 
-async def call_hf_ocr(image_bytes: bytes) -> Optional[str]:
-    """OCR an image using Hugging Face Inference Providers image-to-text."""
-    if not HF_CLIENT:
+def _ocr_available(mode: str = HF_OCR_MODE) -> bool:
+    """True if call_hf_ocr() has an engine to use: the HF API or, in a local mode, Tesseract."""
+    return bool(HF_API_KEY) or (mode in local_ocr.LOCAL_OCR_MODES and local_ocr.available())
+
+
+@telemetry.timed("ocr_page")
+async def call_hf_ocr(image_bytes: bytes, mime: str = "image/png", mode: str = HF_OCR_MODE) -> Optional[str]:
+    """OCR an image with the engine HF_OCR_MODE selects.
+
+    vlm / qwen_vl: remote vision LLM, falling back to remote TrOCR; trocr: remote
+    TrOCR; local: Tesseract on this machine, escalating pages below
+    LOCAL_OCR_MIN_CONFIDENCE to the remote VLM (keeping the Tesseract text if
+    the remote call yields nothing); local_only: Tesseract only.
+    """
+    local_text = None
+    if mode in local_ocr.LOCAL_OCR_MODES:
+        with telemetry.span("ocr_local"):
+            result = await local_ocr.ocr(image_bytes)
+        if result is not None:
+            text, confidence = result
+            text = text.strip()
+            if mode == "local_only" or not HF_API_KEY or (text and confidence >= LOCAL_OCR_MIN_CONFIDENCE):
+                telemetry.count_ocr("local")
+                return text or None
+            telemetry.count_ocr("escalated")
+            print(f"Local OCR confidence {confidence:.0f} < {LOCAL_OCR_MIN_CONFIDENCE:g}; escalating page to the VLM")
+            local_text = text or None
+        elif mode == "local_only":
+            return None
+        mode = "vlm"
+
+    text = await _call_remote_ocr(image_bytes, mime, mode)
+    if text is None and local_text:
+        # Offline, quota or gating: a low-confidence page beats an empty one.
+        print("⚠ Remote OCR returned nothing; keeping the local OCR text")
+        telemetry.count_ocr("local")
+        return local_text
+    return text
+
+
+async def _call_remote_ocr(image_bytes: bytes, mime: str, mode: str) -> Optional[str]:
+    """Remote OCR: the VLM (falling back to TrOCR) for vlm / qwen_vl, else TrOCR."""
+    hf_client = registry.get_hf_client()
+    if not hf_client:
         return None
     try:
-        if HF_OCR_MODE in {"qwen_vl", "vlm", "qwen"}:
-            text = await call_hf_vlm_ocr(image_bytes)
+        if mode in {"qwen_vl", "vlm", "qwen"}:
+            text = await call_hf_vlm_ocr(image_bytes, mime)
             if text:
+                telemetry.count_ocr("vlm")
                 return text
             # fall back to TrOCR if VLM OCR fails (permissions/model gating, etc.)
 
-        result = await HF_CLIENT.image_to_text(image_bytes, model=HF_OCR_MODEL_ID)
+        result = await hf_client.image_to_text(image_bytes, model=HF_OCR_MODEL_ID)
         # image_to_text returns a list of dicts like [{'generated_text': '...'}]
         if isinstance(result, list) and result:
-            text = result[0].get("generated_text")
-            return text.strip() if isinstance(text, str) and text.strip() else None
-        if isinstance(result, dict):
-            text = result.get("generated_text")
-            return text.strip() if isinstance(text, str) and text.strip() else None
+            result = result[0]
+        text = result.get("generated_text") if isinstance(result, dict) else None
+        if isinstance(text, str) and text.strip():
+            telemetry.count_ocr("trocr")
+            return text.strip()
         return None
     except Exception as e:
         print(f"HF OCR Exception: {e}")
@@ -333,194 +335,184 @@ def _safety_instructions() -> str:
     )
 
 
-def _chunk_text(text: str, max_chars: int = 900, overlap: int = 150) -> List[str]:
-    cleaned = (text or "").replace("\r\n", "\n").strip()
-    if not cleaned:
-        return []
-    parts: List[str] = []
-    idx = 0
-    while idx < len(cleaned):
-        end = min(len(cleaned), idx + max_chars)
-        chunk = cleaned[idx:end].strip()
-        if chunk:
-            parts.append(chunk)
-        if end >= len(cleaned):
-            break
-        idx = max(0, end - overlap)
-    return parts
-
-
-def _extract_text_from_pdf(file_path: str) -> str:
-    try:
-        reader = PdfReader(file_path)
-        pages_text: List[str] = []
-        for page in reader.pages:
-            t = page.extract_text() or ""
-            if t.strip():
-                pages_text.append(t)
-        return "\n\n".join(pages_text).strip()
-    except Exception as e:
-        print(f"PDF text extract failed: {e}")
-        return ""
+def _sniff_extension(head: bytes, filename: str) -> str:
+    """File extension from the content's magic bytes, else from the client's filename."""
+    for signature, ext in UPLOAD_SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    return os.path.splitext(filename or "")[1].lower()
+
 
+async def _stream_upload(file: UploadFile, report_id: str) -> Tuple[str, bytes, str]:
+    """Copy an upload to UPLOAD_DIR chunk by chunk, hashing as it goes.
 
-async def _extract_text_via_pdf_ocr(file_path: str, max_pages: int = 5) -> str:
-    """Render PDF pages to images and OCR them. Requires PyMuPDF (fitz)."""
+    Returns (path, content, sha256 hex) so extraction can use the bytes without
+    reading the file back. Raises 413 once MAX_UPLOAD_BYTES is exceeded.
+    The bytes go to a temp file that replaces `path` only once the upload is
+    complete, so a failed re-upload leaves the report's existing file intact.
+    """
+    digest = hashlib.sha256()
+    buf = bytearray()
+    chunk = await file.read(UPLOAD_CHUNK_BYTES)
+    file_path = os.path.join(UPLOAD_DIR, f"{report_id}{_sniff_extension(chunk[:16], file.filename)}")
+    tmp_path = f"{file_path}.{uuid.uuid4().hex}.part"
+    f = await run_in_threadpool(open, tmp_path, "wb")
     try:
-        import fitz  # type: ignore
-    except Exception:
-        return ""
+        while chunk:
+            buf += chunk
+            if len(buf) > MAX_UPLOAD_BYTES:
+                raise HTTPException(413, f"File exceeds the {MAX_UPLOAD_MB:g} MB upload limit")
+            digest.update(chunk)
+            await run_in_threadpool(f.write, chunk)
+            chunk = await file.read(UPLOAD_CHUNK_BYTES)
+    except BaseException:
+        await run_in_threadpool(f.close)
+        os.remove(tmp_path)
+        raise
+    await run_in_threadpool(f.close)
+    os.replace(tmp_path, file_path)
+    return file_path, bytes(buf), digest.hexdigest()
+
+
+def _render_for_ocr(doc, i: int, check_blank: bool) -> Optional[Tuple[bytes, str]]:
+    page = doc.load_page(i)
+    if check_blank and page_is_blank(page):
+        return None
+    # Page-size DPI, grayscale, cropped, JPEG (app.utils.ocr_image).
+    return render_pdf_page(page)
 
-    if not HF_API_KEY:
-        return ""
 
-    text_parts: List[str] = []
-    try:
-        doc = fitz.open(file_path)
-        pages_to_process = min(len(doc), max_pages)
-        for i in range(pages_to_process):
-            page = doc.load_page(i)
-            pix = page.get_pixmap(dpi=200)
-            image_bytes = pix.tobytes("png")
-            ocr_text = await call_hf_ocr(image_bytes)
-            if ocr_text:
-                text_parts.append(f"[Page {i+1}]\n{ocr_text}")
-        doc.close()
-    except Exception as e:
-        print(f"PDF OCR failed: {e}")
+async def _extract_pdf_pages(file_path: str, data: Optional[bytes] = None) -> Tuple[str, str, List[dict]]:
+    """Per-page hybrid extraction: native text where a page has it, OCR (in parallel) where it doesn't.
+
+    Text extraction and page classification run in the app.utils.pdf_text
+    process pool. Up to OCR_MAX_PAGES pages are OCR'd (needs PyMuPDF to
+    render them); if OCR fails for a page, whatever native text it had is kept.
+    """
+    with telemetry.span("pdf_extract"):
+        pages = await pdf_text.extract_pages(file_path, data)
+    if pages is None:
+        return "", "pdf_extract_failed", []
+
+    ocr_pages = [i for i, (kind, _) in enumerate(pages) if kind == "ocr"]
+    doc = None
+    if ocr_pages and _ocr_available():
+        try:
+            import fitz  # type: ignore
+            doc = fitz.open(stream=data, filetype="pdf") if data is not None else fitz.open(file_path)
+        except Exception as e:
+            print(f"PDF OCR unavailable: {e}")
+    if doc is None:
+        ocr_pages = []
+    elif len(ocr_pages) > OCR_MAX_PAGES:
+        print(f"⚠ {len(ocr_pages)} pages need OCR; only the first {OCR_MAX_PAGES} are processed")
+        ocr_pages = ocr_pages[:OCR_MAX_PAGES]
+
+    ocr_results: List = []
+    if doc is not None:
+        # The pypdf backend cannot tell blank scans apart; check when rendering.
+        check_blank = pdf_text.resolve_backend() != "pymupdf"
+        semaphore = asyncio.Semaphore(OCR_CONCURRENCY)
+        render_lock = asyncio.Lock()  # one thread at a time in this document
+
+        async def ocr_page(i: int) -> Optional[str]:
+            async with semaphore:
+                async with render_lock:
+                    with telemetry.span("pdf_render"):
+                        rendered = await run_in_threadpool(_render_for_ocr, doc, i, check_blank)
+                return await call_hf_ocr(*rendered) if rendered else None
+
+        with doc:
+            ocr_results = await asyncio.gather(*(ocr_page(i) for i in ocr_pages), return_exceptions=True)
+
+    ocr_text = {
+        i: result for i, result in zip(ocr_pages, ocr_results) if isinstance(result, str) and result.strip()
+    }
+    page_records = [
+        {"page": i + 1, "kind": "ocr", "text": ocr_text[i]} if i in ocr_text
+        else {"page": i + 1, "kind": "blank" if kind == "blank" else "text", "text": text}
+        for i, (kind, text) in enumerate(pages)
+    ]
+    text = pages_text(page_records)
+    if not ocr_text:
+        method = "pdf_text" if len(text) >= 200 else "pdf_text_low"
+    elif len(ocr_text) == sum(1 for kind, t in pages if kind != "blank"):
+        method = "pdf_ocr"
+    else:
+        method = "pdf_hybrid"
+    print(
+        f"✓ PDF pages: {sum(k == 'text' for k, _ in pages)} text, {len(ocr_text)}/{len(ocr_pages)} OCR'd, "
+        f"{sum(k == 'blank' for k, _ in pages)} blank"
+    )
+    return text, method, page_records
 
-    return "\n\n".join(text_parts).strip()
 
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
 
-async def extract_report_text(file_path: str) -> Tuple[str, str]:
-    """Extract text from PDF/images using OCR when possible. Returns (text, method)."""
+
+async def extract_report_text(file_path: str, data: Optional[bytes] = None) -> Tuple[str, str, List[dict]]:
+    """Extract text from PDF/images using OCR when possible. Returns (text, method, pages).
+
+    `pages` is [{"page", "kind", "text"}] as kept in app.db.text_store.
+
+    Pass `data` (the file's content) when it is already in memory to skip reading the file.
+    """
     ext = os.path.splitext(file_path)[1].lower()
     if ext == ".pdf":
-        # First try native PDF text extraction.
-        text = _extract_text_from_pdf(file_path)
-        if len(text) >= 200:
-            return text, "pdf_text"
-        # If it looks scanned, try OCR if PyMuPDF is installed.
-        ocr_text = await _extract_text_via_pdf_ocr(file_path)
-        if ocr_text:
-            return ocr_text, "pdf_ocr"
-        return text, "pdf_text_low"
+        # Per page: native text layer where present, OCR for scanned pages.
+        return await _extract_pdf_pages(file_path, data)
 
     # Images: OCR via HF
     if ext in {".png", ".jpg", ".jpeg"}:
         try:
-            with open(file_path, "rb") as f:
-                image_bytes = f.read()
-            text = await call_hf_ocr(image_bytes)
-            return (text or ""), "image_ocr"
+            if data is None:
+                data = await run_in_threadpool(_read_file, file_path)
+            with telemetry.span("image_prep"):
+                # Decode / resize / re-encode of a multi-MB photo: keep it off the event loop.
+                image_bytes, mime = await run_in_threadpool(prepare_image, data)
+            text = (await call_hf_ocr(image_bytes, mime)) or ""
+            return text, "image_ocr", [{"page": 1, "kind": "image", "text": text}]
         except Exception as e:
             print(f"Image OCR failed: {e}")
-            return "", "image_ocr_failed"
+            return "", "image_ocr_failed", []
 
-    return "", "unsupported"
+    return "", "unsupported", []
 
 
-def _rag_upsert_report(report_id: str, filename: str, chunks: List[str], method: str) -> int:
-    if not chunks:
-        return 0
-    index, store = _ensure_faiss_loaded()
-
-    # Remove existing vectors for this report (FAISS supports delete via IDMap2)
-    existing_ids: List[int] = []
-    vectors = store.get("vectors", {})
-    for vid_str, rec in list(vectors.items()):
-        meta = (rec or {}).get("metadata", {})
-        if meta.get("report_id") == report_id:
-            try:
-                existing_ids.append(int(vid_str))
-            except Exception:
-                continue
-    if existing_ids:
-        try:
-            index.remove_ids(np.asarray(existing_ids, dtype="int64"))
-        except Exception:
-            pass
-        for vid in existing_ids:
-            vectors.pop(str(vid), None)
-
-    # Add new vectors
-    embeddings = _embed_texts(chunks)
-    new_ids: List[int] = []
-    for i, chunk in enumerate(chunks):
-        vid = int(store.get("next_id", 1))
-        store["next_id"] = vid + 1
-        new_ids.append(vid)
-        vectors[str(vid)] = {
-            "text": chunk,
-            "metadata": {
-                "report_id": report_id,
-                "filename": filename,
-                "source": "upload",
-                "method": method,
-                "chunk_index": i,
-            },
+def _rag_upsert_report(report_id: str, filename: str, chunks: List[str], method: str) -> dict:
+    """Make the report's vectors match `chunks`; unchanged chunks (by content hash) keep their embeddings."""
+    stats = upsert_group("reports", report_id, chunks, [
+        {
+            "report_id": report_id,
+            "filename": filename,
+            "source": "upload",
+            "method": method,
+            "chunk_index": i,
         }
-    store["vectors"] = vectors
-
-    index.add_with_ids(embeddings, np.asarray(new_ids, dtype="int64"))
-    _save_faiss_index(index)
-    _save_store(store)
-    return len(chunks)
+        for i in range(len(chunks))
+    ])
+    if stats["reused"] or stats["removed"]:
+        print(f"✓ RAG upsert {report_id}: {stats['reused']} chunks reused, {stats['added']} embedded, {stats['removed']} removed")
+    return stats
 
 
 def _rag_retrieve_report(report_id: str, query: str, k: int = 5) -> List[str]:
-    index, store = _ensure_faiss_loaded()
-    if index.ntotal == 0:
-        return []
-
-    q_vec = _embed_texts([query])
-    # Overfetch then filter by report_id
-    top_n = max(k * 10, 25)
-    scores, ids = index.search(q_vec, top_n)
-    out: List[str] = []
-    vectors = store.get("vectors", {})
-    for vid in ids[0].tolist():
-        if vid == -1:
-            continue
-        rec = vectors.get(str(int(vid)))
-        if not rec:
-            continue
-        meta = (rec.get("metadata") or {})
-        if meta.get("report_id") != report_id:
-            continue
-        text = rec.get("text")
-        if isinstance(text, str) and text.strip():
-            out.append(text)
-        if len(out) >= k:
-            break
-    return out
-
-
-def _rag_delete_report(report_id: str) -> int:
-    index, store = _ensure_faiss_loaded()
-    vectors = store.get("vectors", {})
-    delete_ids: List[int] = []
-    for vid_str, rec in list(vectors.items()):
-        meta = (rec or {}).get("metadata", {})
-        if meta.get("report_id") == report_id:
-            try:
-                delete_ids.append(int(vid_str))
-            except Exception:
-                continue
+    hits = retrieve(query, report_id=report_id, k=k, knowledge_k=0)
+    return [h["text"] for h in hits]
 
-    if not delete_ids:
-        return 0
 
-    try:
-        index.remove_ids(np.asarray(delete_ids, dtype="int64"))
-    except Exception:
-        pass
-    for vid in delete_ids:
-        vectors.pop(str(vid), None)
-    store["vectors"] = vectors
-    _save_faiss_index(index)
-    _save_store(store)
-    return len(delete_ids)
+def _rag_retrieve_context(report_id: str, query: str, k: int = 5) -> Tuple[List[str], List[str]]:
+    """Report chunks and guideline chunks for a query, searched in parallel."""
+    hits = retrieve(query, report_id=report_id, k=k, knowledge_k=RAG_KNOWLEDGE_K)
+    report_chunks = [h["text"] for h in hits if h["collection"] == "reports"]
+    knowledge_chunks = [h["text"] for h in hits if h["collection"] == "knowledge"]
+    return report_chunks, knowledge_chunks
+
+
+def _rag_delete_reports(report_ids: List[str]) -> int:
+    return delete_groups("reports", report_ids)
 
 
 async def miro_thinker_explain(report_id: str, role: str) -> tuple[str, bool]:
@@ -529,12 +521,13 @@ async def miro_thinker_explain(report_id: str, role: str) -> tuple[str, bool]:
     Routes to appropriate agent based on role for differentiated analysis
     """
     role = _normalize_role(role)
-    context_chunks = _rag_retrieve_report(
+    context_chunks, knowledge_chunks = _rag_retrieve_context(
         report_id,
         query="Summarize the medical report and highlight key values, interpretations, and follow-up questions.",
         k=6,
     )
     context = "\n\n".join(context_chunks)
+    knowledge = "\n\n".join(knowledge_chunks)[:2000]
     if not context.strip():
         return (
             "<h3>Report Summary</h3>"
@@ -551,6 +544,7 @@ async def miro_thinker_explain(report_id: str, role: str) -> tuple[str, bool]:
         # Prepare agent context
         agent_context = {
             "report_data": context,
+            "medical_knowledge": knowledge,
             "report_id": report_id
         }
         
@@ -585,7 +579,7 @@ Explain concepts like you're talking to a family member.
 Format with HTML tags and emojis for friendliness."""
         
         # Route through supervisory agent
-        result = supervisory_agent.route_request(role, prompt, agent_context)
+        result = registry.get_supervisory_agent().route_request(role, prompt, agent_context)
         
         if result and len(result.strip()) > 50:
             return result, True
@@ -647,18 +641,23 @@ Report text (grounding):
     return "<h3>Report Summary</h3><p>AI is unavailable right now. Please try again later.</p>", False
 
 
-async def miro_thinker_chat(report_id: str, question: str, role: str) -> tuple[str, bool]:
+async def miro_thinker_chat(
+    report_id: str, question: str, role: str, conversation: Optional[dict] = None
+) -> tuple[str, bool]:
     """
     Handle chat queries using multi-agent system
-    Provides role-appropriate responses
+    Provides role-appropriate responses; `conversation` is the session's
+    earlier turns (session_store.context()), if any
     """
+    conversation = conversation or {}
     role = _normalize_role(role)
     q = (question or "").strip()
     if not q:
         return "Please ask a question about the report.", False
 
-    context_chunks = _rag_retrieve_report(report_id, query=q, k=5)
+    context_chunks, knowledge_chunks = _rag_retrieve_context(report_id, query=q, k=RAG_CHAT_K)
     context = "\n\n".join(context_chunks)
+    knowledge = "\n\n".join(knowledge_chunks)[:2000]
     if not context.strip():
         return (
             "I couldn't retrieve enough text from the uploaded report to answer that. "
@@ -672,9 +671,11 @@ async def miro_thinker_chat(report_id: str, question: str, role: str) -> tuple[s
     try:
         agent_context = {
             "report_data": context,
-            "report_id": report_id
+            "medical_knowledge": knowledge,
+            "report_id": report_id,
+            **conversation,
         }
-        result = supervisory_agent.route_request(role, q, agent_context)
+        result = registry.get_supervisory_agent().route_request(role, q, agent_context)
         if result and len(result.strip()) > 20:
             return result, True
     except Exception as e:
@@ -687,6 +688,8 @@ async def miro_thinker_chat(report_id: str, question: str, role: str) -> tuple[s
         + "\n\n"
         + _safety_instructions()
     )
+    if conversation.get("conversation_summary"):
+        system_msg += f"\n\nEARLIER IN THIS CONVERSATION:\n{conversation['conversation_summary']}"
     
     if role == "provider":
         user_msg = f"""Answer concisely with clinical focus (3-8 sentences).
@@ -715,6 +718,7 @@ USER QUESTION:
     result = await call_huggingface_chat(
         messages=[
             {"role": "system", "content": system_msg},
+            *conversation.get("history", []),
             {"role": "user", "content": user_msg},
         ],
         max_tokens=320,
@@ -856,7 +860,22 @@ def generate_fallback_chat(question: str, tests: list, role: str) -> str:
 
 # ==================== FASTAPI APP ====================
 
-app = FastAPI(title="CARE-BRIDGE AI", version="3.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Only cheap setup inline; the embedder, indexes and agents warm up on a
+    # background thread so the server starts accepting connections right away.
+    settings.ensure_dirs()
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    os.makedirs(VECTOR_DB_DIR, exist_ok=True)
+    if WARMUP_ON_STARTUP:
+        registry.start_warm_up()
+    else:
+        registry.skip_warm_up()
+    yield
+    pdf_text.reset_pool()
+    local_ocr.reset_pool()
+
+app = FastAPI(title="CARE-BRIDGE AI", version="3.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -866,42 +885,138 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """Reject oversized uploads from Content-Length before the body is read."""
+    length = request.headers.get("content-length")
+    # Multipart framing and form fields add a little on top of the file itself.
+    if (
+        request.url.path == "/api/upload-report"
+        and length and length.isdigit()
+        and int(length) > MAX_UPLOAD_BYTES + 64 * 1024
+    ):
+        return JSONResponse(
+            status_code=413, content={"detail": f"File exceeds the {MAX_UPLOAD_MB:g} MB upload limit"}
+        )
+    return await call_next(request)
+
+# Registered last so it is the outermost middleware: early responses from the
+# ones above (e.g. a 413 from limit_upload_size) are timed too.
+@app.middleware("http")
+async def request_timing(request: Request, call_next):
+    """Per-request stage spans -> Prometheus histograms and (optionally) a Server-Timing header."""
+    spans, token = telemetry.start_request()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - started
+        route = request.scope.get("route")
+        telemetry.end_request(token, request.method, getattr(route, "path", "unmatched"), status, elapsed)
+    if telemetry.SERVER_TIMING:
+        response.headers["Server-Timing"] = telemetry.server_timing(spans, elapsed)
+    return response
+
 @app.get("/")
 async def root():
     return {"status": "CARE-BRIDGE AI v3.0 - Hugging Face", "ai": "ready" if AI_READY else "fallback"}
 
+@app.get("/readyz")
+async def readyz():
+    """Readiness probe: 200 once the embedder and indexes are loaded, 503 before."""
+    status = registry.readiness()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: request, per-stage and LLM latency histograms, LLM token counters."""
+    return Response(content=telemetry.render_metrics(), media_type=telemetry.CONTENT_TYPE)
+
 @app.post("/api/upload-report")
-async def upload_report(file: UploadFile = File(...), role: str = Form("patient")):
-    """Upload and parse a medical report"""
-    report_id = str(uuid.uuid4())
-    ext = os.path.splitext(file.filename)[1]
-    file_path = os.path.join(UPLOAD_DIR, f"{report_id}{ext}")
+async def upload_report(
+    file: UploadFile = File(...),
+    role: str = Form("patient"),
+    patient_id: str = Form("default"),
+    report_id: Optional[str] = Form(None),
+):
+    """Upload and parse a medical report.
+
+    With `report_id`, re-upload (e.g. a better scan) over an existing report:
+    it keeps its id, and only chunks whose text changed are re-embedded.
+    """
+    existing = get_report_by_id(report_id) if report_id else None
+    if report_id and not existing:
+        raise HTTPException(404, "Report not found")
+    report_id = report_id or str(uuid.uuid4())
     
-    with open(file_path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
+    with telemetry.span("file_write"):
+        file_path, content, content_sha256 = await _stream_upload(file, report_id)
+    if existing:
+        for ext in ['.pdf', '.png', '.jpg', '.jpeg']:
+            old_path = os.path.join(UPLOAD_DIR, f"{report_id}{ext}")
+            if old_path != file_path and os.path.exists(old_path):
+                os.remove(old_path)
+        session_store.drop_report(report_id)  # answers were about the old content
+        if existing.get("patient_id", "default") != patient_id:
+            analyte_store.remove_report(existing.get("patient_id", "default"), report_id)
     
     # OCR/Text extraction + RAG ingestion
-    extracted_text, method = await extract_report_text(file_path)
-    chunks = _chunk_text(extracted_text)
-    chunk_count = 0
+    extracted_text, method, pages = await extract_report_text(file_path, content)
+    if pages:
+        # Full text, per page, so re-chunking / re-embedding never needs the OCR again.
+        with telemetry.span("text_store"):
+            try:
+                await run_in_threadpool(report_texts.put, report_id, pages, method, file.filename)
+            except Exception as e:
+                print(f"Report text store failed: {e}")
+    elif existing:
+        report_texts.remove(report_id)  # the old text no longer matches the file
+    with telemetry.span("chunk"):
+        chunks = chunk_text(extracted_text, max_chars=settings.CHUNK_CHARS, overlap=settings.CHUNK_OVERLAP)
+    rag = {"count": 0, "reused": 0}
     try:
-        chunk_count = _rag_upsert_report(report_id, file.filename, chunks, method)
+        with telemetry.span("rag_upsert"):
+            # Embedding, or the call to the writer process, must not block the event loop.
+            rag = await run_in_threadpool(_rag_upsert_report, report_id, file.filename, chunks, method)
     except Exception as e:
         print(f"RAG upsert failed: {e}")
 
     parsed = parse_medical_report(file_path)
     parsed["extraction_method"] = method
     parsed["text_preview"] = (extracted_text[:800] + "...") if len(extracted_text) > 800 else extracted_text
-    parsed["rag_chunks"] = chunk_count
-    
-    reports = load_db()
-    reports.append({
-        "id": report_id,
-        "filename": file.filename,
-        "upload_date": datetime.now().isoformat(),
-        "parsed_data": parsed
-    })
-    save_db(reports)
+    parsed["rag_chunks"] = rag["count"]
+    parsed["rag_chunks_reused"] = rag["reused"]
+
+    # Longitudinal analyte store (feeds /api/trends)
+    with telemetry.span("lab_extract"):
+        readings = extract_lab_values(extracted_text)
+        report_date = extract_report_date(extracted_text) or parsed["report_date"]
+    parsed["lab_values"] = len(readings)
+    with telemetry.span("store_write"):
+        try:
+            analyte_store.record_report(patient_id, report_id, report_date, readings)
+        except Exception as e:
+            print(f"Analyte store update failed: {e}")
+
+        record = {
+            "id": report_id,
+            "filename": file.filename,
+            "patient_id": patient_id,
+            "sha256": content_sha256,
+            "size_bytes": len(content),
+            "upload_date": datetime.now().isoformat(),
+            "parsed_data": parsed
+        }
+        reports = load_db()
+        if existing:
+            record["upload_date"] = existing.get("upload_date", record["upload_date"])
+            record["updated_date"] = datetime.now().isoformat()
+            reports = [record if r["id"] == report_id else r for r in reports]
+        else:
+            reports.append(record)
+        save_db(reports)
     
     return {"report_id": report_id, "filename": file.filename, "data": parsed}
 
@@ -909,6 +1024,38 @@ async def upload_report(file: UploadFile = File(...), role: str = Form("patient"
 async def get_documents():
     return load_db()
 
+def _delete_reports(removed: List[dict]) -> None:
+    """Drop everything stored for already-unlisted reports: readings, files, sessions, vectors."""
+    by_patient = {}
+    for r in removed:
+        by_patient.setdefault(r.get("patient_id", "default"), []).append(r["id"])
+    for patient_id, ids in by_patient.items():
+        try:
+            analyte_store.remove_reports(patient_id, ids)
+        except Exception as e:
+            print(f"Analyte store delete failed: {e}")
+
+    for r in removed:
+        for ext in ['.pdf', '.png', '.jpg', '.jpeg']:
+            path = os.path.join(UPLOAD_DIR, f"{r['id']}{ext}")
+            if os.path.exists(path):
+                os.remove(path)
+                break
+        session_store.drop_report(r["id"])
+        report_texts.remove(r["id"])
+
+    # Tombstone the RAG vectors in one index write (best effort); compaction runs later.
+    try:
+        _rag_delete_reports([r["id"] for r in removed])
+    except Exception as e:
+        print(f"RAG delete failed: {e}")
+
+def _upload_datetime(report: dict) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(report.get("upload_date") or "")
+    except ValueError:
+        return None
+
 @app.delete("/api/document/{doc_id}")
 async def delete_document(doc_id: str):
     reports = load_db()
@@ -918,31 +1065,52 @@ async def delete_document(doc_id: str):
         raise HTTPException(404, "Not found")
     
     save_db(new_reports)
-    
-    for ext in ['.pdf', '.png', '.jpg', '.jpeg']:
-        path = os.path.join(UPLOAD_DIR, f"{doc_id}{ext}")
-        if os.path.exists(path):
-            os.remove(path)
-            break
-
-    # Remove RAG vectors for this report (best effort)
-    try:
-        _rag_delete_report(doc_id)
-    except Exception as e:
-        print(f"RAG delete failed: {e}")
+    await run_in_threadpool(_delete_reports, [r for r in reports if r["id"] == doc_id])
     
     return {"message": "Deleted", "id": doc_id}
 
+@app.post("/api/documents/delete")
+async def delete_documents(ids: List[str] = Body(default=[], embed=True), before: Optional[str] = None):
+    """Bulk delete: the listed report ids and/or every report uploaded before `before` (ISO date)."""
+    if not ids and not before:
+        raise HTTPException(400, "ids or before is required")
+    cutoff = None
+    if before:
+        try:
+            cutoff = datetime.fromisoformat(before)
+        except ValueError:
+            raise HTTPException(400, f"before must be an ISO date or datetime, got '{before}'")
+        if cutoff.tzinfo is not None:  # upload dates are naive local time
+            cutoff = cutoff.astimezone().replace(tzinfo=None)
+    wanted = set(ids)
+    reports = load_db()
+    removed = [
+        r for r in reports
+        if r["id"] in wanted or (cutoff and (_upload_datetime(r) or cutoff) < cutoff)
+    ]
+    if removed:
+        removed_ids = {r["id"] for r in removed}
+        save_db([r for r in reports if r["id"] not in removed_ids])
+        await run_in_threadpool(_delete_reports, removed)
+
+    deleted = [r["id"] for r in removed]
+    return {"message": "Deleted", "deleted": deleted, "not_found": sorted(wanted.difference(deleted))}
+
 @app.get("/api/explain/{report_id}")
 async def get_explanation(report_id: str, role: str = "patient"):
     """Get AI explanation for a report"""
-    report = get_report_by_id(report_id)
+    with telemetry.span("store_lookup"):
+        report = get_report_by_id(report_id)
     if not report:
         raise HTTPException(404, "Report not found")
 
     role = _normalize_role(role)
-    tests = report.get("parsed_data", {}).get("tests", [])
-    warnings = check_safety(tests) if tests else []
+    with telemetry.span("guardrails"):
+        tests = report.get("parsed_data", {}).get("tests", [])
+        warnings = check_safety(tests) if tests else []
+        # Critical findings from the last archive-wide run of app.jobs.reevaluate_safety.
+        critical_findings = load_flag_index().get(report_id, [])
+        warnings += [f["message"] for f in critical_findings]
 
     # Generate explanation grounded in RAG (OCR'd report)
     explanation, ai_powered = await miro_thinker_explain(report_id, role)
@@ -952,7 +1120,7 @@ async def get_explanation(report_id: str, role: str = "patient"):
         "role": role,
         "explanation": explanation,
         "safety_warnings": warnings,
-        "critical": False,
+        "critical": bool(critical_findings),
         "contextual_message": f"Report from {report.get('parsed_data', {}).get('report_date', 'recent')}",
         "disclaimer": "⚠️ This information is for educational purposes only and is not medical advice. Please consult your healthcare provider.",
         "citations": ["CDC Laboratory Guidelines", "American Diabetes Association"],
@@ -960,43 +1128,80 @@ async def get_explanation(report_id: str, role: str = "patient"):
     }
 
 @app.post("/api/chat/{report_id}")
-async def chat_with_report(report_id: str, question: str, role: str = "patient"):
+async def chat_with_report(report_id: str, question: str, role: str = "patient", user_id: Optional[str] = None):
     """
     Chat about a report using Multi-Agent System
-    Routes to appropriate specialized agent based on role
+    Routes to appropriate specialized agent based on role; earlier turns of the
+    (user_id, report, role) conversation are sent along, so follow-ups work.
+    Without user_id a new conversation is started and its id returned.
     """
-    report = get_report_by_id(report_id)
+    with telemetry.span("store_lookup"):
+        report = get_report_by_id(report_id)
     if not report:
         raise HTTPException(404, "Report not found")
 
     role = _normalize_role(role)
+    user_id = user_id or uuid.uuid4().hex
+    conversation = session_store.context(user_id, report_id, role)
     
     # Retrieve context from RAG
-    context_chunks = _rag_retrieve_report(report_id, query=question, k=5)
+    context_chunks, knowledge_chunks = _rag_retrieve_context(report_id, query=question, k=RAG_CHAT_K)
     context_text = "\n\n".join(context_chunks)[:5000]  # Limit context size
     
     # Prepare context for agent
     agent_context = {
         "report_data": context_text,
+        "medical_knowledge": "\n\n".join(knowledge_chunks)[:2000],
         "report_id": report_id,
         "report_type": report.get("type", "medical report"),
-        "report_date": report.get("date", "unknown")
+        "report_date": report.get("date", "unknown"),
+        **conversation,
     }
     
     # Route request through supervisory agent
     try:
-        answer = supervisory_agent.route_request(role, question, agent_context)
+        answer = registry.get_supervisory_agent().route_request(role, question, agent_context)
         ai_powered = True
     except Exception as e:
         print(f"Agent Error: {e}")
         # Fallback to traditional method
-        answer, ai_powered = await miro_thinker_chat(report_id, question, role)
+        answer, ai_powered = await miro_thinker_chat(report_id, question, role, conversation)
+
+    if ai_powered:
+        session = session_store.record(user_id, report_id, role, question, answer)
+    else:
+        session = session_store.get(user_id, report_id, role)
     
     return {
         "answer": answer, 
         "report_id": report_id, 
         "ai_powered": ai_powered,
-        "agent_used": role.upper() + "_AGENT"
+        "agent_used": role.upper() + "_AGENT",
+        "user_id": user_id,
+        "turns": session.total_turns,
+    }
+
+@app.delete("/api/chat/{report_id}")
+async def reset_chat(report_id: str, user_id: str):
+    """Forget this user's conversation about a report (all roles)"""
+    return {"report_id": report_id, "cleared": session_store.drop_report(report_id, user_id)}
+
+@app.get("/api/trends/{patient_id}")
+async def get_trends(patient_id: str, analyte: Optional[str] = None):
+    """
+    Longitudinal lab trends for a patient across all of their uploads
+    Served from the columnar analyte store - no PDF re-reads or LLM calls
+    """
+    table = analyte_store.get(patient_id)
+    analytes = [a.strip().lower() for a in analyte.split(",")] if analyte else None
+    trends = table.trends(analytes)
+    if analyte and not trends:
+        raise HTTPException(404, "No readings for that analyte")
+    
+    return {
+        "patient_id": patient_id,
+        "analytes": sorted(table.series),
+        "trends": trends
     }
 
 @app.get("/api/agent/capabilities/{role}")
@@ -1005,7 +1210,7 @@ async def get_agent_capabilities(role: str):
     Get capabilities and tools available for a specific agent role
     """
     role = _normalize_role(role)
-    capabilities = supervisory_agent.get_agent_capabilities(role)
+    capabilities = registry.get_supervisory_agent().get_agent_capabilities(role)
     
     return {
         "role": role,
@@ -1024,15 +1229,16 @@ async def compare_agents(question: str, report_id: Optional[str] = None):
     if report_id:
         report = get_report_by_id(report_id)
         if report:
-            context_chunks = _rag_retrieve_report(report_id, query=question, k=5)
+            context_chunks, knowledge_chunks = _rag_retrieve_context(report_id, query=question, k=RAG_CHAT_K)
             context_text = "\n\n".join(context_chunks)[:5000]
             agent_context = {
                 "report_data": context_text,
+                "medical_knowledge": "\n\n".join(knowledge_chunks)[:2000],
                 "report_id": report_id
             }
     
     # Get responses from both agents
-    responses = supervisory_agent.multi_agent_consultation(question, agent_context)
+    responses = registry.get_supervisory_agent().multi_agent_consultation(question, agent_context)
     
     return {
         "question": question,
@@ -1049,30 +1255,28 @@ async def feed_knowledge(text: str, source: str = "manual"):
     text = (text or "").strip()
     if not text:
         raise HTTPException(400, "text is required")
-    chunks = _chunk_text(text)
+    chunks = chunk_text(text, max_chars=settings.CHUNK_CHARS, overlap=settings.CHUNK_OVERLAP)
     if not chunks:
         raise HTTPException(400, "text too short")
-    index, store = _ensure_faiss_loaded()
-    embeddings = _embed_texts(chunks)
-
-    vectors = store.get("vectors", {})
-    new_ids: List[int] = []
-    for i, chunk in enumerate(chunks):
-        vid = int(store.get("next_id", 1))
-        store["next_id"] = vid + 1
-        new_ids.append(vid)
-        vectors[str(vid)] = {
-            "text": chunk,
-            "metadata": {"source": source, "type": "knowledge"},
-        }
-    store["vectors"] = vectors
-
-    index.add_with_ids(embeddings, np.asarray(new_ids, dtype="int64"))
-    _save_faiss_index(index)
-    _save_store(store)
+    await run_in_threadpool(add_chunks, "knowledge", chunks, [
+        {"source": source, "type": "knowledge", "chunk_index": i}
+        for i in range(len(chunks))
+    ])
 
     return {"message": "Knowledge saved", "source": source, "chunks": len(chunks)}
 
+@app.post("/api/rag/ingest-dir")
+async def ingest_knowledge_dir():
+    """Start bulk ingestion of MEDICAL_KNOWLEDGE_DIR in the background (resumable)."""
+    result = await run_in_threadpool(start_knowledge_ingest)
+    if not result["started"]:
+        raise HTTPException(409, "Knowledge ingestion is already running")
+    return {"message": "Knowledge ingestion started", "status": result["status"]}
+
+@app.get("/api/rag/ingest-status")
+async def ingest_status():
+    return await run_in_threadpool(knowledge_ingest_status)
+
 # ==================== MAIN ====================
 
 if __name__ == "__main__":
@@ -0,0 +1,41 @@
+import threading
+
+from app.db.analyte_store import AnalyteStore
+
+
+def _reading(value):
+    return [{"analyte": "glucose", "value": value, "unit": "mg/dL"}]
+
+
+def test_other_workers_writes_are_picked_up(tmp_path):
+    a, b = AnalyteStore(str(tmp_path)), AnalyteStore(str(tmp_path))
+    a.record_report("p1", "r1", "2024-01-01", _reading(100))
+    assert a.get("p1").trend("glucose")["count"] == 1
+    b.record_report("p1", "r2", "2024-02-01", _reading(120))
+    assert a.get("p1").trend("glucose")["count"] == 2
+    b.remove_report("p1", "r1")
+    assert [p["report_id"] for p in a.get("p1").trend("glucose")["points"]] == ["r2"]
+
+
+def test_concurrent_writers_keep_every_row(tmp_path):
+    stores = [AnalyteStore(str(tmp_path)) for _ in range(2)]
+    for store in stores:
+        store.get("p1")  # warm, soon stale, caches
+
+    def write(n, store):
+        for i in range(15):
+            store.record_report("p1", f"r{n}-{i}", f"2024-01-{i + 1:02d}", _reading(90 + i))
+
+    threads = [threading.Thread(target=write, args=(n, s)) for n, s in enumerate(stores)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert AnalyteStore(str(tmp_path)).get("p1").trend("glucose")["count"] == 30
+
+
+def test_unknown_patients_are_not_cached(tmp_path):
+    store = AnalyteStore(str(tmp_path))
+    for i in range(5):
+        assert store.get(f"nobody-{i}").trends() == {}
+    assert store._tables == {}
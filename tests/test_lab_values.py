@@ -0,0 +1,52 @@
+from app.utils.lab_values import extract_lab_values, extract_report_date
+from app.utils.safety_rules import CriticalRules
+
+
+def _only(line):
+    readings = extract_lab_values(line)
+    assert len(readings) == 1
+    return readings[0]
+
+
+def test_platelets_ignore_unit_exponent_and_range():
+    reading = _only("Platelet Count 250 10^3/uL 150 - 410")
+    assert reading["analyte"] == "platelets"
+    assert reading["value"] == 250000.0
+    assert (reading["low"], reading["high"]) == (150000.0, 410000.0)
+    assert CriticalRules().check([reading]) == []
+
+
+def test_wbc_ignores_x10_exponent():
+    reading = _only("WBC Count 7.5 x10^3/uL")
+    assert reading["analyte"] == "wbc"
+    assert reading["value"] == 7500.0
+    assert CriticalRules().check([reading]) == []
+
+
+def test_egfr_ignores_body_surface_unit_and_threshold():
+    reading = _only("eGFR 92 mL/min/1.73m2 >60")
+    assert reading["analyte"] == "egfr"
+    assert reading["value"] == 92.0
+    assert reading["unit"] == "mL/min/1.73m2"
+
+
+def test_value_after_range_still_parsed():
+    reading = _only("Hemoglobin g/dL 13.0 - 16.5Colorimetric 14.5")
+    assert reading["value"] == 14.5
+    assert (reading["low"], reading["high"]) == (13.0, 16.5)
+
+
+def test_report_date_skips_date_of_birth():
+    text = "Patient: A. Kumar\nDOB: 14/08/1961  Sex: M\nLipid profile\nLDL 120 mg/dL\nPrinted 02/03/2024"
+    assert extract_report_date(text) == "2024-03-02"
+
+
+def test_report_date_prefers_collection_date():
+    text = (
+        "Name: A. Kumar   Date of Birth: 1961-08-14\n"
+        "Reported: 05/03/2024\n"
+        "Sample Collected On\n"
+        "03/03/2024 08:10\n"
+    )
+    assert extract_report_date(text) == "2024-03-03"
+    assert extract_report_date("Reported on 05/03/2024, received 04/03/2024") == "2024-03-05"
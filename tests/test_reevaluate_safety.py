@@ -0,0 +1,20 @@
+import json
+
+from app.jobs.reevaluate_safety import _iter_json_array
+from app.utils.chunking import chunk_text, join_chunks
+
+
+def test_join_chunks_drops_overlap():
+    text = "\n".join(f"Hemoglobin {i} g/dL 13.0 - 16.5 {10 + i % 7}.{i % 10}" for i in range(60))
+    chunks = chunk_text(text, max_chars=200, overlap=80)
+    assert len(chunks) > 5
+    assert join_chunks(chunks) == text
+
+
+def test_iter_json_array_reads_in_blocks(tmp_path):
+    reports = [{"id": f"r{i}", "parsed_data": {"tests": [{"name": "Glucose", "value": i}]}} for i in range(50)]
+    path = tmp_path / "db.json"
+    path.write_text(json.dumps(reports, indent=2), encoding="utf-8")
+    assert list(_iter_json_array(str(path), read_size=7)) == reports
+    path.write_text("[]", encoding="utf-8")
+    assert list(_iter_json_array(str(path), read_size=7)) == []
@@ -0,0 +1,46 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from app.utils.workers import ProcessPool
+
+
+def _sleep(seconds: float) -> int:
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def test_timeout_kills_only_the_overrunning_worker():
+    pool = ProcessPool("test", workers=2)
+
+    async def scenario():
+        slow = asyncio.ensure_future(pool.run(_sleep, 30, timeout=2))
+        ok = asyncio.ensure_future(pool.run(_sleep, 3, timeout=20))
+        with pytest.raises(asyncio.TimeoutError):
+            await slow
+        pid = await ok  # in flight when the other worker was killed
+        again = await pool.run(_sleep, 0, timeout=20)  # the killed worker has been replaced
+        return pid, again
+
+    try:
+        pid, again = asyncio.run(scenario())
+    finally:
+        pool.reset(kill=True)
+    assert pid != os.getpid()
+    assert again != os.getpid()
+
+
+def test_task_exception_keeps_the_worker():
+    pool = ProcessPool("test", workers=1)
+
+    async def scenario():
+        with pytest.raises(ZeroDivisionError):
+            await pool.run(divmod, 1, 0, timeout=20)
+        return await pool.run(divmod, 7, 2, timeout=20)
+
+    try:
+        assert asyncio.run(scenario()) == (3, 1)
+    finally:
+        pool.reset(kill=True)